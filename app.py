@@ -1,7 +1,13 @@
 import streamlit as st
 from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import html
 import re
 import time
+import uuid
+from contextlib import contextmanager
+from copy import deepcopy
 
 from config import (
     GameConfig, ThemeLibrary, GameTheme, SystemMessages,
@@ -9,12 +15,27 @@ from config import (
     VisualThemeLibrary,
 )
 from game_agent import GameAgent, GameResponse
+from game_client import make_agent, SERVICE_URL
+from placeholder_art import render_placeholder_base64
+from media_store import MediaStore
+from audio_components import render_audio_playlist, render_streaming_recorder, STREAM_RECORDER_OK
+from streaming_stt import StreamingTranscriber
+from idempotency import SubmissionRegistry, Submission, idempotency_key, audio_digest
+from filler_narration import FillerBank, LatencySLO
+from tracing import span as trace_span, bind, breakdown, get_tracer
+from usage_meter import UsageMeter
+from save_journal import (
+    GameJournal, GameState, JournalLocked, inventory_delta, list_saves, new_game_id, valid_owner,
+    referenced_media,
+)
+from session_store import SessionStore
+from media_pipeline import TurnMediaPipeline
 
 AUDIO_OK = False
 AudioManager = None
 try:
-    from audio_manager import AudioManager as AM, GTTS_OK
-    if GTTS_OK:
+    from audio_manager import AudioManager as AM, TTS_OK
+    if TTS_OK:
         AudioManager = AM
         AUDIO_OK = True
 except:
@@ -23,7 +44,7 @@ except:
 IMAGE_OK = False
 ImageGenerator = None
 try:
-    from image_manager import ImageGenerator as IG, HUGGINGFACE_OK
+    from image_manager import ImageGenerator as IG, HUGGINGFACE_OK, theme_style
     if HUGGINGFACE_OK:
         ImageGenerator = IG
         IMAGE_OK = True
@@ -48,6 +69,11 @@ except:
 
 
 
+# Historique virtualisé : seuls les derniers tours sont rendus en entier
+HISTORY_WINDOW = 5       # tours affichés en entier (+5 à chaque "Charger plus")
+HISTORY_COMPACT_MAX = 20  # messages résumés au-dessus de la fenêtre
+
+
 st.set_page_config(
     page_title="HERO IA",
     page_icon="⚔️",
@@ -55,8 +81,20 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+def player_id() -> str:
+    """Identifiant du joueur, gardé dans l'URL : ses sauvegardes le suivent au rechargement."""
+    player = st.query_params.get("player")
+    if not player or not valid_owner(player):
+        player = uuid.uuid4().hex
+        st.query_params["player"] = player
+    return player
+
+
 def init_state():
     defaults = {
+        'session_id': uuid.uuid4().hex,
+        'owner_id': None,  # Joueur (?player= dans l'URL) : propriétaire des sauvegardes
+        'usage': None,  # UsageMeter (tokens et budget de la session)
         'visual_theme': 'dark',
         'agent': None,
         'game_active': False,
@@ -65,24 +103,38 @@ def init_state():
         'hp': 20,
         'hp_max': 20,
         'inventory': [],
-        'history': [],  # Maintenant contient {'content': str, 'narrator': bool, 'image': str ou None}
+        'history': [],  # {'content': str, 'narrator': bool, 'image': identifiant MediaStore ou None}
         'actions': [],
         'scene': '',
         'game_theme': None,
         'audio_mgr': None,
         'voice_mode': False,
         'voice_key': 'fr',
-        'audio_to_play': None,
+        'audio_profile': 'auto',  # Variante de narration : auto / eco / standard / mp3
+        'audio_to_play': None,  # Clés des segments de narration (cache TTS)
         'image_gen': None,
         'images_enabled': True,
         'mic_counter': 0,
-        'last_audio_id': None,
+        'last_audio_id': None,  # Empreinte SHA-256 du dernier enregistrement traité
+        'submissions': None,  # SubmissionRegistry (tours idempotents)
+        'stt_stream': None,  # StreamingTranscriber (enregistreur en continu)
+        'fillers': None,  # FillerBank (lignes d'attente de la scène en cours)
+        'turn_slo': None,  # LatencySLO (latence perçue / réelle des tours)
+        'last_trace': None,  # Identifiant de trace du dernier tour (panneau de latence)
+        'last_render': None,  # Durée du dernier rendu complet du script (s)
+        'journal': None,  # GameJournal de la partie en cours (sauvegarde automatique)
+        'rehydrate_ms': None,  # Durée de la dernière réhydratation depuis le tier froid
+        'pending_media': [],  # [{'kind': 'image'|'refine'|'voice', 'index': int, 'future': Future}]
+        'history_turns': HISTORY_WINDOW,
     }
     
     for k, v in defaults.items():
         if k not in st.session_state:
             st.session_state[k] = v
     
+    if st.session_state.owner_id is None:
+        st.session_state.owner_id = player_id()
+    
     if AUDIO_OK and st.session_state.audio_mgr is None:
         try:
             st.session_state.audio_mgr = AudioManager()
@@ -252,6 +304,30 @@ def load_css():
             text-align: center;
         }}
         
+        /* Historique compact (tours anciens) */
+        .history-compact {{
+            border-left: 2px solid var(--muted);
+            padding: 0.3rem 0 0.3rem 1rem;
+            margin: 0.5rem 0 1rem 0;
+            font-size: 0.85rem;
+            color: var(--muted);
+        }}
+        .history-compact div {{
+            margin: 0.2rem 0;
+            white-space: nowrap;
+            overflow: hidden;
+            text-overflow: ellipsis;
+        }}
+        
+        /* Ligne d'attente (réponse lente) */
+        .filler-line {{
+            color: var(--muted);
+            font-style: italic;
+            text-align: center;
+            padding: 10px;
+            animation: fadeIn 0.3s ease-in;
+        }}
+        
         /* Save success */
         .save-success {{
             background: rgba(34, 197, 94, 0.15);
@@ -279,6 +355,7 @@ def load_css():
 # UTILS
 # ============================================
 
+@lru_cache(maxsize=256)
 def fmt_story(text: str) -> str:
     if not text:
         return ""
@@ -293,6 +370,27 @@ def fmt_story(text: str) -> str:
         paras.append(' '.join(current))
     return ''.join(f'<p>{p}</p>' for p in paras if p.strip())
 
+# ============================================
+# MÉDIAS
+# ============================================
+
+@st.cache_resource
+def get_media_store() -> MediaStore:
+    """Stockage partagé des images et de l'audio (servis par ./app/static)."""
+    sessions = get_session_store()
+    # Éviction : jamais une image encore affichée par une session ou citée par une sauvegarde
+    return MediaStore(pinned=lambda: sessions.media_ids() | referenced_media())
+
+
+def store_image(image_b64: Optional[str]) -> Optional[str]:
+    """Écrit l'image dans le MediaStore et retourne son identifiant."""
+    if not image_b64:
+        return None
+    try:
+        return get_media_store().put_base64(image_b64)
+    except Exception:
+        return None
+
 # ============================================
 # AUDIO
 # ============================================
@@ -303,9 +401,11 @@ def speak(text: str):
     if not text or len(text.strip()) < 5:
         return
     try:
-        result = st.session_state.audio_mgr.text_to_speech(text)
-        if result.success and result.audio_bytes:
-            st.session_state.audio_to_play = result.audio_bytes
+        # Synthèse parallèle par phrase : on n'attend que le premier segment,
+        # le lecteur enchaîne les suivants dès qu'ils sont prêts
+        job = st.session_state.audio_mgr.start_speech(text)
+        if job.wait_first() is not None:
+            st.session_state.audio_to_play = job.keys
     except:
         pass
 
@@ -315,7 +415,10 @@ def play_audio():
         return
     if VOICE_UI_OK:
         show_ai_speaking()
-    st.audio(st.session_state.audio_to_play, format="audio/mp3", autoplay=True)
+    render_audio_playlist(
+        st.session_state.audio_mgr.segment_urls(st.session_state.audio_to_play),
+        profile=st.session_state.audio_profile,
+    )
     st.session_state.audio_to_play = None
 
 
@@ -328,35 +431,305 @@ def transcribe(audio_bytes: bytes) -> Optional[str]:
     except:
         return None
 
+
+# Profils de débit de la narration (voir audio_components.AUDIO_PROFILES)
+AUDIO_PROFILE_LABELS = {
+    "auto": "📶 Débit audio : automatique",
+    "eco": "📶 Économie (Opus 12 kbps)",
+    "standard": "📶 Standard (Opus 24 kbps)",
+    "mp3": "📶 MP3 (compatibilité)",
+}
+
+
+# Attente maximale des derniers segments après "Envoyer" (s)
+STT_FINISH_TIMEOUT = 10.0
+
+
+def get_stream_transcriber() -> Optional[StreamingTranscriber]:
+    if not st.session_state.audio_mgr:
+        return None
+    if st.session_state.stt_stream is None:
+        st.session_state.stt_stream = StreamingTranscriber(
+            st.session_state.audio_mgr.speech_to_text, get_executor()
+        )
+    return st.session_state.stt_stream
+
+
+def _voice_stream_panel():
+    """Enregistreur en continu : chaque segment est transcrit pendant que le joueur parle."""
+    transcriber = get_stream_transcriber()
+    if transcriber is None:
+        return
+    
+    message = render_streaming_recorder(
+        key=f"stream_mic_{st.session_state.mic_counter}",
+        acked_rec=transcriber.rec_id,
+        acked=transcriber.received(),
+        partial=transcriber.partial() if transcriber.active else "",
+    )
+    transcriber.feed(message)
+    if transcriber.active:
+        # Le joueur parle : la session ne doit pas être évincée pendant l'enregistrement
+        get_session_store().heartbeat(st.session_state.session_id)
+    
+    latency = transcriber.latency_report()["stop_to_action"]
+    if latency is not None:
+        st.caption(f"⚡ Arrêt → action : {latency:.2f}s")
+    
+    if transcriber.ready():
+        with st.spinner("🔄 Transcription..."):
+            text = transcriber.finish(timeout=STT_FINISH_TIMEOUT)
+        if text:
+            if VOICE_UI_OK:
+                show_transcription(text)
+            else:
+                st.success(f'🎤 "{text}"')
+            transcriber.mark_action()
+            # Fragment : exécution partielle, hors du hot_session() de main()
+            with hot_session():
+                do_action(text, kind="voice")
+            st.rerun()
+        else:
+            st.error("❌ Transcription échouée")
+
+
+# Sondage toutes les 0.5 s : texte partiel et acquittements pendant l'enregistrement
+voice_stream_panel = (
+    st.fragment(run_every=0.5)(_voice_stream_panel)
+    if hasattr(st, "fragment") and STREAM_RECORDER_OK else None
+)
+
 # ============================================
 # IMAGE
 # ============================================
 
-def generate_image(prompt: str, theme_id: str = None) -> Optional[str]:
-    """Génère une image et retourne le base64."""
+# Budget média d'un tour (s) : image et narration sont attendues en parallèle
+TURN_MEDIA_BUDGET = 8.0
+IMAGE_STAGE_TIMEOUT = 8.0
+VOICE_STAGE_TIMEOUT = 5.0
+
+
+@st.cache_resource
+def get_executor() -> ThreadPoolExecutor:
+    """Pool de threads partagé pour les générations en arrière-plan."""
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="hero-media")
+
+
+# ============================================
+# SESSIONS (tier chaud / froid)
+# ============================================
+
+@st.cache_resource
+def get_session_store() -> SessionStore:
+    """Sessions du processus : les onglets inactifs sont évincés vers SQLite."""
+    store = SessionStore()
+    store.start_reaper()
+    return store
+
+
+def _session_extras() -> dict:
+    # Mesurés dans le rapport mémoire, jamais évincés (utilisés par les fragments) ;
+    # le store ne les tient que par références faibles
+    return {
+        'audio_mgr': st.session_state.audio_mgr,
+        'submissions': st.session_state.submissions,
+        'usage': st.session_state.usage,
+        'fillers': st.session_state.fillers,
+    }
+
+
+@contextmanager
+def hot_session():
+    """
+    Garde la session dans le tier chaud le temps d'une exécution : l'agent et
+    l'historique sont rechargés sur place s'ils avaient été évincés.
+    """
+    store = get_session_store()
+    session_id = st.session_state.session_id
+    elapsed = store.touch(session_id, st.session_state.agent, st.session_state.history,
+                          **_session_extras())
+    if elapsed is not None:
+        st.session_state.rehydrate_ms = elapsed * 1000
+    # Bail du journal renouvelé à chaque exécution : la partie reste à cette session
+    journal = st.session_state.journal
+    if journal is not None and not journal.renew():
+        journal_lost()
+    try:
+        yield
+    finally:
+        store.release(session_id, st.session_state.agent, st.session_state.history,
+                      **_session_extras())
+
+
+def prepare_image_gen(theme_id: str = None):
+    """Retourne le générateur d'images configuré pour le thème (ou None)."""
     if not st.session_state.images_enabled or not st.session_state.image_gen:
         return None
-    if not prompt or len(prompt.strip()) < 5:
-        return None
-    try:
-        gen = st.session_state.image_gen
-        if theme_id:
-            style_map = {
-                "orient_express": "fantasy",
-                "egypt": "ancient",
-                "space": "space",
-                "manor": "victorian",
-                "jungle": "jungle",
-                "submarine": "dark",
-            }
-            gen.set_style(style_map.get(theme_id, "fantasy"))
-        result = gen.generate_image(prompt)
-        if result.success and result.image_base64:
-            return result.image_base64
-    except:
-        pass
+    gen = st.session_state.image_gen
+    if theme_id:
+        gen.set_style(theme_style(theme_id))
+    return gen
+
+
+def image_b64(result) -> Optional[str]:
+    """Base64 d'un ImageResult réussi."""
+    if result and result.success and result.image_base64:
+        return result.image_base64
     return None
 
+
+def placeholder_image(scene: str) -> str:
+    """Illustration procédurale instantanée (CPU local, sans réseau)."""
+    return render_placeholder_base64(st.session_state.game_theme, scene)
+
+
+def image_prompt_for(response: GameResponse) -> str:
+    return getattr(response, 'image_prompt', None) or response.scene_description
+
+
+def speech_first_segment(audio_mgr, text: str) -> Optional[list]:
+    """Étape narration : lance la synthèse et attend le premier segment."""
+    job = audio_mgr.start_speech(text)
+    if job.wait_first(VOICE_STAGE_TIMEOUT) is None:
+        return None
+    return job.keys
+
+
+def start_turn_media(response: GameResponse) -> Optional[str]:
+    """
+    Lance en parallèle le brouillon d'image et la narration du tour,
+    et attend au plus TURN_MEDIA_BUDGET secondes.
+    
+    - L'illustration provisoire s'affiche immédiatement pendant l'attente
+    - Les étapes en retard sont rattachées au message plus tard
+    
+    Returns:
+        Identifiant MediaStore de l'image à afficher (brouillon ou provisoire)
+    """
+    st.session_state.pending_media = []
+    pipeline = TurnMediaPipeline(get_executor(), budget=TURN_MEDIA_BUDGET)
+    img_id = None
+    placeholder = None
+    slot = None
+    
+    if st.session_state.images_enabled:
+        # Écrite dans le MediaStore seulement si elle reste affichée (pas de brouillon à temps)
+        placeholder = placeholder_image(response.scene_description)
+        gt = st.session_state.game_theme
+        gen = prepare_image_gen(gt.id if gt else None) if IMAGE_OK else None
+        prompt = image_prompt_for(response)
+        if gen and prompt and len(prompt.strip()) >= 5:
+            pipeline.add("image", bind(gen.generate_draft), prompt, timeout=IMAGE_STAGE_TIMEOUT)
+            # Aperçu immédiat pendant la génération
+            slot = st.empty()
+            with slot.container():
+                show_narrator(response.story, image_src=f"data:image/svg+xml;base64,{placeholder}")
+    
+    audio_mgr = st.session_state.audio_mgr
+    if st.session_state.voice_mode and audio_mgr and len(response.story.strip()) >= 5:
+        pipeline.add("voice", bind(speech_first_segment), audio_mgr, response.story, timeout=VOICE_STAGE_TIMEOUT)
+    
+    with st.spinner("🎨 Illustration et narration..."):
+        results = pipeline.collect()
+    if slot:
+        slot.empty()
+    
+    image = results.get("image")
+    if image and image.done:
+        img_id = store_image(image_b64(image.value))
+    if img_id is None and placeholder:
+        img_id = store_image(placeholder)
+    
+    voice = results.get("voice")
+    if voice and voice.done and voice.value:
+        st.session_state.audio_to_play = voice.value
+    
+    # Index du message narrateur qui va être ajouté
+    index = len(st.session_state.history)
+    for kind, future in pipeline.late().items():
+        st.session_state.pending_media.append({'kind': kind, 'index': index, 'future': future})
+    
+    return img_id
+
+
+def queue_refine(response: GameResponse):
+    """
+    Lance la version affinée du dernier message en arrière-plan.
+    Elle remplacera le brouillon si le joueur est toujours sur ce tour.
+    """
+    if not IMAGE_OK or not st.session_state.images_enabled or not st.session_state.image_gen:
+        return
+    if not get_meter().policy().speculative:
+        return  # Budget : plus de travail spéculatif
+    if not st.session_state.history or not st.session_state.history[-1].get('image'):
+        return
+    
+    prompt = image_prompt_for(response)
+    if not prompt or len(prompt.strip()) < 5:
+        return
+    
+    future = get_executor().submit(bind(st.session_state.image_gen.generate_refined), prompt)
+    st.session_state.pending_media.append({
+        'kind': 'refine',
+        'index': len(st.session_state.history) - 1,
+        'future': future,
+    })
+
+
+def apply_late_media():
+    """
+    Rattache les résultats arrivés après le tour (brouillon, image affinée, narration),
+    uniquement si le joueur est toujours sur ce tour.
+    """
+    pending = st.session_state.pending_media
+    if not pending:
+        return
+    
+    history = st.session_state.history
+    current = len(history) - 1
+    still_pending = []
+    refined = False
+    
+    for item in pending:
+        if item['index'] != current:
+            continue  # Le joueur est passé au tour suivant
+        if not item['future'].done():
+            still_pending.append(item)
+            continue
+        try:
+            value = item['future'].result()
+        except Exception:
+            continue
+        
+        if item['kind'] == 'voice':
+            if value:
+                st.session_state.audio_to_play = value
+        elif item['kind'] == 'image' and refined:
+            continue  # Déjà remplacé par la version affinée
+        elif image_b64(value):
+            history[current]['image'] = store_image(image_b64(value))
+            refined = refined or item['kind'] == 'refine'
+            if st.session_state.journal and history[current]['image']:
+                try:
+                    st.session_state.journal.record_media(current, history[current]['image'])
+                except OSError:
+                    pass
+    
+    if refined:
+        still_pending = [p for p in still_pending if p['kind'] != 'image']
+    st.session_state.pending_media = still_pending
+
+
+def _watch_media():
+    """Relance la page dès qu'un média en retard est disponible."""
+    if any(item['future'].done() for item in st.session_state.pending_media):
+        st.rerun()
+
+
+# st.fragment (Streamlit >= 1.37) : sondage léger sans bloquer la page
+watch_media = st.fragment(run_every=1.0)(_watch_media) if hasattr(st, "fragment") else None
+
+
 # ============================================
 # UI COMPONENTS
 # ============================================
@@ -388,14 +761,15 @@ def show_inv():
         st.caption("Vide")
 
 
-def show_narrator(content: str, image_b64: Optional[str] = None):
+def show_narrator(content: str, image_id: Optional[str] = None, image_src: Optional[str] = None):
     """
     Affiche le message du narrateur avec image optionnelle en side-by-side.
     
     - Si image présente : colonnes [3, 1] (texte à gauche, image à droite)
     - Si pas d'image : texte sur toute la largeur
+    - image_src : image déjà encodée (data URI), affichée sans passer par le MediaStore
     """
-    if image_b64:
+    if image_id or image_src:
         # Mode Side-by-Side avec colonnes
         col_text, col_img = st.columns([3, 1])
         
@@ -405,7 +779,7 @@ def show_narrator(content: str, image_b64: Optional[str] = None):
         with col_img:
             st.markdown(f"""
             <div class="image-sidebar">
-                <img src="data:image/png;base64,{image_b64}" class="sidebar-image" alt="Illustration" />
+                <img src="{image_src or get_media_store().url(image_id)}" class="sidebar-image" alt="Illustration" />
             </div>
             """, unsafe_allow_html=True)
     else:
@@ -417,18 +791,123 @@ def show_player(content: str):
     st.markdown(f'<div class="player"><strong>⚔️ Vous:</strong> {content}</div>', unsafe_allow_html=True)
 
 
-def add_msg(content: str, narrator: bool = True, image_b64: Optional[str] = None):
-    """Ajoute un message à l'historique avec image optionnelle."""
+def show_compact_history(messages: list):
+    """Tours anciens : une ligne de texte par message, sans image (un seul bloc HTML)."""
+    lines = []
+    for msg in messages:
+        text = html.escape(msg['content'][:140])
+        if msg['narrator']:
+            thumb = "🖼️ " if msg.get('image') else ""
+            lines.append(f'<div>📜 {thumb}{text}</div>')
+        else:
+            lines.append(f'<div>⚔️ {text}</div>')
+    st.markdown(f'<div class="history-compact">{"".join(lines)}</div>', unsafe_allow_html=True)
+
+
+def show_history():
+    """
+    Historique virtualisé : les derniers tours sont rendus en entier,
+    les plus anciens en lignes compactes, chargés à la demande.
+    """
+    history = st.session_state.history
+    # Un tour = action du joueur + réponse du narrateur
+    start = max(0, len(history) - 2 * st.session_state.history_turns)
+    
+    if start > 0:
+        hidden_turns = (start + 1) // 2
+        if st.button(f"⬆️ Charger plus ({hidden_turns} tours plus anciens)", key="history_more"):
+            st.session_state.history_turns += HISTORY_WINDOW
+            st.rerun()
+        if start > HISTORY_COMPACT_MAX:
+            st.caption(f"… {start - HISTORY_COMPACT_MAX} messages plus anciens")
+        show_compact_history(history[max(0, start - HISTORY_COMPACT_MAX):start])
+    
+    for msg in history[start:]:
+        if msg['narrator']:
+            show_narrator(msg['content'], msg.get('image'))
+        else:
+            show_player(msg['content'])
+
+
+def add_msg(content: str, narrator: bool = True, image_id: Optional[str] = None):
+    """Ajoute un message à l'historique avec image optionnelle (identifiant MediaStore)."""
     st.session_state.history.append({
         'content': content,
         'narrator': narrator,
-        'image': image_b64
+        'image': image_id
     })
 
 # ============================================
 # SIDEBAR
 # ============================================
 
+def show_turn_latency():
+    """Latence des tours : réelle (réponse du narrateur) et perçue (premier retour affiché)."""
+    if st.session_state.turn_slo is None:
+        return
+    report = st.session_state.turn_slo.report()
+    if report["turns"]:
+        st.caption(
+            f"⏱️ Tour : réel {report['actual_avg']:.1f}s • perçu {report['perceived_avg']:.1f}s "
+            f"• masqués {report['masked_rate']:.0%}"
+        )
+
+
+def show_usage():
+    """Tokens consommés par la session et palier de budget."""
+    meter = get_meter()
+    totals = meter.totals()
+    if not totals["calls"]:
+        return
+    st.caption(f"🪙 {totals['total_tokens']:,} / {totals['budget']:,} tokens • ~{totals['cost']:.3f} $".replace(",", " "))
+    policy = meter.policy()
+    if policy.level:
+        st.caption(f"⚠️ Mode économie : {policy.label}")
+
+
+def show_session_memory():
+    """Mémoire résidente de la session et sessions du processus (chaudes / froides)."""
+    store = get_session_store()
+    resident = store.measure(st.session_state.session_id)
+    sessions = store.report()
+    cold = sum(1 for r in sessions if r["tier"] == "froid")
+    st.caption(
+        f"🧠 Session : {resident / 1024:.0f} Ko en mémoire • "
+        f"{len(sessions) - cold} active(s), {cold} en veille"
+    )
+    if st.session_state.rehydrate_ms is not None:
+        st.caption(f"♻️ Session rechargée en {st.session_state.rehydrate_ms:.0f} ms")
+        st.session_state.rehydrate_ms = None
+
+
+def _span_detail(attrs: dict) -> str:
+    if attrs.get("prompt_tokens") is not None:
+        return f" · {attrs['prompt_tokens']}+{attrs.get('completion_tokens') or 0} tokens"
+    if attrs.get("bytes"):
+        return f" · {attrs['bytes'] / 1024:.0f} Ko"
+    if attrs.get("backend"):
+        return f" · {attrs['backend']}"
+    return ""
+
+
+def show_trace_panel():
+    """Répartition du dernier tour par étape (spans terminés jusqu'ici)."""
+    if not st.session_state.last_trace:
+        return
+    rows = breakdown(get_tracer().trace(st.session_state.last_trace))
+    if not rows:
+        return
+    with st.expander("🔎 Détail du dernier tour"):
+        lines = [
+            f"{'  ' * row['depth']}{row['name']:<{24 - 2 * row['depth']}} "
+            f"{row['duration'] * 1000:6.0f} ms{_span_detail(row['attrs'])}"
+            for row in rows
+        ]
+        st.code("\n".join(lines), language=None)
+        if st.session_state.last_render is not None:
+            st.caption(f"🖥️ Rendu de la page : {st.session_state.last_render * 1000:.0f} ms")
+
+
 def show_voice_controls():
     st.markdown('<div class="section-title">🎙️ Mode Vocal</div>', unsafe_allow_html=True)
     
@@ -458,6 +937,13 @@ def show_voice_controls():
             st.session_state.voice_key = new_key
             if st.session_state.audio_mgr:
                 st.session_state.audio_mgr.set_voice(new_key)
+        
+        profiles = list(AUDIO_PROFILE_LABELS)
+        st.session_state.audio_profile = st.selectbox(
+            "Débit audio", profiles,
+            index=profiles.index(st.session_state.audio_profile),
+            format_func=AUDIO_PROFILE_LABELS.get, key="audio_profile_sel", label_visibility="collapsed"
+        )
     
     st.markdown("---")
 
@@ -500,17 +986,17 @@ def show_sidebar():
             color:{theme.accent_primary}; margin-bottom:15px;">⚔️ HERO IA</div>
         """, unsafe_allow_html=True)
         
-        # BOUTON SAUVEGARDER (démo)
+        # BOUTON SAUVEGARDER : chaque tour est déjà journalisé, on force un instantané
         if st.session_state.game_active:
             if st.button("💾 Sauvegarder", use_container_width=True, type="primary"):
-                st.session_state['save_message'] = True
-                st.rerun()
-            
-            # Message de sauvegarde
-            if st.session_state.get('save_message'):
-                st.markdown('<div class="save-success">✅ Partie sauvegardée !</div>', unsafe_allow_html=True)
-                time.sleep(2)
-                st.session_state['save_message'] = False
+                elapsed = save_game()
+                if elapsed is not None:
+                    st.markdown(
+                        f'<div class="save-success">✅ Partie sauvegardée ({elapsed * 1000:.0f} ms)</div>',
+                        unsafe_allow_html=True
+                    )
+                else:
+                    st.error("❌ Sauvegarde impossible")
         
         st.markdown("---")
         
@@ -524,8 +1010,17 @@ def show_sidebar():
                 st.markdown(f"**{gt.icon} {gt.name}**")
             show_hp()
             show_inv()
+            show_turn_latency()
+            show_trace_panel()
+            show_usage()
+            show_session_memory()
             st.markdown("---")
             if st.button("🚪 Abandonner", use_container_width=True):
+                if st.session_state.journal:
+                    try:
+                        st.session_state.journal.record_end("abandoned")
+                    except OSError:
+                        pass
                 reset_game()
                 st.rerun()
         
@@ -534,6 +1029,7 @@ def show_sidebar():
         if AUDIO_OK: status.append("🔊")
         if IMAGE_OK: status.append("🖼️")
         if MIC_OK: status.append("🎤")
+        if SERVICE_URL: status.append("🌐")
         st.caption(f"v12 Final • {' '.join(status)}")
 
 # ============================================
@@ -554,8 +1050,12 @@ def apply_inv(response: GameResponse):
 
 
 def start_game(theme: GameTheme):
+    if get_meter().policy().blocked:
+        st.error(SystemMessages.BUDGET_EXHAUSTED)
+        return
     try:
-        agent = GameAgent()
+        agent = make_agent(get_meter())
+        agent.apply_budget(get_meter().policy())
         st.session_state.agent = agent
         
         stats = agent.roll_initial_stats()
@@ -567,73 +1067,297 @@ def start_game(theme: GameTheme):
         st.session_state.inventory = list(initial_inv)
         
         st.session_state.history = []
+        st.session_state.history_turns = HISTORY_WINDOW
         st.session_state.game_theme = theme
         st.session_state.audio_to_play = None
         st.session_state.mic_counter = 0
         st.session_state.last_audio_id = None
+        get_submissions().clear()
         
-        response = agent.initiate_game(theme, initial_inv)
+        with trace_span("game.start", new_trace=True, theme=theme.id) as root:
+            if root:
+                st.session_state.last_trace = root.trace_id
+            response = agent.initiate_game(theme, initial_inv)
+            
+            if not response.is_error:
+                # Image et narration en parallèle
+                with trace_span("turn.media"):
+                    img_id = start_turn_media(response)
         
         if not response.is_error:
-            # Génère l'image
-            img_b64 = None
-            if st.session_state.images_enabled and IMAGE_OK:
-                prompt = getattr(response, 'image_prompt', None) or response.scene_description
-                with st.spinner("🎨 Génération..."):
-                    img_b64 = generate_image(prompt, theme.id)
-            
             # Ajoute avec l'image
-            add_msg(response.story, True, img_b64)
+            add_msg(response.story, True, img_id)
+            queue_refine(response)
             
             st.session_state.actions = response.suggested_actions
             st.session_state.scene = response.scene_description
+            prepare_fillers()
             st.session_state.game_active = True
             st.session_state.game_over = False
             st.session_state.victory = False
             
             apply_inv(response)
-            speak(response.story)
+            
+            try:
+                st.session_state.journal = GameJournal.create(
+                    capture_state(), holder=st.session_state.session_id
+                )
+            except OSError:
+                st.session_state.journal = None
         else:
             st.error(response.error_message)
     except Exception as e:
         st.error(f"Erreur: {e}")
 
 
-def do_action(action: str, suggested: bool = False):
-    if not st.session_state.agent or not st.session_state.game_active:
+def capture_state() -> GameState:
+    """État complet de la partie en cours (copie : peut être écrite depuis un autre thread)."""
+    agent = st.session_state.agent
+    gt = st.session_state.game_theme
+    return GameState(
+        game_id=st.session_state.journal.game_id if st.session_state.journal else new_game_id(),
+        theme_id=gt.id if gt else "",
+        owner=st.session_state.owner_id,
+        hp=st.session_state.hp,
+        hp_max=st.session_state.hp_max,
+        inventory=list(st.session_state.inventory),
+        history=deepcopy(st.session_state.history),
+        actions=list(st.session_state.actions),
+        scene=st.session_state.scene,
+        game_active=st.session_state.game_active,
+        game_over=st.session_state.game_over,
+        victory=st.session_state.victory,
+        agent=deepcopy(agent.export_state()) if agent else {},
+    )
+
+
+def journal_turn(new_messages: list, hp_before: int, inv_before: list):
+    """Ajoute le tour au journal ; l'instantané périodique est écrit hors du script."""
+    journal = st.session_state.journal
+    if journal is None:
         return
+    delta = inventory_delta(inv_before, st.session_state.inventory)
+    status = "lost" if st.session_state.game_over else "won" if st.session_state.victory else "playing"
+    try:
+        due = journal.record_turn(
+            st.session_state.agent.export_state(), new_messages,
+            st.session_state.hp - hp_before, delta["add"], delta["remove"],
+            st.session_state.actions, st.session_state.scene, status,
+        )
+        if due:
+            get_executor().submit(journal.snapshot, capture_state(), journal.events)
+    except JournalLocked:
+        journal_lost()
+    except OSError:
+        pass  # Disque plein / lecture seule : la partie continue sans sauvegarde
+
+
+def journal_lost():
+    """Bail expiré et repris par une autre session : celle-ci n'écrit plus dans le journal."""
+    st.session_state.journal = None
+    st.warning("⚠️ Partie reprise dans un autre onglet : sauvegarde automatique désactivée ici")
+
+
+def save_game() -> Optional[float]:
+    """Instantané immédiat. Retourne sa durée (s), None en cas d'échec."""
+    journal = st.session_state.journal
+    if journal is None:
+        return None
+    try:
+        return journal.snapshot(capture_state())
+    except OSError:
+        return None
+
+
+def resume_game(game_id: str) -> bool:
+    """Reprend une partie sauvegardée : état reconstruit depuis le journal, sans appel au LLM."""
+    start = time.perf_counter()
+    try:
+        journal, state = GameJournal.load(game_id, holder=st.session_state.session_id,
+                                          owner=st.session_state.owner_id)
+    except (OSError, ValueError, KeyError) as e:
+        st.error(f"❌ Sauvegarde illisible : {e}")
+        return False
+    if state.owner != st.session_state.owner_id:
+        st.error("❌ Sauvegarde introuvable")
+        return False
+    try:
+        if not journal.acquire():
+            st.warning("⏳ Partie déjà ouverte dans une autre session : réessayez une fois l'onglet fermé")
+            return False
+    except OSError as e:
+        st.error(f"❌ Sauvegarde illisible : {e}")
+        return False
     
-    # Ajoute l'action du joueur (sans image)
-    add_msg(action, False, None)
+    theme = ThemeLibrary.get_theme(state.theme_id)
+    try:
+        agent = make_agent(get_meter())
+    except Exception as e:
+        st.error(f"Erreur: {e}")
+        return False
+    agent.load_state(theme, state.agent)
     
-    inv = list(st.session_state.inventory)
+    reset_game()
+    st.session_state.agent = agent
+    st.session_state.journal = journal
+    st.session_state.game_theme = theme
+    st.session_state.hp = state.hp
+    st.session_state.hp_max = state.hp_max
+    st.session_state.inventory = state.inventory
+    st.session_state.history = state.history
+    st.session_state.actions = state.actions
+    st.session_state.scene = state.scene
+    st.session_state.game_active = state.game_active
+    st.session_state.game_over = state.game_over
+    st.session_state.victory = state.victory
+    st.session_state.mic_counter = len(state.history)
+    if theme and IMAGE_OK:
+        prepare_image_gen(theme.id)
+    prepare_fillers()
+    st.session_state['resume_ms'] = (time.perf_counter() - start) * 1000
+    return True
+
+
+def get_meter() -> UsageMeter:
+    if st.session_state.usage is None:
+        st.session_state.usage = UsageMeter(st.session_state.session_id)
+    return st.session_state.usage
+
+
+def get_fillers() -> FillerBank:
+    if st.session_state.fillers is None:
+        st.session_state.fillers = FillerBank()
+    return st.session_state.fillers
+
+
+def get_turn_slo() -> LatencySLO:
+    if st.session_state.turn_slo is None:
+        st.session_state.turn_slo = LatencySLO()
+    return st.session_state.turn_slo
+
+
+def prepare_fillers():
+    """Lignes d'attente de la nouvelle scène, pré-synthétisées si la voix est active."""
+    audio_mgr = st.session_state.audio_mgr
+    speculative = get_meter().policy().speculative
+    synthesize = audio_mgr.start_speech if st.session_state.voice_mode and audio_mgr and speculative else None
+    get_fillers().prepare(st.session_state.game_theme, st.session_state.scene, synthesize)
+
+
+def wait_turn(submission: Submission) -> GameResponse:
+    """
+    Attend la réponse du narrateur. Au-delà du seuil, affiche (et lit) une ligne
+    d'attente dans un emplacement temporaire : l'état du jeu n'est pas modifié.
+    """
+    placeholder = st.empty()
+    fillers = get_fillers()
+    
+    def show_filler(n: int):
+        line = fillers.next_line()
+        if not line:
+            return
+        with placeholder.container():
+            st.markdown(f'<div class="filler-line">⏳ {html.escape(line)}</div>', unsafe_allow_html=True)
+            # Lue une seule fois : une nouvelle ligne couperait la précédente
+            keys = fillers.audio_keys(line) if n == 0 and st.session_state.voice_mode else None
+            if keys:
+                render_audio_playlist(
+                    st.session_state.audio_mgr.segment_urls(keys),
+                    profile=st.session_state.audio_profile,
+                )
     
+    try:
+        return get_turn_slo().wait(submission.future, show_filler, submission.created_at)
+    finally:
+        placeholder.empty()
+
+
+def get_submissions() -> SubmissionRegistry:
+    if st.session_state.submissions is None:
+        st.session_state.submissions = SubmissionRegistry()
+    return st.session_state.submissions
+
+
+def _run_step(agent: GameAgent, action: str, inv: list, suggested: bool) -> GameResponse:
     if suggested:
-        response = st.session_state.agent.step_with_suggested_action(action, inv)
-    else:
-        response = st.session_state.agent.step(action, inv)
+        return agent.step_with_suggested_action(action, inv)
+    return agent.step(action, inv)
+
+
+def do_action(action: str, suggested: bool = False, kind: Optional[str] = None):
+    """
+    Soumet un tour. La clé d'idempotence (contenu + numéro de tour) fait qu'un
+    double-clic ou un rerun rejoué récupère le tour en cours au lieu d'en relancer un.
+    """
+    if not st.session_state.agent or not st.session_state.game_active:
+        return
+    
+    policy = get_meter().policy()
+    if policy.blocked:
+        st.error(SystemMessages.BUDGET_EXHAUSTED)
+        return
+    st.session_state.agent.apply_budget(policy)
+    
+    kind = kind or ("suggested" if suggested else "text")
+    # Le tour = taille de l'historique : inchangée tant que le résultat n'est pas appliqué
+    turn = len(st.session_state.history)
+    with trace_span("turn", new_trace=True, kind=kind, turn=turn, chars=len(action)) as root:
+        if root:
+            st.session_state.last_trace = root.trace_id
+        submission, _ = get_submissions().submit(
+            idempotency_key(kind, action, turn), turn, action, kind, get_executor(),
+            bind(_run_step), st.session_state.agent, action, list(st.session_state.inventory), suggested
+        )
+        if submission.action != action:
+            st.info(f"⏳ Action précédente en cours : « {submission.action} »")
+        apply_submission(submission)
+
+
+def resume_turn():
+    """Applique un tour soumis dont le script a été interrompu (rerun pendant l'attente)."""
+    if not st.session_state.game_active or st.session_state.submissions is None:
+        return
+    submission = st.session_state.submissions.pending(len(st.session_state.history))
+    if submission is not None:
+        with trace_span("turn.resume", new_trace=True, turn=submission.turn) as root:
+            if root:
+                st.session_state.last_trace = root.trace_id
+            apply_submission(submission)
+
+
+def apply_submission(submission: Submission):
+    try:
+        with trace_span("turn.wait_llm"):
+            response = wait_turn(submission)
+    except Exception as e:
+        # Oubliée du registre : rejouer l'action relance le tour
+        if get_submissions().claim(submission, failed=True):
+            st.error(f"Erreur: {e}")
+        return
+    
+    # Une seule application par tour, même si plusieurs reruns attendaient ce résultat
+    if not get_submissions().claim(submission):
+        return
+    
+    first_new = len(st.session_state.history)
+    hp_before, inv_before = st.session_state.hp, list(st.session_state.inventory)
+    
+    # Ajoute l'action du joueur (sans image)
+    add_msg(submission.action, False, None)
     
     if not response.is_error:
-        # Génère l'image
-        img_b64 = None
-        if st.session_state.images_enabled and IMAGE_OK:
-            prompt = getattr(response, 'image_prompt', None) or response.scene_description
-            img_b64 = generate_image(prompt, st.session_state.game_theme.id if st.session_state.game_theme else None)
+        # Image et narration en parallèle
+        with trace_span("turn.media"):
+            img_id = start_turn_media(response)
         
         # Ajoute la réponse du narrateur avec l'image
-        add_msg(response.story, True, img_b64)
-        
-        if response.hp_change:
-            st.session_state.hp = clamp(st.session_state.hp + response.hp_change, 0, st.session_state.hp_max)
-        
-        if response.input_quality == "valid" and response.inventory_validated:
-            apply_inv(response)
-        
-        st.session_state.actions = response.suggested_actions
-        st.session_state.scene = response.scene_description
-        st.session_state.mic_counter += 1
+        add_msg(response.story, True, img_id)
         
-        speak(response.story)
+        with trace_span("turn.apply_state", hp_change=response.hp_change,
+                        inventory_add=len(response.inventory_add),
+                        inventory_remove=len(response.inventory_remove)):
+            apply_state(response)
+        queue_refine(response)
         
         if response.game_status == "lost" or st.session_state.hp <= 0:
             st.session_state.game_over = True
@@ -643,9 +1367,27 @@ def do_action(action: str, suggested: bool = False):
             st.session_state.game_active = False
     else:
         st.error(response.error_message)
+    
+    journal_turn(st.session_state.history[first_new:], hp_before, inv_before)
+
+
+def apply_state(response: GameResponse):
+    """PV, inventaire, actions et scène du tour."""
+    if response.hp_change:
+        st.session_state.hp = clamp(st.session_state.hp + response.hp_change, 0, st.session_state.hp_max)
+    
+    if response.input_quality == "valid" and response.inventory_validated:
+        apply_inv(response)
+    
+    st.session_state.actions = response.suggested_actions
+    st.session_state.scene = response.scene_description
+    prepare_fillers()
+    st.session_state.mic_counter += 1
 
 
 def reset_game():
+    if st.session_state.agent is not None:
+        st.session_state.agent.reset()  # Service : libère la session distante
     st.session_state.agent = None
     st.session_state.game_active = False
     st.session_state.game_over = False
@@ -654,12 +1396,19 @@ def reset_game():
     st.session_state.hp_max = 20
     st.session_state.inventory = []
     st.session_state.history = []
+    st.session_state.history_turns = HISTORY_WINDOW
     st.session_state.actions = []
     st.session_state.scene = ''
     st.session_state.game_theme = None
     st.session_state.audio_to_play = None
     st.session_state.mic_counter = 0
     st.session_state.last_audio_id = None
+    st.session_state.pending_media = []
+    st.session_state.fillers = None
+    if st.session_state.journal is not None:
+        st.session_state.journal.release()
+    st.session_state.journal = None
+    get_submissions().clear()
 
 # ============================================
 # SCREENS
@@ -703,6 +1452,25 @@ def screen_welcome():
         if st.button("🎲 Aventure Aléatoire", use_container_width=True, type="primary"):
             start_game(ThemeLibrary.get_random_theme())
             st.rerun()
+    
+    show_saved_games()
+
+
+def show_saved_games():
+    """Parties en cours sauvegardées (reprise instantanée depuis le journal)."""
+    saves = list_saves(st.session_state.owner_id)
+    if not saves:
+        return
+    st.markdown("---")
+    st.markdown("### 📂 Reprendre une partie")
+    for save in saves:
+        gt = ThemeLibrary.get_theme(save.theme_id)
+        label = f"{gt.icon} {gt.name}" if gt else save.theme_id
+        when = time.strftime("%d/%m %H:%M", time.localtime(save.updated_at))
+        if st.button(f"▶️ {label} — tour {save.turns} • ❤️ {save.hp}/{save.hp_max} • {when}",
+                     key=f"resume_{save.game_id}", use_container_width=True):
+            if resume_game(save.game_id):
+                st.rerun()
 
 
 def screen_game():
@@ -710,15 +1478,22 @@ def screen_game():
     if st.session_state.scene:
         st.markdown(f'<div class="scene-badge">🎬 {st.session_state.scene}</div>', unsafe_allow_html=True)
     
+    if st.session_state.get('resume_ms') is not None:
+        st.caption(f"📂 Partie reprise en {st.session_state.pop('resume_ms'):.0f} ms")
+    
+    # Tour soumis puis interrompu par un rerun : appliqué maintenant (une seule fois)
+    resume_turn()
+    
+    # Médias arrivés après le tour (image affinée, narration en retard)
+    apply_late_media()
+    if st.session_state.pending_media and watch_media:
+        watch_media()
+    
     # Audio
     play_audio()
     
-    # Historique avec images intégrées
-    for msg in st.session_state.history:
-        if msg['narrator']:
-            show_narrator(msg['content'], msg.get('image'))
-        else:
-            show_player(msg['content'])
+    # Historique (derniers tours en entier)
+    show_history()
     
     st.markdown("---")
     
@@ -728,7 +1503,14 @@ def screen_game():
         st.warning(SystemMessages.BLOCKED_WARNING)
     
     # Zone Vocale
-    if st.session_state.voice_mode and MIC_OK and not blocked:
+    if st.session_state.voice_mode and voice_stream_panel and st.session_state.audio_mgr and not blocked:
+        st.markdown("### 🎤 Commande Vocale")
+        st.markdown('<div class="mic-zone">', unsafe_allow_html=True)
+        st.caption("Parlez : le texte s'affiche pendant l'enregistrement")
+        voice_stream_panel()
+        st.markdown('</div>', unsafe_allow_html=True)
+        st.markdown("---")
+    elif st.session_state.voice_mode and MIC_OK and not blocked:
         st.markdown("### 🎤 Commande Vocale")
         st.markdown('<div class="mic-zone">', unsafe_allow_html=True)
         st.caption("Cliquez pour parler")
@@ -745,7 +1527,7 @@ def screen_game():
         st.markdown('</div>', unsafe_allow_html=True)
         
         if audio and audio.get('bytes'):
-            audio_id = id(audio['bytes'])
+            audio_id = audio_digest(audio['bytes'])
             if audio_id != st.session_state.last_audio_id:
                 st.session_state.last_audio_id = audio_id
                 
@@ -758,7 +1540,7 @@ def screen_game():
                     else:
                         st.success(f'🎤 "{text}"')
                     time.sleep(0.3)
-                    do_action(text, suggested=False)
+                    do_action(text, kind="voice")
                     st.rerun()
                 else:
                     st.error("❌ Transcription échouée")
@@ -830,17 +1612,21 @@ def screen_victory():
 
 def main():
     init_state()
-    load_css()
-    show_sidebar()
-    
-    if st.session_state.game_over:
-        screen_gameover()
-    elif st.session_state.victory:
-        screen_victory()
-    elif st.session_state.game_active:
-        screen_game()
-    else:
-        screen_welcome()
+    with hot_session():
+        load_css()
+        show_sidebar()
+        
+        with trace_span("render", new_trace=True) as render:
+            if st.session_state.game_over:
+                screen_gameover()
+            elif st.session_state.victory:
+                screen_victory()
+            elif st.session_state.game_active:
+                screen_game()
+            else:
+                screen_welcome()
+        if render:
+            st.session_state.last_render = render.duration
 
 
 if __name__ == "__main__":
@@ -6,12 +6,32 @@ Composants audio custom pour Streamlit (version corrigée)
 - Enregistreur audio avec st.markdown + JavaScript
 - Lecteur audio avec autoplay
 - Compatible toutes versions Streamlit
+
+L'audio n'est jamais intégré en base64 : les lecteurs pointent vers la route
+statique (requêtes Range : lecture dès les premiers octets, seek sans
+re-télécharger, fichiers adressés par contenu).
 """
 
 import streamlit as st
-import base64
+import streamlit.components.v1 as components
+import html
+import json
 import uuid
-from typing import Optional
+from pathlib import Path
+from typing import Any, Dict, Optional, List
+
+from media_store import MediaStore
+
+# Enregistreur en continu : composant bidirectionnel (HTML/JS sans build)
+STREAM_RECORDER_OK = False
+_stream_recorder = None
+try:
+    _stream_recorder = components.declare_component(
+        "hero_stream_recorder", path=str(Path(__file__).parent / "stream_recorder")
+    )
+    STREAM_RECORDER_OK = True
+except Exception:
+    pass
 
 
 def get_audio_recorder_html() -> str:
@@ -129,13 +149,15 @@ def get_audio_recorder_html() -> str:
                         audio: {{
                             echoCancellation: true,
                             noiseSuppression: true,
-                            sampleRate: 44100
+                            channelCount: 1,
+                            sampleRate: 16000
                         }}
                     }});
                     
                     audioChunks_{unique_id} = [];
                     mediaRecorder_{unique_id} = new MediaRecorder(stream, {{
-                        mimeType: 'audio/webm;codecs=opus'
+                        mimeType: 'audio/webm;codecs=opus',
+                        audioBitsPerSecond: 24000
                     }});
                     
                     mediaRecorder_{unique_id}.ondataavailable = (e) => {{
@@ -225,12 +247,24 @@ def render_audio_recorder() -> None:
     st.markdown(get_audio_recorder_html(), unsafe_allow_html=True)
 
 
-def get_audio_player_html(audio_base64: str, autoplay: bool = True) -> str:
+def audio_url(audio_bytes: bytes, store: Optional[MediaStore] = None) -> str:
+    """
+    Écrit l'audio dans le media store et retourne son URL statique.
+    
+    Args:
+        audio_bytes: Audio MP3 complet
+        store: Media store (par défaut : static/media)
+    """
+    store = store or MediaStore()
+    return store.url(store.put(audio_bytes, "audio/mpeg"))
+
+
+def get_audio_player_html(src: str, autoplay: bool = True) -> str:
     """
     Retourne le HTML pour un lecteur audio avec animation.
     
     Args:
-        audio_base64: Audio encodé en base64
+        src: URL de l'audio (route statique, voir audio_url)
         autoplay: Lecture automatique
     """
     
@@ -323,8 +357,8 @@ def get_audio_player_html(audio_base64: str, autoplay: bool = True) -> str:
             🔊 Le Narrateur parle...
         </div>
         
-        <audio id="heroAudioPlayer-{unique_id}" {autoplay_attr} style="display: none;">
-            <source src="data:audio/mpeg;base64,{audio_base64}" type="audio/mpeg">
+        <audio id="heroAudioPlayer-{unique_id}" {autoplay_attr} preload="auto" style="display: none;">
+            <source src="{html.escape(src, quote=True)}" type="audio/mpeg">
         </audio>
         
         <div class="hero-audio-controls" id="heroControls-{unique_id}" style="display: none;">
@@ -369,30 +403,157 @@ def get_audio_player_html(audio_base64: str, autoplay: bool = True) -> str:
     '''
 
 
-def render_audio_player(audio_base64: str, autoplay: bool = True) -> None:
+def render_audio_player(src: str, autoplay: bool = True) -> None:
     """
-    Affiche le lecteur audio avec animation.
+    Affiche le lecteur audio avec animation (iframe de composant : le JS s'exécute).
     
     Args:
-        audio_base64: Audio encodé en base64
+        src: URL de l'audio (route statique, voir audio_url)
         autoplay: Lecture automatique
     """
-    st.markdown(get_audio_player_html(audio_base64, autoplay), unsafe_allow_html=True)
+    components.html(get_audio_player_html(src, autoplay), height=130)
 
 
-def render_simple_audio_autoplay(audio_base64: str) -> None:
+def render_simple_audio_autoplay(src: str) -> None:
     """
     Joue l'audio automatiquement (lecteur invisible).
     
     Args:
-        audio_base64: Audio encodé en base64
+        src: URL de l'audio (route statique, voir audio_url)
     """
-    html = f'''
-    <audio autoplay style="display:none;">
-        <source src="data:audio/mpeg;base64,{audio_base64}" type="audio/mpeg">
+    player = f'''
+    <audio autoplay preload="auto" style="display:none;">
+        <source src="{html.escape(src, quote=True)}" type="audio/mpeg">
     </audio>
     '''
-    st.markdown(html, unsafe_allow_html=True)
+    st.markdown(player, unsafe_allow_html=True)
+
+
+# Ordre d'essai des variantes par profil client (MP3 = secours universel)
+AUDIO_PROFILES = {
+    "eco": ["opus12", "mp3"],        # Connexion lente ou économie de données
+    "standard": ["opus24", "mp3"],
+    "mp3": ["mp3"],                  # Navigateurs sans Opus/WebM
+}
+
+
+def get_audio_playlist_html(segments: List[Dict[str, str]], autoplay: bool = True,
+                            profile: str = "auto") -> str:
+    """
+    Retourne le HTML d'un lecteur qui enchaîne les segments de narration.
+    Un segment pas encore synthétisé (404) est réessayé jusqu'à ce qu'il arrive :
+    la lecture commence dès le premier segment prêt.
+    
+    Args:
+        segments: Pour chaque segment, URL de chaque variante ({"mp3": ..., "opus24": ...})
+        autoplay: Lecture automatique
+        profile: "auto" (codecs et connexion du navigateur) ou une clé de AUDIO_PROFILES
+    """
+    
+    unique_id = str(uuid.uuid4())[:8]
+    
+    return f'''
+    <div style="font-family: sans-serif; font-size: 0.9rem; color: #a0a0cc; padding: 4px 0;">
+        <span id="heroPlaylistStatus-{unique_id}">🔊 Le Narrateur parle...</span>
+        <button id="heroPlaylistReplay-{unique_id}" style="display: none; margin-left: 10px;
+            padding: 4px 12px; border-radius: 8px; border: 1px solid rgba(139, 92, 246, 0.4);
+            background: rgba(139, 92, 246, 0.1); color: #a0a0cc; cursor: pointer;">🔄 Réécouter</button>
+        <audio id="heroPlaylistAudio-{unique_id}" preload="auto"></audio>
+    </div>
+    
+    <script>
+    (function() {{
+        const segments = {json.dumps(segments)};
+        const profiles = {json.dumps(AUDIO_PROFILES)};
+        const audio = document.getElementById('heroPlaylistAudio-{unique_id}');
+        const status = document.getElementById('heroPlaylistStatus-{unique_id}');
+        const replay = document.getElementById('heroPlaylistReplay-{unique_id}');
+        const MAX_RETRIES = 60;
+        let index = 0;
+        let retries = 0;
+        let variant = 0;
+        
+        // Profil client : Opus si le navigateur le décode, débit réduit si la connexion est lente
+        function autoProfile() {{
+            if (!audio.canPlayType('audio/webm; codecs="opus"')) return 'mp3';
+            const c = navigator.connection || {{}};
+            if (c.saveData || ['slow-2g', '2g', '3g'].includes(c.effectiveType)) return 'eco';
+            return 'standard';
+        }}
+        const requested = {json.dumps(profile)};
+        const order = (profiles[requested === 'auto' ? autoProfile() : requested] || ['mp3'])
+            .filter((name) => segments.length && name in segments[0]);
+        if (!order.length) order.push('mp3');
+        
+        function playCurrent() {{
+            if (index >= segments.length) {{
+                status.textContent = '✅ Narration terminée';
+                replay.style.display = 'inline-block';
+                return;
+            }}
+            audio.src = segments[index][order[variant]];
+            audio.play().catch(() => {{}});
+        }}
+        
+        audio.addEventListener('ended', () => {{ index++; retries = 0; variant = 0; playCurrent(); }});
+        audio.addEventListener('error', () => {{
+            // Variante pas encore encodée : variante suivante (jusqu'au MP3)
+            if (variant < order.length - 1) {{
+                variant++; playCurrent();
+            // Segment pas encore prêt : on réessaie un peu plus tard
+            }} else if (retries++ < MAX_RETRIES) {{
+                variant = 0;
+                setTimeout(playCurrent, 250);
+            }} else {{
+                index++; retries = 0; variant = 0; playCurrent();
+            }}
+        }});
+        replay.addEventListener('click', () => {{
+            index = 0; retries = 0; variant = 0;
+            replay.style.display = 'none';
+            status.textContent = '🔊 Le Narrateur parle...';
+            playCurrent();
+        }});
+        
+        if ({'true' if autoplay else 'false'}) {{ playCurrent(); }}
+    }})();
+    </script>
+    '''
+
+
+def render_audio_playlist(segments: List[Dict[str, str]], autoplay: bool = True,
+                          profile: str = "auto") -> None:
+    """
+    Affiche le lecteur de narration segmentée (iframe de composant : le JS s'exécute).
+    
+    Args:
+        segments: URLs des variantes de chaque segment, dans l'ordre
+        autoplay: Lecture automatique
+        profile: Profil de débit ("auto", "eco", "standard", "mp3")
+    """
+    components.html(get_audio_playlist_html(segments, autoplay, profile), height=40)
+
+
+def render_streaming_recorder(key: str, acked_rec: Optional[str] = None, acked: Optional[List[int]] = None,
+                              partial: str = "", max_seconds: int = 25) -> Optional[Dict[str, Any]]:
+    """
+    Enregistreur qui envoie l'audio par segments pendant que le joueur parle.
+    
+    Args:
+        key: Clé du composant (sa valeur est aussi dans st.session_state[key])
+        acked_rec / acked: Enregistrement et segments déjà reçus par le serveur
+        partial: Texte partiel à afficher sous le bouton
+        max_seconds: Durée maximale d'enregistrement
+    
+    Returns:
+        Dernier message de l'enregistreur (voir streaming_stt), ou None
+    """
+    if not STREAM_RECORDER_OK:
+        return None
+    return _stream_recorder(
+        acked_rec=acked_rec, acked=acked or [], partial=partial,
+        max_seconds=max_seconds, key=key, default=None
+    )
 
 
 def render_voice_indicator(is_speaking: bool = True) -> None:
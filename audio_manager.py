@@ -1,19 +1,29 @@
 # ============================================
 # HERO IA - Audio Manager (Version Stable)
-# TTS : gTTS (Google - Simple & Gratuit)
-# STT : Groq Whisper (Fonctionne déjà ✅)
+# TTS : moteurs interchangeables (gTTS, edge-tts, espeak-ng / piper hors ligne)
+# STT : Groq Whisper + Whisper local (CPU) en secours
 # ============================================
 
 import os
-import io
 import re
-import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, List
-from dataclasses import dataclass
+from typing import Optional, Dict, List, Any
+from dataclasses import dataclass, field
 
 from dotenv import load_dotenv
 
+from tts_cache import TTSSegmentCache, VARIANTS, get_shared_cache
+from audio_preprocess import FFMPEG_OK, prepare_for_stt, encode_opus_webm
+from backend_selector import BackendSelector, QUALITY_DRAFT, QUALITY_STANDARD
+from tts_backends import TTSBackend, default_tts_backends, mp3_duration
+from idempotency import audio_digest
+from stt_backends import STTBackend, GROQ_OK, FASTER_WHISPER_OK, default_stt_backends, route
+from tracing import traced, annotate, bind
+
 # Charge .env
 env_path = Path(__file__).parent / ".env"
 load_dotenv(env_path)
@@ -22,33 +32,8 @@ load_dotenv(env_path)
 # VÉRIFICATION DES SERVICES
 # ============================================
 
-# gTTS (Google TTS)
-GTTS_OK = False
-try:
-    from gtts import gTTS
-    GTTS_OK = True
-    print("✅ gTTS (Google TTS - Gratuit) configuré")
-except ImportError:
-    print("⚠️ gTTS non installé : pip install gtts")
-
-# Groq Whisper (STT)
-GROQ_OK = False
-groq_client = None
-try:
-    from groq import Groq
-    
-    api_key = os.getenv("GROQ_API_KEY")
-    if api_key:
-        groq_client = Groq(api_key=api_key)
-        GROQ_OK = True
-        print("✅ Groq Whisper (STT) configuré")
-    else:
-        print("⚠️ GROQ_API_KEY manquante")
-except ImportError:
-    print("⚠️ groq non installé : pip install groq")
-
-# Pour compatibilité avec app.py
-ELEVENLABS_OK = GTTS_OK and GROQ_OK
+# Au moins un moteur de synthèse disponible
+TTS_OK = bool(default_tts_backends())
 
 
 # ============================================
@@ -61,32 +46,85 @@ class AudioResult:
     audio_bytes: Optional[bytes] = None
     text: Optional[str] = None
     error: Optional[str] = None
+    backend: Optional[str] = None
+
+
+@dataclass
+class SpeechJob:
+    """Narration découpée en segments synthétisés en parallèle."""
+    keys: List[str]
+    futures: List[Future]
+    started_at: float = field(default_factory=time.perf_counter)
+    
+    def wait_first(self, timeout: float = 15.0) -> Optional[float]:
+        """Attend le premier segment. Retourne le temps jusqu'au premier audio (s)."""
+        if not self.futures:
+            return None
+        try:
+            if not self.futures[0].result(timeout=timeout):
+                return None
+        except Exception:
+            return None
+        return time.perf_counter() - self.started_at
+
+
+# Pool partagé pour la synthèse des segments
+_tts_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hero-tts")
 
 
 # ============================================
-# VOIX gTTS (Accents Français)
+# VOIX (Accents Français)
+# lang / tld / slow : gTTS ; edge, espeak, piper : réglages propres à chaque moteur
 # ============================================
 
 VOICE_OPTIONS = {
     "fr": {
         "name": "Français (France)",
         "lang": "fr",
-        "tld": "fr"
+        "tld": "fr",
+        "edge": {"voice": "fr-FR-HenriNeural"},
+        "espeak": {"voice": "fr-fr"},
     },
     "fr_slow": {
         "name": "Français Lent",
         "lang": "fr",
         "tld": "fr",
-        "slow": True
+        "slow": True,
+        "edge": {"voice": "fr-FR-HenriNeural", "rate": "-25%"},
+        "espeak": {"voice": "fr-fr", "speed": 120},
+        "piper": {"length_scale": 1.3},
     },
     "fr_ca": {
         "name": "Français (Canada)",
         "lang": "fr",
-        "tld": "ca"
+        "tld": "ca",
+        "edge": {"voice": "fr-CA-AntoineNeural"},
+        "espeak": {"voice": "fr-fr"},
     },
 }
 
 
+# ============================================
+# MP3
+# ============================================
+
+def _strip_id3(data: bytes) -> bytes:
+    """Retire l'en-tête ID3v2 et le pied ID3v1 (trames audio uniquement)."""
+    if data[:3] == b"ID3" and len(data) > 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        data = data[10 + size:]
+    if len(data) > 128 and data[-128:-125] == b"TAG":
+        data = data[:-128]
+    return data
+
+
+def join_mp3(segments: List[bytes]) -> bytes:
+    """Concatène des segments MP3 en un seul flux propre."""
+    if not segments:
+        return b""
+    return segments[0] + b"".join(_strip_id3(s) for s in segments[1:])
+
+
 # ============================================
 # AUDIO MANAGER CLASS
 # ============================================
@@ -94,18 +132,38 @@ VOICE_OPTIONS = {
 class AudioManager:
     """
     Gestionnaire Audio Stable
-    - TTS : gTTS (Google, gratuit, simple)
-    - STT : Groq Whisper (fonctionne déjà ✅)
+    - TTS : un moteur par narration, le meilleur en qualité standard (latence + échecs)
+    - STT : local pour les commandes courtes, Groq pour les longues (secours mutuel)
     """
     
-    def __init__(self):
-        if not GTTS_OK:
-            raise ImportError("gTTS non installé : pip install gtts")
-        if not GROQ_OK:
-            raise ImportError("Groq non configuré")
+    def __init__(self, cache: Optional[TTSSegmentCache] = None,
+                 backends: Optional[List[TTSBackend]] = None,
+                 stt_backends: Optional[List[STTBackend]] = None):
+        if backends is None:
+            backends = default_tts_backends()
+        if not backends:
+            raise ImportError("Aucun moteur TTS : pip install gtts edge-tts")
+        if stt_backends is None:
+            stt_backends = default_stt_backends()
+        if not stt_backends:
+            raise ImportError("Aucun moteur STT : GROQ_API_KEY ou pip install faster-whisper")
         
+        self.backends = backends
+        self.stt_backends = stt_backends
+        self.selector = BackendSelector(backends)
         self.voice_key = "fr"
-        self._cache: Dict[str, bytes] = {}
+        # Cache disque par phrase, partagé entre toutes les sessions
+        self.cache = cache or get_shared_cache()
+        # Temps jusqu'au premier audio (s), derniers tours
+        self.first_audio_times: deque = deque(maxlen=50)
+        # Transcriptions : octets reçus / envoyés, latence
+        self.stt_stats: deque = deque(maxlen=50)
+        # Transcriptions par empreinte audio (payload micro rejoué = pas de 2e appel)
+        self._stt_cache: "OrderedDict[str, AudioResult]" = OrderedDict()
+        self.stt_cache_hits = 0
+        self._stt_lock = threading.Lock()
+        # Transcodage Opus : octets et coût CPU par variante
+        self.transcode_stats: deque = deque(maxlen=200)
     
     def set_voice(self, key: str) -> bool:
         if key in VOICE_OPTIONS:
@@ -121,102 +179,248 @@ class AudioManager:
         ]
     
     # ==========================================
-    # TTS - gTTS (Google Text-to-Speech)
+    # TTS - Moteurs interchangeables
     # ==========================================
     
+    @traced("tts.text_to_speech")
     def text_to_speech(self, text: str) -> AudioResult:
-        """Convertit le texte en audio avec gTTS."""
-        if not GTTS_OK:
-            return AudioResult(success=False, error="gTTS non installé")
-        
-        clean_text = self._clean_text(text)
-        
-        if len(clean_text) < 3:
+        """
+        Convertit le texte en audio.
+        Chaque phrase est synthétisée une seule fois (en parallèle) puis servie par le cache.
+        """
+        if len(self._clean_text(text)) < 3:
             return AudioResult(success=False, error="Texte trop court")
         
         try:
-            # Cache
-            cache_key = f"{self.voice_key}:{hash(clean_text)}"
-            if cache_key in self._cache:
-                return AudioResult(success=True, audio_bytes=self._cache[cache_key])
-            
-            # Limite longueur
-            if len(clean_text) > 5000:
-                clean_text = clean_text[:5000]
-            
-            # Paramètres de la voix
-            voice_config = VOICE_OPTIONS[self.voice_key]
-            
-            # Génère l'audio avec gTTS
-            tts = gTTS(
-                text=clean_text,
-                lang=voice_config["lang"],
-                tld=voice_config.get("tld", "fr"),
-                slow=voice_config.get("slow", False)
-            )
-            
-            # Sauvegarde dans un buffer mémoire
-            audio_buffer = io.BytesIO()
-            tts.write_to_fp(audio_buffer)
-            audio_buffer.seek(0)
-            audio_bytes = audio_buffer.read()
+            job = self.start_speech(text)
+            segments = [future.result() for future in job.futures]
             
-            if audio_bytes and len(audio_bytes) > 0:
-                self._cache[cache_key] = audio_bytes
-                return AudioResult(success=True, audio_bytes=audio_bytes)
-            else:
+            if not segments or not all(segments):
                 return AudioResult(success=False, error="Audio vide")
+            
+            audio_bytes = join_mp3(segments)
+            annotate(chars=len(text), segments=len(segments), bytes=len(audio_bytes))
+            return AudioResult(success=True, audio_bytes=audio_bytes)
                 
         except Exception as e:
             return AudioResult(success=False, error=f"Erreur TTS: {str(e)[:100]}")
     
+    @traced("tts.start_speech")
+    def start_speech(self, text: str) -> SpeechJob:
+        """
+        Lance la synthèse de tous les segments sans attendre.
+        Les segments en cache sont disponibles immédiatement.
+        """
+        keys: List[str] = []
+        futures: List[Future] = []
+        pending: Dict[str, Future] = {}
+        voice_key = self.voice_key
+        # Un seul moteur pour toute la narration (pas de changement de voix en cours de récit)
+        engines = self._engines()
+        engine = engines[0].name
+        
+        for sentence in self._split_sentences(self._clean_text(text)):
+            cache_key = TTSSegmentCache.key(sentence, voice_key, engine)
+            audio_bytes = None if cache_key in pending else self.cache.get(cache_key)
+            if cache_key in pending:
+                future = pending[cache_key]  # Phrase répétée dans le même texte
+            elif audio_bytes is not None:
+                future: Future = Future()
+                future.set_result(audio_bytes)
+            else:
+                future = _tts_pool.submit(bind(self._synthesize_segment), sentence, cache_key, voice_key, engines)
+            pending[cache_key] = future
+            keys.append(cache_key)
+            futures.append(future)
+        
+        job = SpeechJob(keys=keys, futures=futures)
+        annotate(chars=len(text), segments=len(keys), cached=sum(f.done() for f in futures),
+                 engine=engine)
+        if futures:
+            futures[0].add_done_callback(
+                lambda f: self.first_audio_times.append(time.perf_counter() - job.started_at)
+            )
+        return job
+    
+    @traced("tts.segment")
+    def _synthesize_segment(self, sentence: str, cache_key: str, voice_key: str,
+                            engines: List[TTSBackend]) -> bytes:
+        result = self._synthesize(sentence, voice_key, engines)
+        audio_bytes = result.audio_bytes or b""
+        annotate(chars=len(sentence), bytes=len(audio_bytes))
+        if audio_bytes:
+            # Moteur de secours : segment servi pour ce récit, jamais rejoué depuis le cache
+            fallback = result.backend != engines[0].name
+            self.cache.put(cache_key, audio_bytes, provisional=fallback)
+            # Variantes Opus en tâche séparée : le MP3 est lisible tout de suite
+            if FFMPEG_OK and not fallback:
+                _tts_pool.submit(self._transcode_segment, cache_key, audio_bytes)
+        return audio_bytes
+    
+    def _transcode_segment(self, cache_key: str, mp3_bytes: bytes):
+        """Encode les variantes Opus/WebM d'un segment et les range dans le cache."""
+        for variant, spec in VARIANTS.items():
+            if self.cache.has_variant(cache_key, variant):
+                continue
+            start, cpu_start = time.perf_counter(), os.times()
+            data = encode_opus_webm(mp3_bytes, spec["bitrate"])
+            cpu_end = os.times()
+            if not data:
+                continue
+            self.cache.put(cache_key, data, variant=variant)
+            self.transcode_stats.append({
+                "variant": variant,
+                "mp3_bytes": len(mp3_bytes),
+                "bytes": len(data),
+                "seconds": time.perf_counter() - start,
+                # ffmpeg est un sous-processus : temps CPU des enfants
+                "cpu": (cpu_end.children_user + cpu_end.children_system)
+                       - (cpu_start.children_user + cpu_start.children_system),
+            })
+    
+    def segment_urls(self, keys: List[str]) -> List[Dict[str, str]]:
+        """URLs des segments pour le lecteur (variantes Opus seulement si ffmpeg les produit)."""
+        if FFMPEG_OK:
+            return [self.cache.urls(key) for key in keys]
+        return [{"mp3": self.cache.url(key)} for key in keys]
+    
+    def transcode_report(self) -> Dict[str, Dict[str, float]]:
+        """Taille relative au MP3 et coût d'encodage moyen de chaque variante."""
+        report = {}
+        for variant in VARIANTS:
+            stats = [s for s in self.transcode_stats if s["variant"] == variant]
+            if not stats:
+                continue
+            report[variant] = {
+                "ratio": sum(s["bytes"] for s in stats) / sum(s["mp3_bytes"] for s in stats),
+                "avg_seconds": sum(s["seconds"] for s in stats) / len(stats),
+                "avg_cpu": sum(s["cpu"] for s in stats) / len(stats),
+            }
+        return report
+    
+    def _engines(self) -> List[TTSBackend]:
+        """
+        Moteurs d'une narration, du préféré au dernier recours : qualité standard
+        au minimum, les moteurs brouillon (espeak) seulement si tous les autres échouent.
+        Un moteur écarté depuis longtemps est re-mesuré en tâche de fond.
+        """
+        preferred = self.selector.rank(QUALITY_STANDARD)
+        engines = preferred + [b for b in self.selector.rank(QUALITY_DRAFT) if b not in preferred]
+        voice_config = VOICE_OPTIONS[self.voice_key]
+        self.selector.probe(QUALITY_STANDARD, lambda b: bool(b.synthesize("Bonjour.", voice_config)))
+        return engines
+    
+    def _synthesize(self, text: str, voice_key: Optional[str] = None,
+                    engines: Optional[List[TTSBackend]] = None) -> AudioResult:
+        """
+        Synthétise un segment (sans cache) avec le moteur de la narration.
+        En cas d'échec, essaie les moteurs suivants.
+        """
+        voice_config = VOICE_OPTIONS[voice_key or self.voice_key]
+        
+        last_error = None
+        for backend in engines or self._engines():
+            start = time.perf_counter()
+            try:
+                audio_bytes = backend.synthesize(text, voice_config)
+            except Exception as e:
+                audio_bytes, last_error = b"", str(e)[:100]
+            self.selector.record(backend.name, time.perf_counter() - start, bool(audio_bytes))
+            if audio_bytes:
+                annotate(backend=backend.name)
+                return AudioResult(success=True, audio_bytes=audio_bytes, backend=backend.name)
+        
+        if last_error:
+            raise RuntimeError(last_error)
+        return AudioResult(success=False, error="Audio vide")
+    
     # ==========================================
-    # STT - Groq Whisper (Fonctionne déjà ✅)
+    # STT - Groq Whisper / Whisper local
     # ==========================================
     
+    STT_CACHE_SIZE = 64
+    
+    @traced("stt.speech_to_text")
     def speech_to_text(self, audio_bytes: bytes) -> AudioResult:
-        """Transcrit l'audio avec Groq Whisper."""
-        if not GROQ_OK or not groq_client:
-            return AudioResult(success=False, error="Groq non configuré")
-        
+        """
+        Transcrit l'audio (moteur choisi selon la durée de l'énoncé).
+        L'audio reste en mémoire : découpe des silences, mono 16 kHz,
+        et les clips sans parole sont rejetés sans appel réseau.
+        """
         if not audio_bytes or len(audio_bytes) < 1000:
             return AudioResult(success=False, error="Audio trop court")
         
-        try:
-            # Fichier temporaire
-            with tempfile.NamedTemporaryFile(suffix=".webm", delete=False) as tmp:
-                tmp.write(audio_bytes)
-                tmp_path = tmp.name
-            
+        digest = audio_digest(audio_bytes)
+        annotate(bytes=len(audio_bytes))
+        with self._stt_lock:
+            cached = self._stt_cache.get(digest)
+            if cached is not None:
+                self._stt_cache.move_to_end(digest)
+                self.stt_cache_hits += 1
+                annotate(cache_hit=True)
+                return cached
+        
+        result = self._transcribe(audio_bytes)
+        annotate(backend=result.backend, chars=len(result.text or ""))
+        # Les erreurs (réseau, rate-limit) ne sont pas mises en cache
+        if result.success or result.backend:
+            with self._stt_lock:
+                self._stt_cache[digest] = result
+                while len(self._stt_cache) > self.STT_CACHE_SIZE:
+                    self._stt_cache.popitem(last=False)
+        return result
+    
+    def _transcribe(self, audio_bytes: bytes) -> AudioResult:
+        prepared = prepare_for_stt(audio_bytes)
+        if not prepared.has_speech:
+            self.stt_stats.append({
+                "bytes_in": len(audio_bytes), "bytes_sent": 0, "latency": 0.0,
+                "rejected": True, "backend": None,
+            })
+            return AudioResult(success=False, error="Aucune parole détectée")
+        
+        last_error = "Aucune parole détectée"
+        for backend in route(self.stt_backends, prepared):
+            start = time.perf_counter()
             try:
-                # Transcription avec Groq Whisper
-                with open(tmp_path, "rb") as audio_file:
-                    transcription = groq_client.audio.transcriptions.create(
-                        model="whisper-large-v3",
-                        file=audio_file,
-                        language="fr",
-                        response_format="text"
-                    )
-                
-                # Extrait le texte
-                if isinstance(transcription, str):
-                    text = transcription.strip()
-                else:
-                    text = str(transcription).strip()
-                
-                if text:
-                    return AudioResult(success=True, text=text)
-                else:
-                    return AudioResult(success=False, error="Aucune parole détectée")
-                    
-            finally:
-                try:
-                    os.unlink(tmp_path)
-                except:
-                    pass
-                    
-        except Exception as e:
-            return AudioResult(success=False, error=f"Erreur STT: {str(e)[:100]}")
+                text = backend.transcribe(prepared)
+            except Exception as e:
+                last_error = f"Erreur STT: {str(e)[:100]}"
+                continue
+            
+            self.stt_stats.append({
+                "bytes_in": len(audio_bytes),
+                "bytes_sent": 0 if backend.local else len(prepared.data),
+                "latency": time.perf_counter() - start,
+                "rejected": False,
+                "backend": backend.name,
+            })
+            annotate(bytes_sent=0 if backend.local else len(prepared.data))
+            if text:
+                return AudioResult(success=True, text=text, backend=backend.name)
+            return AudioResult(success=False, error="Aucune parole détectée", backend=backend.name)
+        
+        return AudioResult(success=False, error=last_error)
+    
+    def stt_report(self) -> Dict[str, Any]:
+        """Octets envoyés et latence de transcription (derniers enregistrements)."""
+        stats = list(self.stt_stats)
+        sent = [s for s in stats if not s["rejected"]]
+        bytes_in = sum(s["bytes_in"] for s in stats)
+        bytes_sent = sum(s["bytes_sent"] for s in stats)
+        return {
+            "clips": len(stats),
+            "rejected": len(stats) - len(sent),
+            "bytes_in": bytes_in,
+            "bytes_sent": bytes_sent,
+            "saved_ratio": 1 - bytes_sent / bytes_in if bytes_in else 0.0,
+            "avg_latency": sum(s["latency"] for s in sent) / len(sent) if sent else None,
+            "cache_hits": self.stt_cache_hits,
+            "by_backend": {
+                name: sum(1 for s in sent if s["backend"] == name)
+                for name in {s["backend"] for s in sent}
+            },
+        }
     
     # ==========================================
     # UTILITAIRES
@@ -231,8 +435,58 @@ class AudioManager:
         text = re.sub(r'\s+', ' ', text)
         return text.strip()
     
+    MAX_SEGMENT_CHARS = 300
+    
+    def _split_sentences(self, text: str) -> List[str]:
+        """
+        Découpe en phrases (les fragments très courts rejoignent la précédente).
+        Les phrases trop longues sont recoupées aux virgules puis aux espaces.
+        """
+        sentences: List[str] = []
+        for part in re.split(r'(?<=[.!?…])\s+', text):
+            part = part.strip()
+            if not part:
+                continue
+            if sentences and len(part) < 3:
+                sentences[-1] = f"{sentences[-1]} {part}"
+            else:
+                sentences.extend(self._split_long(part))
+        return sentences
+    
+    def _split_long(self, sentence: str) -> List[str]:
+        if len(sentence) <= self.MAX_SEGMENT_CHARS:
+            return [sentence]
+        # Propositions (virgules), puis mots si une proposition reste trop longue
+        pieces: List[str] = []
+        for clause in re.split(r'(?<=[,;:])\s+', sentence):
+            pieces.extend(clause.split() if len(clause) > self.MAX_SEGMENT_CHARS else [clause])
+        
+        chunks: List[str] = []
+        current = ""
+        for piece in pieces:
+            if current and len(current) + len(piece) + 1 > self.MAX_SEGMENT_CHARS:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current} {piece}" if current else piece
+        if current:
+            chunks.append(current)
+        return chunks
+    
+    def first_audio_latency(self) -> Optional[float]:
+        """Temps moyen jusqu'au premier segment audio (s)."""
+        times = list(self.first_audio_times)
+        return sum(times) / len(times) if times else None
+    
+    def backend_stats(self) -> List[Dict[str, Any]]:
+        """Latence et taux d'échec de chaque moteur TTS."""
+        return self.selector.snapshot()
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+    
     def clear_cache(self):
-        self._cache.clear()
+        self.cache.clear()
 
 
 # ============================================
@@ -244,15 +498,16 @@ if __name__ == "__main__":
     print("   TEST AUDIO MANAGER")
     print("=" * 70 + "\n")
     
-    print(f"gTTS: {'✅ OK' if GTTS_OK else '❌ Non installé'}")
+    print(f"TTS: {'✅ ' + ', '.join(b.name for b in default_tts_backends()) if TTS_OK else '❌ Aucun moteur'}")
     print(f"Groq Whisper: {'✅ OK' if GROQ_OK else '❌ Non configuré'}")
+    print(f"Whisper local: {'✅ OK' if FASTER_WHISPER_OK else '❌ pip install faster-whisper'}")
     
-    if GTTS_OK:
+    if TTS_OK:
         print("\n📢 Voix disponibles:")
         for voice in AudioManager.get_voices():
             print(f"   • {voice['name']}")
         
-        print("\n🧪 Test TTS (gTTS)...")
+        print("\n🧪 Test TTS...")
         try:
             import time
             mgr = AudioManager()
@@ -268,6 +523,40 @@ if __name__ == "__main__":
                 print(f"   ✅ Audio généré: {len(result.audio_bytes)} bytes")
                 print(f"   ⏱️  Temps: {duration:.2f} secondes")
                 
+                start = time.time()
+                mgr.text_to_speech("Bienvenue dans le monde d'Hero IA. Game Over.")
+                print(f"   ♻️  Phrase répétée: {time.time() - start:.2f} secondes")
+                stats = mgr.cache_stats()
+                print(f"   📊 Cache: {stats['hit_rate']:.0%} de hits, {stats['bytes']} octets")
+                
+                long_text = " ".join(
+                    f"Le couloir numéro {i} s'enfonce dans l'obscurité, et l'écho de vos pas résonne."
+                    for i in range(12)
+                )
+                start = time.time()
+                job = mgr.start_speech(long_text)
+                first = job.wait_first()
+                full = mgr.text_to_speech(long_text)
+                print(f"   🚀 Texte long ({len(long_text)} car., {len(job.keys)} segments): "
+                      f"premier audio {first or 0:.2f}s, complet {time.time() - start:.2f}s")
+                for s in mgr.backend_stats():
+                    avg = f"{s['avg_latency']:.2f}s" if s["avg_latency"] is not None else "-"
+                    print(f"   🔊 {s['name']:<14} appels={s['calls']:<3} latence={avg:<6} échecs={s['failure_rate']:.0%}")
+                
+                # Octets par tour narré et coût d'encodage des variantes Opus
+                if full.success and FFMPEG_OK:
+                    seconds = mp3_duration(full.audio_bytes)
+                    print(f"   📉 Tour narré : MP3 {len(full.audio_bytes)} octets ({seconds:.1f}s d'audio)")
+                    for variant, spec in VARIANTS.items():
+                        cpu_start = os.times()
+                        data = encode_opus_webm(full.audio_bytes, spec["bitrate"]) or b""
+                        cpu_end = os.times()
+                        cpu = (cpu_end.children_user + cpu_end.children_system) - (cpu_start.children_user + cpu_start.children_system)
+                        print(f"      {variant:<7} {len(data)} octets ({len(data) / len(full.audio_bytes):.0%}), "
+                              f"CPU {cpu * 1000:.0f} ms ({cpu / seconds * 1000:.1f} ms par seconde d'audio)")
+                elif not FFMPEG_OK:
+                    print("   📉 Variantes Opus : ffmpeg absent (MP3 uniquement)")
+                
                 # Sauvegarde pour test
                 with open("test_gtts_audio.mp3", "wb") as f:
                     f.write(result.audio_bytes)
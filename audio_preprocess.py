@@ -0,0 +1,213 @@
+# ============================================
+# HERO IA - Prétraitement audio pour le STT
+# En mémoire : décodage, VAD, découpe des silences, mono 16 kHz
+# ============================================
+"""
+Prépare un enregistrement du micro avant l'envoi à Whisper :
+- Décodage WebM/Opus -> PCM mono 16 kHz (ffmpeg via pipes, aucun fichier)
+- Détection d'activité vocale : les clips sans parole sont rejetés localement
+- Découpe des silences de début et de fin
+- Ré-encodage compact (Ogg/Opus basse résolution)
+
+Sans ffmpeg, l'enregistrement brut est envoyé tel quel (toujours en mémoire).
+"""
+
+import shutil
+import subprocess
+from array import array
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+
+FFMPEG_PATH = shutil.which("ffmpeg")
+FFMPEG_OK = FFMPEG_PATH is not None
+
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+MIN_RMS = 300             # Énergie minimale d'une trame "parlée" (int16)
+NOISE_FACTOR = 3.0        # Seuil = bruit de fond x facteur
+NOISE_CAP = 500           # Bruit de fond maximal retenu : un clip presque entièrement parlé
+                          # ne doit pas prendre sa propre voix pour du bruit
+MIN_SPEECH_MS = 200       # Parole minimale pour accepter le clip
+PADDING_MS = 200          # Marge conservée autour de la parole
+OPUS_BITRATE = "24k"
+
+
+@dataclass
+class PreparedAudio:
+    """Audio prêt pour l'envoi au STT."""
+    data: bytes
+    filename: str
+    has_speech: bool = True
+    original_bytes: int = 0
+    duration: Optional[float] = None          # secondes après découpe
+    original_duration: Optional[float] = None  # secondes avant découpe
+
+
+# ============================================
+# FFMPEG (pipes en mémoire)
+# ============================================
+
+def _ffmpeg(args: List[str], data: bytes, timeout: float = 15.0) -> Optional[bytes]:
+    if not FFMPEG_OK:
+        return None
+    try:
+        proc = subprocess.run(
+            [FFMPEG_PATH, "-hide_banner", "-loglevel", "error", *args],
+            input=data, capture_output=True, timeout=timeout
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if proc.returncode != 0 or not proc.stdout:
+        return None
+    return proc.stdout
+
+
+def decode_to_pcm(audio_bytes: bytes, rate: int = SAMPLE_RATE) -> Optional[bytes]:
+    """Décode n'importe quel format vers PCM int16 mono."""
+    return _ffmpeg(["-i", "pipe:0", "-f", "s16le", "-ac", "1", "-ar", str(rate), "pipe:1"], audio_bytes)
+
+
+def encode_opus(pcm: bytes, rate: int = SAMPLE_RATE) -> Optional[bytes]:
+    """Encode du PCM int16 mono en Ogg/Opus compact."""
+    return _ffmpeg(
+        ["-f", "s16le", "-ac", "1", "-ar", str(rate), "-i", "pipe:0",
+         "-c:a", "libopus", "-b:a", OPUS_BITRATE, "-application", "voip", "-f", "ogg", "pipe:1"],
+        pcm
+    )
+
+
+def encode_opus_webm(data: bytes, bitrate: str, input_args: List[str] = ("-f", "mp3")) -> Optional[bytes]:
+    """Ré-encode un segment (MP3 par défaut) en Opus/WebM basse résolution."""
+    return _ffmpeg(
+        [*input_args, "-i", "pipe:0", "-ac", "1", "-c:a", "libopus", "-b:a", bitrate,
+         "-application", "voip", "-f", "webm", "pipe:1"],
+        data
+    )
+
+
+def encode_mp3(data: bytes, input_args: List[str], bitrate: str = "48k") -> Optional[bytes]:
+    """Encode un flux audio (format décrit par input_args) en MP3 mono 24 kHz."""
+    return _ffmpeg(
+        [*input_args, "-i", "pipe:0", "-ac", "1", "-ar", "24000",
+         "-c:a", "libmp3lame", "-b:a", bitrate, "-f", "mp3", "pipe:1"],
+        data
+    )
+
+
+# ============================================
+# DÉTECTION D'ACTIVITÉ VOCALE
+# ============================================
+
+def frame_energies(pcm: bytes, rate: int = SAMPLE_RATE, frame_ms: int = FRAME_MS) -> List[float]:
+    """Énergie RMS de chaque trame."""
+    samples = array("h")
+    samples.frombytes(pcm[:len(pcm) - len(pcm) % 2])
+    frame_len = max(1, rate * frame_ms // 1000)
+    energies = []
+    for i in range(0, len(samples) - frame_len + 1, frame_len):
+        frame = samples[i:i + frame_len]
+        energies.append((sum(s * s for s in frame) / frame_len) ** 0.5)
+    return energies
+
+
+def detect_speech(pcm: bytes, rate: int = SAMPLE_RATE) -> Optional[Tuple[int, int]]:
+    """
+    Localise la parole dans le PCM.
+
+    Returns:
+        (début, fin) en octets, ou None si aucune parole
+    """
+    energies = frame_energies(pcm, rate)
+    if not energies:
+        return None
+
+    # Bruit de fond : 20e percentile des trames, plafonné (sans trame nettement
+    # plus calme que les autres, le clip est de la parole, pas du silence)
+    noise = min(sorted(energies)[len(energies) // 5], NOISE_CAP)
+    threshold = max(MIN_RMS, noise * NOISE_FACTOR)
+    voiced = [i for i, e in enumerate(energies) if e >= threshold]
+
+    if len(voiced) * FRAME_MS < MIN_SPEECH_MS:
+        return None
+
+    bytes_per_frame = rate * FRAME_MS // 1000 * 2
+    pad = PADDING_MS // FRAME_MS
+    start = max(0, voiced[0] - pad) * bytes_per_frame
+    end = min(len(energies), voiced[-1] + 1 + pad) * bytes_per_frame
+    return start, end
+
+
+# ============================================
+# PIPELINE
+# ============================================
+
+def prepare_for_stt(audio_bytes: bytes, filename: str = "recording.webm") -> PreparedAudio:
+    """
+    Prépare l'audio du micro pour Whisper.
+    Sans ffmpeg (ou si le décodage échoue), renvoie l'audio d'origine.
+    """
+    if audio_bytes[:4] == b"RIFF":
+        filename = "recording.wav"  # Segments WAV de l'enregistreur en continu
+    original = PreparedAudio(data=audio_bytes, filename=filename, original_bytes=len(audio_bytes))
+
+    pcm = decode_to_pcm(audio_bytes)
+    if not pcm:
+        return original
+
+    bytes_per_second = SAMPLE_RATE * 2
+    span = detect_speech(pcm)
+    if span is None:
+        return PreparedAudio(
+            data=b"", filename=filename, has_speech=False,
+            original_bytes=len(audio_bytes), original_duration=len(pcm) / bytes_per_second
+        )
+
+    trimmed = pcm[span[0]:span[1]]
+    encoded = encode_opus(trimmed)
+    if not encoded or len(encoded) >= len(audio_bytes):
+        return original
+
+    return PreparedAudio(
+        data=encoded, filename="recording.ogg",
+        original_bytes=len(audio_bytes),
+        duration=len(trimmed) / bytes_per_second,
+        original_duration=len(pcm) / bytes_per_second,
+    )
+
+
+# ============================================
+# TEST
+# ============================================
+
+if __name__ == "__main__":
+    import math
+    import random
+    import time
+
+    print("\n" + "=" * 60)
+    print("   TEST PRÉTRAITEMENT STT")
+    print("=" * 60 + "\n")
+    print(f"ffmpeg: {'✅ ' + FFMPEG_PATH if FFMPEG_OK else '❌ absent (envoi brut)'}")
+
+    def synth(seconds: float, amplitude: int) -> bytes:
+        n = int(SAMPLE_RATE * seconds)
+        return array("h", (
+            int(amplitude * math.sin(2 * math.pi * 220 * i / SAMPLE_RATE)) + random.randint(-40, 40)
+            for i in range(n)
+        )).tobytes()
+
+    clip = synth(1.5, 0) + synth(1.0, 6000) + synth(2.0, 0)
+    start = time.perf_counter()
+    span = detect_speech(clip)
+    elapsed = (time.perf_counter() - start) * 1000
+    if span:
+        print(f"\n   Parole détectée : {span[0] / (SAMPLE_RATE * 2):.2f}s -> {span[1] / (SAMPLE_RATE * 2):.2f}s "
+              f"(clip {len(clip) / (SAMPLE_RATE * 2):.1f}s, {elapsed:.1f} ms)")
+    print(f"   Silence rejeté  : {'✅' if detect_speech(synth(3.0, 0)) is None else '❌'}")
+    # Clips presque entièrement parlés (segments de l'enregistreur en continu)
+    print(f"   Parole continue : {'✅' if detect_speech(synth(2.0, 6000)) else '❌'}")
+    dense = synth(0.2, 0) + synth(2.0, 6000) + synth(0.2, 0)
+    print(f"   Parole dense    : {'✅' if detect_speech(dense) else '❌'}")
+
+    print("\n" + "=" * 60)
@@ -0,0 +1,112 @@
+# ============================================
+# HERO IA - Sélection de backends
+# Latence glissante + échecs + qualité
+# ============================================
+"""
+Sélecteur partagé par les générateurs multi-backends (images, voix).
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+
+# Niveaux de qualité des backends
+QUALITY_DRAFT = 0
+QUALITY_STANDARD = 1
+QUALITY_HIGH = 2
+
+
+class BackendSelector:
+    """
+    Classe les backends pour chaque requête.
+    Un backend expose simplement .name et .quality.
+    - filtre par niveau de qualité minimum
+    - les backends jamais essayés passent en premier
+    - sinon score = latence moyenne x pénalité d'échec, mesures pondérées par
+      leur âge (demi-vie HALF_LIFE) : un classement ancien reste valable
+    - un backend écarté dont la dernière mesure date de plus de PROBE_AFTER s
+      est re-mesuré par une sonde en tâche de fond (probe), jamais pendant un tour
+    """
+    
+    WINDOW = 20
+    FAILURE_PENALTY = 4.0
+    HALF_LIFE = 600.0
+    PROBE_AFTER = 300.0
+    
+    def __init__(self, backends: List[Any]):
+        self.backends = list(backends)
+        self._samples: Dict[str, Deque[Tuple[float, float, bool]]] = {
+            b.name: deque(maxlen=self.WINDOW) for b in self.backends
+        }
+        self._probing: Set[str] = set()
+        self._lock = threading.Lock()
+    
+    def record(self, name: str, latency: float, success: bool):
+        with self._lock:
+            self._samples.setdefault(name, deque(maxlen=self.WINDOW)).append(
+                (time.monotonic(), latency, success)
+            )
+    
+    def stats(self, name: str) -> Dict[str, Any]:
+        with self._lock:
+            samples = list(self._samples.get(name, ()))
+        now = time.monotonic()
+        # Poids 1 pour une mesure récente, 0.5 après HALF_LIFE s...
+        weighted = [(0.5 ** ((now - t) / self.HALF_LIFE), lat, ok) for t, lat, ok in samples]
+        ok_weight = sum(w for w, _, ok in weighted if ok)
+        total_weight = sum(w for w, _, _ in weighted)
+        return {
+            "name": name,
+            "calls": len(samples),
+            "last_call": samples[-1][0] if samples else None,
+            "avg_latency": sum(w * lat for w, lat, ok in weighted if ok) / ok_weight if ok_weight else None,
+            "failure_rate": (total_weight - ok_weight) / total_weight if total_weight else 0.0,
+        }
+    
+    def score(self, backend: Any) -> float:
+        s = self.stats(backend.name)
+        if s["calls"] == 0:
+            return 0.0
+        if s["avg_latency"] is None:
+            return float("inf")
+        return s["avg_latency"] * (1 + self.FAILURE_PENALTY * s["failure_rate"])
+    
+    def rank(self, min_quality: int = QUALITY_STANDARD) -> List[Any]:
+        eligible = [b for b in self.backends if b.quality >= min_quality]
+        # sorted() est stable : à score égal, l'ordre de configuration est conservé
+        return sorted(eligible, key=lambda b: (self.score(b), -b.quality))
+    
+    def probe(self, min_quality: int, call: Callable[[Any], bool]) -> Optional[str]:
+        """
+        Re-mesure en tâche de fond un backend écarté dont la mesure est ancienne
+        (un seul à la fois). `call(backend)` retourne True en cas de succès.
+        Retourne le nom du backend sondé, ou None.
+        """
+        now = time.monotonic()
+        for backend in self.rank(min_quality)[1:]:
+            s = self.stats(backend.name)
+            if s["calls"] == 0 or now - s["last_call"] < self.PROBE_AFTER:
+                continue
+            with self._lock:
+                if self._probing:
+                    return None
+                self._probing.add(backend.name)
+            threading.Thread(target=self._run_probe, args=(backend, call),
+                             name=f"hero-probe-{backend.name}", daemon=True).start()
+            return backend.name
+        return None
+    
+    def _run_probe(self, backend: Any, call: Callable[[Any], bool]):
+        start = time.perf_counter()
+        try:
+            ok = bool(call(backend))
+        except Exception:
+            ok = False
+        self.record(backend.name, time.perf_counter() - start, ok)
+        with self._lock:
+            self._probing.discard(backend.name)
+    
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [dict(self.stats(b.name), quality=b.quality) for b in self.backends]
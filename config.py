@@ -29,6 +29,36 @@ class LLMConfig:
     TEMPERATURE: float = 0.85
     MAX_TOKENS: int = 1500
     TOP_P: float = 0.9
+    
+    # Modèle de repli quand le budget de la session s'épuise
+    ECONOMY_MODEL: str = "llama-3.1-8b-instant"
+    
+    # Prix indicatifs en $ par million de tokens (entrée, sortie)
+    PRICES: Dict[str, tuple] = {
+        "llama-3.3-70b-versatile": (0.59, 0.79),
+        "llama-3.1-70b-versatile": (0.59, 0.79),
+        "llama-3.1-8b-instant": (0.05, 0.08),
+        "mixtral-8x7b-32768": (0.24, 0.24),
+        "gemma2-9b-it": (0.20, 0.20),
+    }
+
+
+# ============================================
+# BUDGET DE TOKENS (par session)
+# ============================================
+
+class BudgetConfig:
+    """Budget de tokens d'une session et paliers de dégradation."""
+    
+    SESSION_TOKENS: int = 300_000
+    
+    # Fraction du budget consommée -> dégradation (cumulative)
+    NO_SPECULATIVE_AT: float = 0.50   # plus d'image affinée ni de pré-synthèse
+    SHORT_CONTEXT_AT: float = 0.70    # historique envoyé au LLM raccourci
+    ECONOMY_MODEL_AT: float = 0.85    # modèle plus petit
+    
+    # Échanges (action + réponse) conservés en contexte court
+    SHORT_CONTEXT_TURNS: int = 6
 
 
 # ============================================
@@ -417,6 +447,7 @@ class SystemMessages:
     API_ERROR = "🔌 Erreur de connexion..."
     JSON_ERROR = "📜 Le narrateur reformule..."
     LOADING = "Le destin tisse votre histoire..."
+    BUDGET_EXHAUSTED = "🪙 Budget de tokens de la session épuisé. L'aventure s'arrête ici pour aujourd'hui."
 
 
 # ============================================
@@ -0,0 +1,265 @@
+# ============================================
+# HERO IA - Narration d'attente
+# Lignes d'ambiance quand le narrateur tarde (SLO de latence)
+# ============================================
+"""
+Quand la complétion Groq dépasse quelques secondes, le joueur ne fixe plus
+un indicateur de chargement :
+- Au-delà de FILLER_THRESHOLD, une courte ligne d'ambiance est affichée
+  (et lue si la voix est active), puis une autre toutes les FILLER_INTERVAL s
+- Les lignes sont générées à l'avance, par thème (GameTheme.ambient_keywords)
+  et par scène, puis synthétisées en tâche de fond : le cache TTS les sert
+  instantanément au moment voulu
+- Génération déterministe (graine = thème + scène) : mêmes phrases, mêmes
+  clés de cache d'une partie à l'autre
+
+Les lignes d'attente ne touchent jamais à l'état du jeu (historique, PV,
+inventaire) : elles sont affichées dans un emplacement temporaire effacé à
+l'arrivée de la réponse.
+
+Latence réelle = soumission -> réponse ; latence perçue = soumission ->
+premier retour visible (ligne d'attente ou réponse).
+"""
+
+import random
+import re
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, Optional
+
+# Au-delà de ce délai (s), une ligne d'attente est affichée
+FILLER_THRESHOLD = 2.5
+# Délai (s) entre deux lignes si l'attente se prolonge
+FILLER_INTERVAL = 4.0
+# Lignes préparées par scène
+FILLER_LINES = 4
+
+
+# ============================================
+# GÉNÉRATION DES LIGNES
+# ============================================
+
+# Gabarits tolérants aux noms nus ("train", "années 30", "pyramides")
+KEYWORD_TEMPLATES = [
+    "Une image vous traverse l'esprit : {kw}.",
+    "Le silence s'étire... {kw}, {kw2}... le destin hésite encore.",
+    "Quelque part, entre {kw} et {kw2}, l'histoire prend son élan.",
+    "Un frisson vous parcourt. {Kw}. Le narrateur rassemble ses pensées.",
+    "Vous retenez votre souffle... {kw}, partout autour de vous.",
+]
+
+SCENE_TEMPLATES = [
+    "{scene} : le temps semble suspendu un instant.",
+    "{scene}... chaque détail compte, le narrateur s'y attarde.",
+]
+
+GENERIC_LINES = [
+    "Le destin hésite un instant...",
+    "Les dés roulent quelque part dans l'ombre...",
+    "Le narrateur tourne lentement la page...",
+]
+
+
+def _seed(*parts: str) -> int:
+    # hash() est salé par processus : graine stable calculée à la main
+    return sum((i + 1) * ord(c) for i, c in enumerate("\n".join(parts)))
+
+
+def _scene_label(scene: str) -> str:
+    scene = re.sub(r"\s+", " ", scene or "").strip(" .!?…")
+    return scene[:1].upper() + scene[1:] if scene else ""
+
+
+def filler_lines(theme: Any, scene: str = "", count: int = FILLER_LINES) -> List[str]:
+    """
+    Lignes d'attente pour un thème et une scène.
+
+    Args:
+        theme: GameTheme (id, ambient_keywords) ou None
+        scene: description courte de la scène en cours
+        count: nombre de lignes
+    """
+    keywords = list(getattr(theme, "ambient_keywords", None) or [])
+    rng = random.Random(_seed(getattr(theme, "id", ""), scene or ""))
+    lines: List[str] = []
+
+    label = _scene_label(scene)
+    if label:
+        lines.append(rng.choice(SCENE_TEMPLATES).format(scene=label))
+
+    if keywords:
+        templates = KEYWORD_TEMPLATES[:]
+        rng.shuffle(templates)
+        for template in templates:
+            if len(lines) >= count:
+                break
+            kw, kw2 = rng.sample(keywords, 2) if len(keywords) > 1 else (keywords[0], keywords[0])
+            lines.append(template.format(kw=kw, kw2=kw2, Kw=kw[:1].upper() + kw[1:]))
+
+    for line in GENERIC_LINES:
+        if len(lines) >= count:
+            break
+        lines.append(line)
+    return lines[:count]
+
+
+# ============================================
+# BANQUE DE LIGNES (pré-synthèse)
+# ============================================
+
+class FillerBank:
+    """Lignes d'attente de la scène en cours, synthétisées à l'avance."""
+
+    def __init__(self):
+        self.lines: List[str] = []
+        self._jobs: Dict[str, Any] = {}
+        self._scene_id: Optional[str] = None
+        self._recent: deque = deque(maxlen=2)
+
+    def prepare(self, theme: Any, scene: str = "",
+                synthesize: Optional[Callable[[str], Any]] = None):
+        """
+        Génère les lignes de la scène (sans effet si déjà fait).
+
+        Args:
+            synthesize: texte -> SpeechJob (AudioManager.start_speech), non bloquant
+        """
+        scene_id = f"{getattr(theme, 'id', '')}\n{scene}"
+        if scene_id == self._scene_id and (synthesize is None or self._jobs):
+            return
+        self._scene_id = scene_id
+        self.lines = filler_lines(theme, scene)
+        self._jobs = {}
+        if synthesize is not None:
+            for line in self.lines:
+                try:
+                    self._jobs[line] = synthesize(line)
+                except Exception:
+                    pass
+
+    def audio_keys(self, line: str) -> Optional[List[str]]:
+        """Clés des segments de la ligne si toute la synthèse est terminée (sinon None)."""
+        job = self._jobs.get(line)
+        if job is None or not all(f.done() and not f.exception() and f.result() for f in job.futures):
+            return None
+        return job.keys
+
+    def next_line(self) -> Optional[str]:
+        """Ligne suivante, en évitant les deux dernières affichées."""
+        if not self.lines:
+            return None
+        candidates = [l for l in self.lines if l not in self._recent] or self.lines
+        line = candidates[0]
+        self._recent.append(line)
+        return line
+
+
+# ============================================
+# SLO DE LATENCE
+# ============================================
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class LatencySLO:
+    """Attente d'un tour avec lignes d'attente, et suivi latence perçue / réelle."""
+
+    def __init__(self, threshold: float = FILLER_THRESHOLD, interval: float = FILLER_INTERVAL):
+        self.threshold = threshold
+        self.interval = interval
+        self.metrics: deque = deque(maxlen=100)
+
+    def wait(self, future: Future, on_slow: Callable[[int], None],
+             started_at: Optional[float] = None) -> Any:
+        """
+        Attend le résultat ; appelle on_slow(n) à chaque échéance dépassée.
+
+        Args:
+            started_at: instant de soumission (time.monotonic), maintenant par défaut
+
+        Returns:
+            Résultat du future (ses exceptions sont propagées)
+        """
+        start = started_at if started_at is not None else time.monotonic()
+        first_feedback: Optional[float] = None
+        fillers = 0
+        deadline = start + self.threshold
+        try:
+            while True:
+                try:
+                    return future.result(timeout=max(0.0, deadline - time.monotonic()))
+                except FutureTimeout:
+                    try:
+                        on_slow(fillers)
+                    except Exception:
+                        pass  # L'attente ne doit jamais faire échouer le tour
+                    if first_feedback is None:
+                        first_feedback = time.monotonic()
+                    fillers += 1
+                    deadline = time.monotonic() + self.interval
+        finally:
+            # Attente interrompue (rerun) : mesurée par l'attente qui reprend le tour
+            if future.done():
+                self._record(start, first_feedback, fillers)
+
+    def _record(self, start: float, first_feedback: Optional[float], fillers: int):
+        end = time.monotonic()
+        self.metrics.append({
+            "actual": end - start,
+            "perceived": (first_feedback or end) - start,
+            "fillers": fillers,
+        })
+
+    def report(self) -> Dict[str, Any]:
+        """Latences réelle / perçue (moyenne, p95) et part des tours masqués."""
+        actual = [m["actual"] for m in self.metrics]
+        perceived = [m["perceived"] for m in self.metrics]
+        masked = sum(1 for m in self.metrics if m["fillers"])
+        return {
+            "turns": len(actual),
+            "actual_avg": sum(actual) / len(actual) if actual else None,
+            "actual_p95": _percentile(actual, 0.95),
+            "perceived_avg": sum(perceived) / len(perceived) if perceived else None,
+            "perceived_p95": _percentile(perceived, 0.95),
+            "masked_rate": masked / len(actual) if actual else 0.0,
+        }
+
+
+# ============================================
+# TEST
+# ============================================
+
+if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor
+
+    from config import ThemeLibrary
+
+    print("\n" + "=" * 60)
+    print("   TEST NARRATION D'ATTENTE")
+    print("=" * 60 + "\n")
+
+    for theme in ThemeLibrary.get_all_themes():
+        print(f"{theme.icon} {theme.name}")
+        for line in filler_lines(theme, "Wagon-restaurant désert"):
+            print(f"   - {line}")
+    stable = filler_lines(ThemeLibrary.get_all_themes()[0], "Salon") == \
+        filler_lines(ThemeLibrary.get_all_themes()[0], "Salon")
+    print(f"\n   Génération déterministe : {'✅' if stable else '❌'}")
+
+    slo = LatencySLO(threshold=0.2, interval=0.3)
+    shown = []
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        for delay in (0.05, 0.5, 1.0):
+            slo.wait(pool.submit(time.sleep, delay), lambda n: shown.append(n))
+    report = slo.report()
+    print(f"   Lignes affichées        : {len(shown)}")
+    print(f"   Latence réelle moyenne  : {report['actual_avg']:.2f}s (p95 {report['actual_p95']:.2f}s)")
+    print(f"   Latence perçue moyenne  : {report['perceived_avg']:.2f}s (p95 {report['perceived_p95']:.2f}s)")
+    print(f"   Tours masqués           : {report['masked_rate']:.0%}")
+
+    print("\n" + "=" * 60)
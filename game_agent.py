@@ -14,12 +14,12 @@ Ce module contient la classe GameAgent qui gère :
 import os
 import json
 import re
+import time
 from typing import Optional, Dict, List, Any
 from dataclasses import dataclass, field
 from pathlib import Path
 
 from dotenv import load_dotenv
-from groq import Groq
 
 from config import (
     LLMConfig, 
@@ -31,6 +31,7 @@ from config import (
     InputQuality,
     clamp
 )
+from tracing import traced, annotate
 
 
 # ============================================
@@ -109,17 +110,19 @@ class GameAgent:
         system_prompt: Instructions système pour l'IA
         conversation_history: Historique des messages
         current_theme: Thème actuel du jeu
+        meter: Compteur de tokens de la session (optionnel)
         useless_counter: Compteur d'inputs invalides (anti-troll)
         is_blocked: Flag de blocage (après 3 inputs useless)
         game_started: Indique si le jeu a commencé
     """
     
-    def __init__(self, model: str = None):
+    def __init__(self, model: str = None, meter=None):
         """
         Initialise le GameAgent.
         
         Args:
             model: Modèle LLM à utiliser (défaut: config)
+            meter: UsageMeter de la session (tokens de chaque appel), optionnel
         """
         # Charge les variables d'environnement
         load_dotenv()
@@ -132,9 +135,16 @@ class GameAgent:
                 "Créez un fichier .env avec votre clé API."
             )
         
-        # Initialise le client Groq
+        # Initialise le client Groq (import différé : ~0.4 s, inutile avant la première partie)
+        from groq import Groq
         self.client = Groq(api_key=api_key)
         self.model = model or LLMConfig.DEFAULT_MODEL
+        self.base_model = self.model
+        
+        # Budget de tokens : usage mesuré et contexte envoyé (None = complet)
+        self.meter = meter
+        self.context_turns: Optional[int] = None
+        self.api_calls: int = 0
         
         # Charge le system prompt
         self.system_prompt = self._load_system_prompt()
@@ -166,7 +176,8 @@ class GameAgent:
             RÈGLE ABSOLUE : Le joueur ne peut utiliser QUE les objets listés dans son inventaire.
             Si le joueur tente d'utiliser un objet qu'il n'a pas, refuse de manière immersive."""
     
-    def roll_initial_stats(self) -> Dict[str, Any]:
+    @staticmethod
+    def roll_initial_stats() -> Dict[str, Any]:
         """
         Lance les dés pour les statistiques initiales.
         
@@ -195,6 +206,7 @@ class GameAgent:
         """
         self.current_theme = theme
         self.conversation_history = []
+        self.api_calls = 0
         self.useless_counter = 0
         self.is_blocked = False
         self.game_started = True
@@ -323,6 +335,30 @@ S'il tente d'utiliser un objet NON LISTÉ ci-dessus, son action échoue."""
         
         return "\n".join(formatted_items) + f"\n\n  TOTAL: {len(inventory)} objet(s)"
     
+    def apply_budget(self, policy) -> None:
+        """
+        Applique le palier de budget de la session (BudgetPolicy) :
+        modèle de repli et/ou contexte raccourci.
+        """
+        self.model = policy.model or self.base_model
+        self.context_turns = policy.context_turns
+    
+    def _messages_for_api(self) -> List[Dict[str, str]]:
+        """
+        Messages envoyés au LLM. En contexte court, seuls le system prompt,
+        le message d'ouverture (thème, inventaire initial) et les derniers
+        échanges sont envoyés ; l'historique complet reste en mémoire.
+        """
+        if self.context_turns is None:
+            return self.conversation_history
+        
+        head = self.conversation_history[:2]
+        tail = self.conversation_history[2:]
+        # Un échange = action du joueur + réponse ; le dernier message (action en cours) est gardé
+        keep = self.context_turns * 2 + 1
+        return head + tail[-keep:] if len(tail) > keep else self.conversation_history
+    
+    @traced("llm.call_api")
     def _call_api(self) -> GameResponse:
         """
         Appelle l'API Groq et parse la réponse.
@@ -331,10 +367,13 @@ S'il tente d'utiliser un objet NON LISTÉ ci-dessus, son action échoue."""
             GameResponse: Réponse parsée ou erreur
         """
         try:
+            messages = self._messages_for_api()
+            start = time.perf_counter()
+            
             # Appel API avec mode JSON
             completion = self.client.chat.completions.create(
                 model=self.model,
-                messages=self.conversation_history,
+                messages=messages,
                 temperature=LLMConfig.TEMPERATURE,
                 max_tokens=LLMConfig.MAX_TOKENS,
                 top_p=LLMConfig.TOP_P,
@@ -344,6 +383,21 @@ S'il tente d'utiliser un objet NON LISTÉ ci-dessus, son action échoue."""
             # Récupère le contenu
             raw_content = completion.choices[0].message.content
             
+            usage = getattr(completion, "usage", None)
+            self.api_calls += 1
+            if self.meter is not None:
+                self.meter.record(
+                    self.model, self.current_theme.id if self.current_theme else "",
+                    self.api_calls - 1, usage, time.perf_counter() - start
+                )
+            annotate(
+                model=self.model,
+                messages=len(messages),
+                prompt_tokens=getattr(usage, "prompt_tokens", None),
+                completion_tokens=getattr(usage, "completion_tokens", None),
+                response_chars=len(raw_content or ""),
+            )
+            
             # Parse le JSON
             response = self._parse_json_response(raw_content)
             
@@ -373,6 +427,7 @@ S'il tente d'utiliser un objet NON LISTÉ ci-dessus, son action échoue."""
                     f"🔌 Erreur de connexion: {error_msg[:100]}"
                 )
     
+    @traced("llm.parse_json")
     def _parse_json_response(self, raw_content: str) -> GameResponse:
         """
         Parse et valide la réponse JSON de l'IA.
@@ -398,6 +453,7 @@ S'il tente d'utiliser un objet NON LISTÉ ci-dessus, son action échoue."""
                     content = match.group(1)
             
             # Parse le JSON
+            annotate(chars=len(content))
             data = json.loads(content)
             
             # Valide les champs requis
@@ -421,6 +477,7 @@ S'il tente d'utiliser un objet NON LISTÉ ci-dessus, son action échoue."""
             return response
             
         except json.JSONDecodeError as e:
+            annotate(error="json")
             return GameResponse.error_response(
                 f"📜 Erreur de format. Le narrateur reformule..."
             )
@@ -443,10 +500,35 @@ S'il tente d'utiliser un objet NON LISTÉ ci-dessus, son action échoue."""
         Jeu démarré: {self.game_started}
         """
     
+    def export_state(self) -> Dict[str, Any]:
+        """État sérialisable de l'agent (sauvegarde) : messages du LLM et anti-troll."""
+        return {
+            "conversation_history": self.conversation_history,
+            "useless_counter": self.useless_counter,
+            "is_blocked": self.is_blocked,
+            "api_calls": self.api_calls,
+        }
+    
+    def load_state(self, theme: GameTheme, state: Dict[str, Any]):
+        """
+        Reprend une partie sauvegardée sans appeler le LLM.
+        
+        Args:
+            theme: Thème de la partie
+            state: Résultat de export_state()
+        """
+        self.current_theme = theme
+        self.conversation_history = list(state.get("conversation_history", []))
+        self.useless_counter = state.get("useless_counter", 0)
+        self.is_blocked = state.get("is_blocked", False)
+        self.api_calls = state.get("api_calls", 0)
+        self.game_started = True
+    
     def reset(self):
         """Réinitialise complètement l'agent."""
         self.conversation_history = []
         self.current_theme = None
+        self.api_calls = 0
         self.useless_counter = 0
         self.is_blocked = False
         self.game_started = False
@@ -0,0 +1,235 @@
+# ============================================
+# HERO IA - Client du service de jeu
+# Même interface que GameAgent, moteur distant (game_service.py)
+# ============================================
+"""
+ServiceAgent remplace GameAgent quand HERO_SERVICE_URL est défini : app.py
+n'appelle plus le LLM lui-même, il envoie les tours au service.
+
+- Les messages ajoutés à chaque tour sont renvoyés par le service : la copie
+  locale de conversation_history reste exacte (sauvegardes, stockage des
+  sessions) sans jamais être renvoyée au service
+- Le budget reste tenu par le client : le palier en cours (modèle, contexte)
+  accompagne chaque tour et l'usage renvoyé alimente le UsageMeter local
+- Un tour porte son numéro : renvoyé après un timeout, le service répond avec
+  le résultat déjà calculé au lieu de rappeler le LLM
+- Sans HERO_SERVICE_URL, make_agent() retourne un GameAgent local (dev)
+"""
+
+import os
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from config import LLMConfig, GameTheme
+from game_agent import GameAgent, GameResponse
+from tracing import traced, annotate
+
+SERVICE_URL = os.getenv("HERO_SERVICE_URL", "").rstrip("/")
+# Un tour peut attendre le LLM longtemps ; les autres appels sont courts
+STEP_TIMEOUT = 90.0
+CALL_TIMEOUT = 10.0
+# Nouvelles tentatives d'un tour après une erreur réseau (même numéro de tour)
+STEP_RETRIES = 2
+
+
+class ServiceError(Exception):
+    """Erreur du service (status HTTP) ou service injoignable (status None)."""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+def response_from_dict(data: Dict[str, Any]) -> GameResponse:
+    known = GameResponse.__dataclass_fields__
+    return GameResponse(**{k: v for k, v in data.items() if k in known})
+
+
+class ServiceAgent:
+    """GameAgent distant : mêmes méthodes, état de référence dans le service."""
+
+    roll_initial_stats = staticmethod(GameAgent.roll_initial_stats)
+
+    def __init__(self, base_url: str = SERVICE_URL, meter=None):
+        if not base_url:
+            raise ValueError("❌ HERO_SERVICE_URL non défini")
+        self.base_url = base_url.rstrip("/")
+        self.http = requests.Session()
+        self.model = LLMConfig.DEFAULT_MODEL
+        self.base_model = self.model
+        self.meter = meter
+        self.context_turns: Optional[int] = None
+
+        self.session_id: Optional[str] = None
+        self.steps: int = 0
+        self.api_calls: int = 0
+        self.conversation_history: List[Dict[str, str]] = []
+        self.current_theme: Optional[GameTheme] = None
+        self.useless_counter: int = 0
+        self.is_blocked: bool = False
+        self.game_started: bool = False
+        # État chargé localement, envoyé au service avant le prochain tour
+        self._pending_state: Optional[Dict[str, Any]] = None
+
+    # ------------------------------------------
+    # Transport
+    # ------------------------------------------
+
+    def _request(self, method: str, path: str, timeout: float = CALL_TIMEOUT,
+                 **kwargs) -> Dict[str, Any]:
+        try:
+            resp = self.http.request(method, f"{self.base_url}{path}", timeout=timeout, **kwargs)
+        except requests.RequestException as e:
+            raise ServiceError(f"Service injoignable : {str(e)[:80]}") from e
+        if resp.status_code >= 400:
+            try:
+                message = resp.json().get("error", resp.text)
+            except ValueError:
+                message = resp.text
+            raise ServiceError(f"{resp.status_code} {message[:100]}", resp.status_code)
+        return resp.json()
+
+    def _budget(self) -> Dict[str, Any]:
+        return {
+            "model": self.model if self.model != self.base_model else None,
+            "context_turns": self.context_turns,
+        }
+
+    def _apply(self, payload: Dict[str, Any]) -> GameResponse:
+        """Met à jour la copie locale avec le résultat d'un tour."""
+        self.session_id = payload["session_id"]
+        self.steps = payload["steps"]
+        self.conversation_history.extend(payload.get("messages", []))
+        agent = payload.get("agent", {})
+        self.useless_counter = agent.get("useless_counter", self.useless_counter)
+        self.is_blocked = agent.get("is_blocked", self.is_blocked)
+        usages = payload.get("usage", [])
+        self.api_calls = agent.get("api_calls", self.api_calls + len(usages))
+        if self.meter is not None:
+            first_call = self.api_calls - len(usages)
+            for i, usage in enumerate(usages):
+                self.meter.record(
+                    usage["model"], self.current_theme.id if self.current_theme else "",
+                    first_call + i, usage, usage.get("latency", 0.0)
+                )
+        annotate(session=self.session_id, messages=len(payload.get("messages", [])),
+                 replayed=bool(payload.get("replayed")))
+        return response_from_dict(payload["response"])
+
+    def _push_state(self):
+        """Envoie l'état d'une partie reprise (sauvegarde) avant de jouer."""
+        self.session_id = self.session_id or uuid.uuid4().hex
+        payload = self._request("PUT", f"/v1/sessions/{self.session_id}", json={
+            "theme_id": self.current_theme.id if self.current_theme else "",
+            "agent": self._pending_state,
+        })
+        self._pending_state = None
+        self.steps = payload["steps"]
+
+    # ------------------------------------------
+    # Interface GameAgent
+    # ------------------------------------------
+
+    @traced("service.initiate_game")
+    def initiate_game(self, theme: GameTheme, initial_inventory: List[str] = None) -> GameResponse:
+        self.current_theme = theme
+        self.conversation_history = []
+        self.api_calls = 0
+        self.useless_counter = 0
+        self.is_blocked = False
+        self.game_started = True
+        self._pending_state = None
+        try:
+            payload = self._request("POST", "/v1/sessions", timeout=STEP_TIMEOUT, json={
+                "theme_id": theme.id, "inventory": initial_inventory, **self._budget(),
+            })
+        except ServiceError as e:
+            return GameResponse.error_response(f"🔌 {e}")
+        return self._apply(payload)
+
+    @traced("service.step")
+    def step(self, user_input: str, current_inventory: List[str],
+             suggested: bool = False) -> GameResponse:
+        if not self.game_started:
+            return GameResponse.error_response("Le jeu n'a pas encore commencé.")
+        user_input = user_input.strip()
+        if not user_input:
+            return GameResponse.error_response("Veuillez entrer une action.")
+
+        body = {
+            "action": user_input, "inventory": list(current_inventory),
+            "suggested": suggested, "turn": self.steps, **self._budget(),
+        }
+        last_error: Optional[ServiceError] = None
+        for attempt in range(STEP_RETRIES + 1):
+            try:
+                if self._pending_state is not None:
+                    self._push_state()
+                    body["turn"] = self.steps
+                payload = self._request(
+                    "POST", f"/v1/sessions/{self.session_id}/step", timeout=STEP_TIMEOUT, json=body
+                )
+                return self._apply(payload)
+            except ServiceError as e:
+                last_error = e
+                if e.status == 404 and attempt == 0:
+                    # Session expirée côté service : la copie locale la recrée
+                    self._pending_state = self.export_state()
+                    continue
+                if e.status is not None:
+                    break  # Erreur du service (409, 400...) : inutile de renvoyer
+                time.sleep(0.5 * (attempt + 1))
+        return GameResponse.error_response(f"🔌 {last_error}")
+
+    def step_with_suggested_action(self, action_text: str, current_inventory: List[str]) -> GameResponse:
+        self.is_blocked = False
+        self.useless_counter = 0
+        return self.step(action_text, current_inventory, suggested=True)
+
+    def apply_budget(self, policy) -> None:
+        self.model = policy.model or self.base_model
+        self.context_turns = policy.context_turns
+
+    def export_state(self) -> Dict[str, Any]:
+        return {
+            "conversation_history": self.conversation_history,
+            "useless_counter": self.useless_counter,
+            "is_blocked": self.is_blocked,
+            "api_calls": self.api_calls,
+        }
+
+    def load_state(self, theme: GameTheme, state: Dict[str, Any]):
+        """Reprise sans appel réseau : l'état est envoyé au service avec le prochain tour."""
+        self.current_theme = theme
+        self.conversation_history = list(state.get("conversation_history", []))
+        self.useless_counter = state.get("useless_counter", 0)
+        self.is_blocked = state.get("is_blocked", False)
+        self.api_calls = state.get("api_calls", 0)
+        self.game_started = True
+        self._pending_state = self.export_state()
+
+    def reset(self):
+        if self.session_id:
+            try:
+                self._request("DELETE", f"/v1/sessions/{self.session_id}")
+            except ServiceError:
+                pass  # Supprimée plus tard par le service (SESSION_TTL)
+        self.session_id = None
+        self.steps = 0
+        self.conversation_history = []
+        self.current_theme = None
+        self.api_calls = 0
+        self.useless_counter = 0
+        self.is_blocked = False
+        self.game_started = False
+        self._pending_state = None
+
+
+def make_agent(meter=None, base_url: str = SERVICE_URL):
+    """Agent du jeu : service distant si une URL est configurée, sinon GameAgent local."""
+    if base_url:
+        return ServiceAgent(base_url, meter=meter)
+    return GameAgent(meter=meter)
@@ -0,0 +1,643 @@
+# ============================================
+# HERO IA - Service de jeu (HTTP / WebSocket)
+# GameAgent, ImageGenerator et AudioManager hors du processus Streamlit
+# ============================================
+"""
+Le moteur du jeu tourne dans un service asyncio (aiohttp) ; l'interface
+Streamlit n'en est plus qu'un client (game_client.ServiceAgent) et les deux
+se dimensionnent séparément.
+
+- Sessions adressées par identifiant, état de l'agent dans SQLite : n'importe
+  quel worker peut servir n'importe quelle session (workers sans état, derrière
+  un répartiteur de charge). Chaque worker garde les derniers agents en
+  mémoire, validés par le numéro de version de la session.
+- Écriture optimiste : deux workers qui jouent le même tour en même temps ->
+  le second reçoit 409 au lieu d'écraser le premier
+- Chaque tour porte son numéro : un tour rejoué (timeout réseau côté client)
+  renvoie la réponse déjà calculée, sans second appel au LLM
+
+Endpoints (JSON) :
+    GET    /healthz
+    POST   /v1/sessions                  {theme_id, inventory?, model?, context_turns?}
+    GET    /v1/sessions/{id}             ?full=1 : messages de l'agent inclus
+    PUT    /v1/sessions/{id}             {theme_id, agent}   (reprise d'une sauvegarde)
+    DELETE /v1/sessions/{id}
+    POST   /v1/sessions/{id}/step        {action, inventory, turn, suggested?, model?, context_turns?}
+    GET    /v1/sessions/{id}/stream      WebSocket : {"type": "step", ...} -> accepted,
+                                         filler*, response, media (image brouillon)
+    POST   /v1/media/image               {prompt, theme_id?, quality?: draft|refined}
+    POST   /v1/media/speech              {text, voice?}  -> audio/mpeg
+
+Lancement :
+    python game_service.py --port 8765 --workers 4
+    HERO_SERVICE_URL=http://127.0.0.1:8765 streamlit run app.py
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import GameConfig, ThemeLibrary
+from game_agent import GameAgent, GameResponse
+from filler_narration import FILLER_THRESHOLD, FILLER_INTERVAL, filler_lines
+from usage_meter import UsageMeter, BudgetPolicy
+
+AIOHTTP_OK = False
+try:
+    from aiohttp import web, WSMsgType
+    AIOHTTP_OK = True
+except ImportError:
+    pass
+
+SERVICE_HOST = os.getenv("HERO_SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("HERO_SERVICE_PORT", 8765))
+SERVICE_DB = Path(os.getenv("HERO_SERVICE_DB", Path(__file__).parent / "sessions" / "service.sqlite3"))
+# Threads par worker pour les appels bloquants (LLM, images, TTS)
+SERVICE_THREADS = int(os.getenv("HERO_SERVICE_THREADS", 16))
+# Agents gardés en mémoire par worker
+MAX_HOT_AGENTS = 256
+# Sessions sans tour depuis (s) : supprimées
+SESSION_TTL = 7 * 24 * 3600
+
+
+class SessionNotFound(KeyError):
+    pass
+
+
+class ConflictError(Exception):
+    """Session modifiée entre-temps (autre worker, tour déjà joué)."""
+
+
+# ============================================
+# SESSIONS (SQLite partagé entre workers)
+# ============================================
+
+@dataclass
+class ServiceSession:
+    """État d'une session côté service."""
+    session_id: str
+    theme_id: str
+    agent: Dict[str, Any] = field(default_factory=dict)   # GameAgent.export_state()
+    steps: int = 0                                        # tours joués (idempotence)
+    scene: str = ""
+    last_response: Optional[Dict[str, Any]] = None        # rejouée si le tour est renvoyé
+    version: int = 0
+
+
+class SessionRepository:
+    """Sessions du service ; écriture optimiste par numéro de version."""
+
+    def __init__(self, db_path: Path = SERVICE_DB):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as db:
+            # WAL : lectures concurrentes pendant l'écriture d'un autre worker
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS service_sessions ("
+                " session_id TEXT PRIMARY KEY, payload BLOB NOT NULL,"
+                " version INTEGER NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    @staticmethod
+    def _encode(session: ServiceSession) -> bytes:
+        data = asdict(session)
+        data.pop("version")
+        return zlib.compress(json.dumps(data, ensure_ascii=False).encode("utf-8"), 6)
+
+    def get(self, session_id: str) -> ServiceSession:
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT payload, version FROM service_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        if row is None:
+            raise SessionNotFound(session_id)
+        data = json.loads(zlib.decompress(row[0]).decode("utf-8"))
+        return ServiceSession(version=row[1], **data)
+
+    def insert(self, session: ServiceSession):
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO service_sessions VALUES (?, ?, ?, ?)",
+                (session.session_id, self._encode(session), session.version, time.time())
+            )
+
+    def update(self, session: ServiceSession):
+        """Écrit la session si personne ne l'a modifiée depuis sa lecture (version + 1)."""
+        with self._connect() as db:
+            cursor = db.execute(
+                "UPDATE service_sessions SET payload = ?, version = ?, updated_at = ?"
+                " WHERE session_id = ? AND version = ?",
+                (self._encode(session), session.version + 1, time.time(),
+                 session.session_id, session.version)
+            )
+        if cursor.rowcount == 0:
+            raise ConflictError(session.session_id)
+        session.version += 1
+
+    def replace(self, session: ServiceSession):
+        """Écrase la session (reprise d'une sauvegarde)."""
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT version FROM service_sessions WHERE session_id = ?", (session.session_id,)
+            ).fetchone()
+            session.version = row[0] + 1 if row else 0
+            db.execute(
+                "INSERT OR REPLACE INTO service_sessions VALUES (?, ?, ?, ?)",
+                (session.session_id, self._encode(session), session.version, time.time())
+            )
+
+    def delete(self, session_id: str) -> bool:
+        with self._connect() as db:
+            return db.execute(
+                "DELETE FROM service_sessions WHERE session_id = ?", (session_id,)
+            ).rowcount > 0
+
+    def prune(self, ttl: float = SESSION_TTL) -> int:
+        with self._connect() as db:
+            return db.execute(
+                "DELETE FROM service_sessions WHERE updated_at < ?", (time.time() - ttl,)
+            ).rowcount
+
+
+# ============================================
+# MOTEUR (synchrone, exécuté dans le pool de threads)
+# ============================================
+
+def response_to_dict(response: GameResponse) -> Dict[str, Any]:
+    data = asdict(response)
+    data.pop("raw_response", None)  # Déjà dans les messages de l'agent
+    return data
+
+
+class GameEngine:
+    """Parties hébergées par un worker : GameAgent par session, état dans le dépôt."""
+
+    def __init__(self, repo: Optional[SessionRepository] = None, max_hot: int = MAX_HOT_AGENTS):
+        self.repo = repo or SessionRepository()
+        self.max_hot = max_hot
+        self._hot: "OrderedDict[str, Tuple[int, GameAgent]]" = OrderedDict()
+        # Verrou par session, gardé tant qu'un tour l'utilise ou que l'agent est en mémoire
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock_users: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _session_lock(self, session_id: str):
+        with self._lock:
+            lock = self._locks.setdefault(session_id, threading.Lock())
+            self._lock_users[session_id] = self._lock_users.get(session_id, 0) + 1
+        try:
+            with lock:
+                yield
+        finally:
+            with self._lock:
+                self._lock_users[session_id] -= 1
+                if session_id not in self._hot:
+                    self._drop_lock(session_id)
+
+    def _drop_lock(self, session_id: str):
+        """Oublie le verrou d'une session sortie des agents en mémoire (appelé sous self._lock)."""
+        if not self._lock_users.get(session_id):
+            self._locks.pop(session_id, None)
+            self._lock_users.pop(session_id, None)
+
+    def _agent(self, session: ServiceSession) -> GameAgent:
+        """Agent en mémoire s'il est à jour, sinon reconstruit depuis l'état stocké."""
+        with self._lock:
+            hot = self._hot.get(session.session_id)
+            if hot is not None and hot[0] == session.version:
+                self._hot.move_to_end(session.session_id)
+                return hot[1]
+        agent = GameAgent()
+        agent.load_state(ThemeLibrary.get_theme(session.theme_id), session.agent)
+        return agent
+
+    def _keep(self, session: ServiceSession, agent: Optional[GameAgent]):
+        with self._lock:
+            if agent is None:
+                self._hot.pop(session.session_id, None)
+                self._drop_lock(session.session_id)
+                return
+            self._hot[session.session_id] = (session.version, agent)
+            self._hot.move_to_end(session.session_id)
+            while len(self._hot) > self.max_hot:
+                evicted, _ = self._hot.popitem(last=False)
+                self._drop_lock(evicted)
+
+    @staticmethod
+    def _prepare(agent: GameAgent, session_id: str, model: Optional[str],
+                 context_turns: Optional[int]):
+        # Le budget est tenu par le client : il transmet le palier en cours
+        agent.meter = UsageMeter(session_id, budget=0, export=False)
+        agent.apply_budget(BudgetPolicy(model=model, context_turns=context_turns))
+
+    @staticmethod
+    def _payload(session: ServiceSession, agent: GameAgent, response: GameResponse,
+                 first_message: int) -> Dict[str, Any]:
+        state = agent.export_state()
+        return {
+            "session_id": session.session_id,
+            "steps": session.steps,
+            "response": response_to_dict(response),
+            # Messages ajoutés pendant l'appel : le client tient une copie à jour
+            "messages": state["conversation_history"][first_message:],
+            "agent": {k: v for k, v in state.items() if k != "conversation_history"},
+            "usage": [
+                {"model": r.model, "prompt_tokens": r.prompt_tokens,
+                 "completion_tokens": r.completion_tokens, "latency": r.latency}
+                for r in agent.meter.records
+            ] if agent.meter is not None else [],
+        }
+
+    # ------------------------------------------
+    # Opérations
+    # ------------------------------------------
+
+    def create(self, theme_id: str, inventory: Optional[List[str]] = None,
+               model: Optional[str] = None, context_turns: Optional[int] = None) -> Dict[str, Any]:
+        theme = ThemeLibrary.get_theme(theme_id)
+        if theme is None:
+            raise ValueError(f"Thème inconnu : {theme_id}")
+        if inventory is None:
+            inventory = theme.custom_inventory or list(GameConfig.DEFAULT_INVENTORY)
+
+        session = ServiceSession(session_id=uuid.uuid4().hex, theme_id=theme_id)
+        agent = GameAgent()
+        self._prepare(agent, session.session_id, model, context_turns)
+        stats = agent.roll_initial_stats()
+        response = agent.initiate_game(theme, list(inventory))
+
+        session.agent = agent.export_state()
+        session.scene = response.scene_description
+        payload = self._payload(session, agent, response, 0)
+        payload["stats"] = stats
+        payload["inventory"] = list(inventory)
+        session.last_response = payload
+        self.repo.insert(session)
+        self._keep(session, agent)
+        return payload
+
+    def step(self, session_id: str, action: str, inventory: List[str], turn: Optional[int] = None,
+             suggested: bool = False, model: Optional[str] = None,
+             context_turns: Optional[int] = None) -> Dict[str, Any]:
+        with self._session_lock(session_id):
+            session = self.repo.get(session_id)
+            if turn is not None and turn != session.steps:
+                if turn == session.steps - 1 and session.last_response:
+                    return dict(session.last_response, replayed=True)
+                raise ConflictError(f"Tour {turn} reçu, tour {session.steps} attendu")
+
+            agent = self._agent(session)
+            self._prepare(agent, session_id, model, context_turns)
+            first_message = len(agent.conversation_history)
+            if suggested:
+                response = agent.step_with_suggested_action(action, list(inventory))
+            else:
+                response = agent.step(action, list(inventory))
+
+            session.agent = agent.export_state()
+            session.steps += 1
+            if not response.is_error:
+                session.scene = response.scene_description
+            payload = self._payload(session, agent, response, first_message)
+            session.last_response = payload
+            try:
+                self.repo.update(session)
+            except ConflictError:
+                self._keep(session, None)  # Agent modifié pour rien : rechargé au prochain tour
+                raise
+            self._keep(session, agent)
+            return payload
+
+    def load(self, session_id: str, theme_id: str, agent_state: Dict[str, Any]) -> Dict[str, Any]:
+        """Installe l'état d'une partie sauvegardée sous cet identifiant."""
+        if ThemeLibrary.get_theme(theme_id) is None:
+            raise ValueError(f"Thème inconnu : {theme_id}")
+        with self._session_lock(session_id):
+            session = ServiceSession(
+                session_id=session_id, theme_id=theme_id, agent=agent_state,
+                steps=int(agent_state.get("api_calls", 0)),
+            )
+            self.repo.replace(session)
+            self._keep(session, None)
+            return self.describe(session_id)
+
+    def describe(self, session_id: str, full: bool = False) -> Dict[str, Any]:
+        session = self.repo.get(session_id)
+        agent = {k: v for k, v in session.agent.items() if full or k != "conversation_history"}
+        return {
+            "session_id": session.session_id,
+            "theme_id": session.theme_id,
+            "steps": session.steps,
+            "scene": session.scene,
+            "messages": len(session.agent.get("conversation_history", [])),
+            "agent": agent,
+            "version": session.version,
+        }
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            self._hot.pop(session_id, None)
+            self._drop_lock(session_id)
+        return self.repo.delete(session_id)
+
+
+# ============================================
+# MÉDIAS
+# ============================================
+
+class MediaService:
+    """Images et narration pour les clients du service (un générateur par style / voix)."""
+
+    def __init__(self):
+        self._images: Dict[str, Any] = {}
+        self._voices: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def image_generator(self, theme_id: Optional[str]):
+        # set_style() modifie le générateur : un par style pour les sessions concurrentes
+        from image_manager import ImageGenerator, HUGGINGFACE_OK, theme_style
+        if not HUGGINGFACE_OK:
+            return None
+        style = theme_style(theme_id)
+        with self._lock:
+            if style not in self._images:
+                gen = ImageGenerator()
+                gen.set_style(style)
+                self._images[style] = gen
+            return self._images[style]
+
+    def audio_manager(self, voice: str):
+        from audio_manager import AudioManager, TTS_OK
+        if not TTS_OK:
+            return None
+        with self._lock:
+            if voice not in self._voices:
+                mgr = AudioManager()
+                mgr.set_voice(voice)
+                self._voices[voice] = mgr
+            return self._voices[voice]
+
+    def image(self, prompt: str, theme_id: Optional[str] = None, quality: str = "draft") -> Dict[str, Any]:
+        gen = self.image_generator(theme_id)
+        if gen is None:
+            return {"success": False, "error": "Génération d'images indisponible"}
+        result = gen.generate_refined(prompt) if quality == "refined" else gen.generate_draft(prompt)
+        return {
+            "success": result.success, "image_b64": result.image_base64,
+            "error": result.error, "backend": result.backend, "latency": result.latency,
+        }
+
+    def speech(self, text: str, voice: str = "fr"):
+        mgr = self.audio_manager(voice)
+        if mgr is None:
+            return None
+        return mgr.text_to_speech(text)
+
+
+# ============================================
+# HTTP / WEBSOCKET
+# ============================================
+
+def _json_error(status: int, message: str) -> "web.Response":
+    return web.json_response({"error": message}, status=status)
+
+
+async def _run(request: "web.Request", fn, *args, **kwargs):
+    """Appel bloquant (LLM, SQLite, images) dans le pool du worker."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(request.app["pool"], lambda: fn(*args, **kwargs))
+
+
+async def _body(request: "web.Request") -> Dict[str, Any]:
+    try:
+        data = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text="JSON invalide")
+    if not isinstance(data, dict):
+        raise web.HTTPBadRequest(text="Objet JSON attendu")
+    return data
+
+
+def _step_args(data: Dict[str, Any]) -> Dict[str, Any]:
+    if not isinstance(data.get("action"), str):
+        raise ValueError("action manquante")
+    return {
+        "action": data["action"],
+        "inventory": list(data.get("inventory") or []),
+        "turn": data.get("turn"),
+        "suggested": bool(data.get("suggested")),
+        "model": data.get("model"),
+        "context_turns": data.get("context_turns"),
+    }
+
+
+async def error_middleware(request, handler):
+    try:
+        return await handler(request)
+    except SessionNotFound:
+        return _json_error(404, "Session inconnue")
+    except ConflictError as e:
+        return _json_error(409, str(e))
+    except ValueError as e:
+        return _json_error(400, str(e))
+
+
+async def healthz(request):
+    return web.json_response({"ok": True, "pid": os.getpid()})
+
+
+async def create_session(request):
+    data = await _body(request)
+    payload = await _run(
+        request, request.app["engine"].create, data.get("theme_id", ""),
+        data.get("inventory"), data.get("model"), data.get("context_turns"),
+    )
+    return web.json_response(payload, status=201)
+
+
+async def get_session(request):
+    full = request.query.get("full") in ("1", "true")
+    payload = await _run(request, request.app["engine"].describe, request.match_info["id"], full)
+    return web.json_response(payload)
+
+
+async def put_session(request):
+    data = await _body(request)
+    payload = await _run(
+        request, request.app["engine"].load, request.match_info["id"],
+        data.get("theme_id", ""), data.get("agent") or {},
+    )
+    return web.json_response(payload)
+
+
+async def delete_session(request):
+    deleted = await _run(request, request.app["engine"].delete, request.match_info["id"])
+    return web.json_response({"deleted": deleted})
+
+
+async def step_session(request):
+    data = await _body(request)
+    payload = await _run(
+        request, request.app["engine"].step, request.match_info["id"], **_step_args(data)
+    )
+    return web.json_response(payload)
+
+
+async def stream_session(request):
+    """
+    WebSocket d'une session : chaque {"type": "step", ...} reçoit "accepted", des
+    lignes d'attente si le narrateur tarde, "response", puis l'image brouillon
+    ("media") si {"image": true}.
+    """
+    ws = web.WebSocketResponse(heartbeat=30)
+    await ws.prepare(request)
+    session_id = request.match_info["id"]
+    engine: GameEngine = request.app["engine"]
+
+    async for msg in ws:
+        if msg.type != WSMsgType.TEXT:
+            continue
+        try:
+            data = json.loads(msg.data)
+            if data.get("type") != "step":
+                raise ValueError("type inconnu")
+            args = _step_args(data)
+            info = await _run(request, engine.describe, session_id)
+        except SessionNotFound:
+            await ws.send_json({"type": "error", "error": "Session inconnue"})
+            continue
+        except Exception as e:
+            await ws.send_json({"type": "error", "error": str(e)[:200] or type(e).__name__})
+            continue
+
+        await ws.send_json({"type": "accepted", "turn": args["turn"]})
+        task = asyncio.ensure_future(_run(request, engine.step, session_id, **args))
+        lines = filler_lines(ThemeLibrary.get_theme(info["theme_id"]), info["scene"])
+        timeout = FILLER_THRESHOLD
+        for line in lines:
+            done, _ = await asyncio.wait({task}, timeout=timeout)
+            if done:
+                break
+            await ws.send_json({"type": "filler", "text": line})
+            timeout = FILLER_INTERVAL
+        try:
+            payload = await task
+        except SessionNotFound:
+            await ws.send_json({"type": "error", "error": "Session inconnue"})
+            continue
+        except Exception as e:
+            # LLM, SQLite... : le tour échoue, la connexion reste ouverte pour le suivant
+            await ws.send_json({"type": "error", "error": str(e)[:200] or type(e).__name__})
+            continue
+        await ws.send_json({"type": "response", **payload})
+
+        prompt = payload["response"].get("image_prompt")
+        if data.get("image") and prompt and not payload["response"].get("is_error"):
+            try:
+                media = await _run(request, request.app["media"].image, prompt, info["theme_id"], "draft")
+            except Exception as e:
+                media = {"success": False, "error": str(e)[:200] or type(e).__name__}
+            await ws.send_json({"type": "media", "kind": "image", **media})
+    return ws
+
+
+async def media_image(request):
+    data = await _body(request)
+    if len((data.get("prompt") or "").strip()) < 5:
+        raise ValueError("Prompt trop court")
+    payload = await _run(
+        request, request.app["media"].image, data["prompt"],
+        data.get("theme_id"), data.get("quality", "draft"),
+    )
+    return web.json_response(payload, status=200 if payload["success"] else 502)
+
+
+async def media_speech(request):
+    data = await _body(request)
+    result = await _run(request, request.app["media"].speech, data.get("text", ""), data.get("voice", "fr"))
+    if result is None:
+        return _json_error(503, "Synthèse vocale indisponible")
+    if not result.success:
+        return _json_error(502, result.error or "Synthèse échouée")
+    return web.Response(body=result.audio_bytes, content_type="audio/mpeg")
+
+
+def create_app(engine: Optional[GameEngine] = None, media: Optional[MediaService] = None,
+               threads: int = SERVICE_THREADS) -> "web.Application":
+    if not AIOHTTP_OK:
+        raise ImportError("Service de jeu : pip install aiohttp")
+    app = web.Application(middlewares=[web.middleware(error_middleware)])
+    app["engine"] = engine or GameEngine()
+    app["media"] = media or MediaService()
+    app["pool"] = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="hero-service")
+
+    async def on_cleanup(app):
+        app["pool"].shutdown(wait=False, cancel_futures=True)
+
+    app.on_cleanup.append(on_cleanup)
+    app.add_routes([
+        web.get("/healthz", healthz),
+        web.post("/v1/sessions", create_session),
+        web.get("/v1/sessions/{id}", get_session),
+        web.put("/v1/sessions/{id}", put_session),
+        web.delete("/v1/sessions/{id}", delete_session),
+        web.post("/v1/sessions/{id}/step", step_session),
+        web.get("/v1/sessions/{id}/stream", stream_session),
+        web.post("/v1/media/image", media_image),
+        web.post("/v1/media/speech", media_speech),
+    ])
+    return app
+
+
+def serve(host: str = SERVICE_HOST, port: int = SERVICE_PORT, reuse_port: bool = False):
+    app = create_app()
+    app["engine"].repo.prune()
+    web.run_app(app, host=host, port=port, reuse_port=reuse_port, print=None)
+
+
+# ============================================
+# LANCEMENT
+# ============================================
+
+if __name__ == "__main__":
+    import multiprocessing
+
+    parser = argparse.ArgumentParser(description="HERO IA - service de jeu")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processus partageant le port (SO_REUSEPORT) et la base des sessions")
+    args = parser.parse_args()
+
+    print(f"🎲 Service de jeu sur http://{args.host}:{args.port} ({args.workers} worker(s))")
+    if args.workers <= 1:
+        serve(args.host, args.port)
+    else:
+        workers = [
+            multiprocessing.Process(target=serve, args=(args.host, args.port, True), daemon=True)
+            for _ in range(args.workers)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,350 @@
+# ============================================
+# HERO IA - Jeu en terminal et parties scriptées
+# GameAgent sans Streamlit (jeu interactif, lots concurrents)
+# ============================================
+"""
+Deux modes, sans importer Streamlit :
+
+- Jeu interactif dans le terminal (choix du thème dans ThemeLibrary) :
+      python hero_cli.py [--theme egypt]
+- Lot de parties scriptées, jouées en parallèle, avec une transcription
+  JSON par partie et un résumé (latences, issues, tokens) :
+      python hero_cli.py batch actions.txt --sessions 20 --concurrency 8
+
+Script d'actions : une action par ligne ; "#" commente la ligne ; "@2"
+joue la 2e action suggérée par le narrateur. Un fichier .json peut aussi
+donner {"theme": "egypt", "actions": [...]}.
+
+--service URL joue contre le service de jeu (game_service.py) au lieu d'un
+GameAgent local. Démarrage en bien moins d'une seconde (groq n'est importé
+qu'à la création du premier agent) : base des tests d'endurance et de non-
+régression.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import textwrap
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import GameConfig, GameTheme, ThemeLibrary, clamp
+from game_agent import GameAgent, GameResponse
+from usage_meter import UsageMeter
+
+TRANSCRIPT_DIR = Path(os.getenv("HERO_TRANSCRIPT_DIR", Path(__file__).parent / "transcripts"))
+# Tours au maximum d'une partie scriptée
+BATCH_MAX_TURNS = 50
+
+
+# ============================================
+# ÉTAT DU JOUEUR (mêmes règles que app.py)
+# ============================================
+
+@dataclass
+class PlayerState:
+    """PV, inventaire et issue de la partie, mis à jour à chaque réponse."""
+    hp: int = GameConfig.INITIAL_HP
+    hp_max: int = GameConfig.INITIAL_HP
+    inventory: List[str] = field(default_factory=list)
+    actions: List[str] = field(default_factory=list)
+    scene: str = ""
+    status: str = "playing"  # playing / won / lost
+
+    def apply(self, response: GameResponse):
+        if response.is_error:
+            return
+        if response.hp_change:
+            self.hp = clamp(self.hp + response.hp_change, 0, self.hp_max)
+        if response.input_quality == "valid" and response.inventory_validated:
+            for item in response.inventory_add or []:
+                if item and item.strip() not in self.inventory:
+                    self.inventory.append(item.strip())
+            for item in response.inventory_remove or []:
+                for inv_item in self.inventory[:]:
+                    if inv_item.lower() == item.strip().lower():
+                        self.inventory.remove(inv_item)
+                        break
+        self.actions = response.suggested_actions
+        self.scene = response.scene_description
+        if response.game_status == "lost" or self.hp <= 0:
+            self.status = "lost"
+        elif response.game_status == "won":
+            self.status = "won"
+
+
+def new_agent(service_url: Optional[str] = None, meter=None):
+    if service_url:
+        from game_client import ServiceAgent  # requests : seulement en mode service
+        return ServiceAgent(service_url, meter=meter)
+    return GameAgent(meter=meter)
+
+
+def start(agent, theme: GameTheme) -> Tuple[PlayerState, GameResponse]:
+    stats = agent.roll_initial_stats()
+    player = PlayerState(
+        hp=stats["hp"], hp_max=stats["hp_max"],
+        inventory=list(theme.custom_inventory or GameConfig.DEFAULT_INVENTORY),
+    )
+    response = agent.initiate_game(theme, list(player.inventory))
+    player.apply(response)
+    return player, response
+
+
+def play_turn(agent, player: PlayerState, action: str, suggested: bool = False) -> GameResponse:
+    if suggested:
+        response = agent.step_with_suggested_action(action, list(player.inventory))
+    else:
+        response = agent.step(action, list(player.inventory))
+    player.apply(response)
+    return response
+
+
+# ============================================
+# JEU INTERACTIF
+# ============================================
+
+def _wrap(text: str) -> str:
+    width = min(100, shutil.get_terminal_size((100, 20)).columns - 2)
+    return "\n".join(textwrap.fill(p, width) for p in text.splitlines() if p.strip())
+
+
+def _show(player: PlayerState, response: GameResponse):
+    print()
+    print(_wrap(response.story))
+    if response.is_error:
+        return
+    print(f"\n❤️ {player.hp}/{player.hp_max}   🎒 {', '.join(player.inventory) or '(vide)'}")
+    if player.scene:
+        print(f"📍 {player.scene}")
+    if player.status == "playing":
+        for i, action in enumerate(player.actions, 1):
+            print(f"  {i}. {action}")
+
+
+def _choose_theme(theme_id: Optional[str]) -> Optional[GameTheme]:
+    themes = ThemeLibrary.get_all_themes()
+    if theme_id:
+        return ThemeLibrary.get_theme(theme_id)
+    print("\n⚔️ HERO IA\n")
+    for i, theme in enumerate(themes, 1):
+        print(f"  {i}. {theme.icon} {theme.name} - {theme.description}")
+    while True:
+        choice = input("\nThème (numéro, r = hasard, q = quitter) : ").strip().lower()
+        if choice == "q":
+            return None
+        if choice == "r":
+            return ThemeLibrary.get_random_theme()
+        if choice.isdigit() and 1 <= int(choice) <= len(themes):
+            return themes[int(choice) - 1]
+
+
+def interactive(theme_id: Optional[str] = None, service_url: Optional[str] = None) -> int:
+    # groq (~0.4 s) se charge pendant que le joueur choisit son thème
+    if not service_url:
+        threading.Thread(target=__import__, args=("groq",), daemon=True).start()
+    try:
+        theme = _choose_theme(theme_id)
+        if theme is None:
+            if theme_id:
+                print(f"❌ Thème inconnu : {theme_id}")
+                return 1
+            return 0
+        agent = new_agent(service_url)
+        print(f"\n{theme.icon} {theme.name}... le narrateur prépare l'histoire.")
+        player, response = start(agent, theme)
+        _show(player, response)
+
+        while player.status == "playing":
+            line = input("\n> ").strip()
+            if not line:
+                continue
+            if line.lower() in ("q", "quit", "/quit"):
+                break
+            suggested = line.isdigit() and 1 <= int(line) <= len(player.actions)
+            action = player.actions[int(line) - 1] if suggested else line
+            response = play_turn(agent, player, action, suggested)
+            _show(player, response)
+            if getattr(agent, "is_blocked", False):
+                print("\n⛔ Trop d'actions invalides : choisissez une action proposée.")
+    except (KeyboardInterrupt, EOFError):
+        print()
+        return 130
+    except ValueError as e:
+        print(e)
+        return 1
+
+    if player.status == "won":
+        print("\n🏆 VICTOIRE !")
+    elif player.status == "lost":
+        print("\n💀 GAME OVER")
+    return 0
+
+
+# ============================================
+# LOTS SCRIPTÉS
+# ============================================
+
+def load_script(path: Path) -> Tuple[Optional[str], List[str]]:
+    """(thème imposé ou None, actions) depuis un .txt ou un .json."""
+    text = Path(path).read_text(encoding="utf-8")
+    if Path(path).suffix == ".json":
+        data = json.loads(text)
+        if isinstance(data, list):
+            return None, [str(a) for a in data]
+        return data.get("theme"), [str(a) for a in data.get("actions", [])]
+    actions = [l.strip() for l in text.splitlines()]
+    return None, [a for a in actions if a and not a.startswith("#")]
+
+
+def run_session(index: int, theme: GameTheme, actions: List[str], out_dir: Path,
+                service_url: Optional[str] = None, max_turns: int = BATCH_MAX_TURNS) -> Dict[str, Any]:
+    """Joue une partie scriptée ; écrit sa transcription et retourne son résumé."""
+    meter = UsageMeter(f"batch-{index}", budget=0, export=False)
+    turns: List[Dict[str, Any]] = []
+    started = time.perf_counter()
+    player = PlayerState()
+
+    def record(action: Optional[str], response: GameResponse, latency: float):
+        turns.append({
+            "turn": len(turns), "action": action, "latency": round(latency, 3),
+            "story": response.story, "error": response.error_message if response.is_error else None,
+            "hp": player.hp, "inventory": list(player.inventory),
+            "scene": player.scene, "status": player.status,
+        })
+
+    try:
+        agent = new_agent(service_url, meter)
+        t0 = time.perf_counter()
+        player, response = start(agent, theme)
+        record(None, response, time.perf_counter() - t0)
+        # Introduction en échec : la partie n'a pas commencé
+        for step in actions[:max_turns] if not response.is_error else []:
+            if player.status != "playing":
+                break
+            suggested = step.startswith("@") and step[1:].isdigit()
+            if suggested:
+                n = clamp(int(step[1:]) - 1, 0, len(player.actions) - 1)
+                action = player.actions[n]
+            else:
+                action = step
+            t0 = time.perf_counter()
+            response = play_turn(agent, player, action, suggested)
+            record(action, response, time.perf_counter() - t0)
+        failure = None
+    except Exception as e:
+        failure = f"{type(e).__name__}: {str(e)[:120]}"
+
+    totals = meter.totals()
+    transcript = {
+        "session": index, "theme": theme.id, "status": player.status, "failure": failure,
+        "turns": turns, "duration": round(time.perf_counter() - started, 3),
+        "tokens": {k: totals[k] for k in ("calls", "prompt_tokens", "completion_tokens", "cost")},
+    }
+    path = out_dir / f"{index:04d}-{theme.id}.json"
+    path.write_text(json.dumps(transcript, ensure_ascii=False, indent=1), encoding="utf-8")
+    return transcript
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(transcripts: List[Dict[str, Any]], wall: float) -> Dict[str, Any]:
+    latencies = [t["latency"] for tr in transcripts for t in tr["turns"]]
+    outcomes: Dict[str, int] = {}
+    for tr in transcripts:
+        key = "failed" if tr["failure"] else tr["status"]
+        outcomes[key] = outcomes.get(key, 0) + 1
+    return {
+        "sessions": len(transcripts),
+        "turns": len(latencies),
+        "errors": sum(1 for tr in transcripts for t in tr["turns"] if t["error"]),
+        "outcomes": outcomes,
+        "wall_time": round(wall, 3),
+        "turns_per_s": round(len(latencies) / wall, 2) if wall else None,
+        "latency_p50": _percentile(latencies, 0.50),
+        "latency_p95": _percentile(latencies, 0.95),
+        "prompt_tokens": sum(tr["tokens"]["prompt_tokens"] for tr in transcripts),
+        "completion_tokens": sum(tr["tokens"]["completion_tokens"] for tr in transcripts),
+        "cost": round(sum(tr["tokens"]["cost"] for tr in transcripts), 6),
+    }
+
+
+def batch(script: Path, sessions: int, concurrency: int, theme_id: Optional[str] = None,
+          out: Path = TRANSCRIPT_DIR, service_url: Optional[str] = None) -> Dict[str, Any]:
+    """Joue `sessions` parties du script en parallèle ; thèmes en rotation si aucun n'est imposé."""
+    script_theme, actions = load_script(script)
+    theme_id = theme_id or script_theme
+    if theme_id and ThemeLibrary.get_theme(theme_id) is None:
+        raise ValueError(f"Thème inconnu : {theme_id}")
+    themes = [ThemeLibrary.get_theme(theme_id)] if theme_id else ThemeLibrary.get_all_themes()
+
+    out_dir = Path(out) / time.strftime("%Y%m%d-%H%M%S")
+    out_dir.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    transcripts = []
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="hero-batch") as pool:
+        futures = [
+            pool.submit(run_session, i, themes[i % len(themes)], actions, out_dir, service_url)
+            for i in range(sessions)
+        ]
+        for future in as_completed(futures):
+            tr = future.result()
+            transcripts.append(tr)
+            mark = "❌" if tr["failure"] else {"won": "🏆", "lost": "💀"}.get(tr["status"], "✅")
+            print(f"  {mark} partie {tr['session']:>3} ({tr['theme']}) : {len(tr['turns'])} tours "
+                  f"en {tr['duration']:.1f}s{' - ' + tr['failure'] if tr['failure'] else ''}")
+
+    summary = summarize(sorted(transcripts, key=lambda t: t["session"]), time.perf_counter() - started)
+    summary["transcripts"] = str(out_dir)
+    (out_dir / "summary.json").write_text(json.dumps(summary, ensure_ascii=False, indent=1), encoding="utf-8")
+    return summary
+
+
+# ============================================
+# LANCEMENT
+# ============================================
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="HERO IA en terminal")
+    parser.add_argument("--theme", help="identifiant du thème (ThemeLibrary)")
+    parser.add_argument("--service", default=os.getenv("HERO_SERVICE_URL") or None,
+                        help="URL du service de jeu (défaut : GameAgent local)")
+    sub = parser.add_subparsers(dest="command")
+    batch_parser = sub.add_parser("batch", help="parties scriptées en parallèle")
+    batch_parser.add_argument("script", type=Path)
+    batch_parser.add_argument("--sessions", type=int, default=10)
+    batch_parser.add_argument("--concurrency", type=int, default=4)
+    batch_parser.add_argument("--out", type=Path, default=TRANSCRIPT_DIR)
+    args = parser.parse_args(argv)
+
+    if args.command != "batch":
+        return interactive(args.theme, args.service)
+
+    try:
+        summary = batch(args.script, args.sessions, args.concurrency, args.theme, args.out, args.service)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    p50, p95 = summary["latency_p50"], summary["latency_p95"]
+    print(f"\n   {summary['sessions']} parties, {summary['turns']} tours en {summary['wall_time']:.1f}s "
+          f"({summary['turns_per_s']} tours/s)")
+    if p50 is not None:
+        print(f"   Latence par tour : p50 {p50:.2f}s, p95 {p95:.2f}s • erreurs : {summary['errors']}")
+    print(f"   Issues : {summary['outcomes']} • tokens : {summary['prompt_tokens']}+{summary['completion_tokens']}")
+    print(f"   Transcriptions : {summary['transcripts']}")
+    return 1 if summary["outcomes"].get("failed") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
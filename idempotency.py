@@ -0,0 +1,176 @@
+# ============================================
+# HERO IA - Soumissions de tour idempotentes
+# Un tour = une seule requête au LLM, quoi qu'il arrive
+# ============================================
+"""
+Chaque soumission (texte, action suggérée, voix) porte une clé dérivée de
+son contenu et du numéro de tour :
+- Double-clic, rerun interrompu, payload micro rejoué : même clé
+  -> on récupère le tour en cours ou déjà terminé au lieu d'en relancer un
+- Le tour tourne sur le pool partagé : si Streamlit interrompt le script,
+  la requête continue et le rerun suivant l'applique (une seule fois)
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Tuple, Union
+
+
+def idempotency_key(kind: str, content: Union[str, bytes], turn: int) -> str:
+    """Clé stable : SHA-256 de (tour, type, contenu)."""
+    if isinstance(content, str):
+        content = content.strip().encode("utf-8")
+    return hashlib.sha256(f"{turn}\n{kind}\n".encode("utf-8") + content).hexdigest()
+
+
+def audio_digest(audio_bytes: bytes) -> str:
+    """Empreinte d'un enregistrement (stable d'un rerun à l'autre, contrairement à id())."""
+    return hashlib.sha256(audio_bytes).hexdigest()
+
+
+def _failed(future: Future) -> bool:
+    """Tour terminé sur une exception (ou annulé)."""
+    return future.done() and (future.cancelled() or future.exception() is not None)
+
+
+@dataclass
+class Submission:
+    """Tour soumis : résultat partagé par toutes les soumissions identiques."""
+    key: str
+    turn: int
+    action: str
+    kind: str
+    future: Future
+    applied: bool = False
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class SubmissionRegistry:
+    """Soumissions récentes d'une session (en cours ou terminées)."""
+
+    MAX_ENTRIES = 32
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, Submission]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.coalesced = 0
+
+    def submit(self, key: str, turn: int, action: str, kind: str,
+               executor: Executor, fn: Callable, *args) -> Tuple[Submission, bool]:
+        """
+        Lance le tour, sauf si une soumission existe déjà.
+
+        Un seul tour à la fois : si une autre action du même tour est encore
+        en attente d'application, c'est elle qui est retournée (la première gagne).
+
+        Returns:
+            (soumission à appliquer, True si elle vient d'être créée)
+        """
+        with self._lock:
+            # Un tour en échec ne bloque pas l'action : la nouvelle soumission repart de zéro
+            if key in self._entries and _failed(self._entries[key].future):
+                del self._entries[key]
+            existing = self._entries.get(key) or self._pending_for_turn(turn)
+            if existing is not None:
+                self.coalesced += 1
+                return existing, False
+
+            submission = Submission(key, turn, action, kind, executor.submit(fn, *args))
+            self._entries[key] = submission
+            self.submitted += 1
+            while len(self._entries) > self.MAX_ENTRIES:
+                self._entries.popitem(last=False)
+            return submission, True
+
+    def _pending_for_turn(self, turn: int) -> Optional[Submission]:
+        for submission in self._entries.values():
+            if submission.turn == turn and not submission.applied and not _failed(submission.future):
+                return submission
+        return None
+
+    def pending(self, turn: int) -> Optional[Submission]:
+        """Tour soumis mais pas encore appliqué (script interrompu)."""
+        with self._lock:
+            return self._pending_for_turn(turn)
+
+    def claim(self, submission: Submission, failed: bool = False) -> bool:
+        """
+        Réserve l'application du résultat (une seule fois par soumission).
+        Un tour en échec est oublié : rejouer la même action relance le tour.
+        """
+        with self._lock:
+            if failed and self._entries.get(submission.key) is submission:
+                del self._entries[submission.key]
+            if submission.applied:
+                return False
+            submission.applied = True
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"submitted": self.submitted, "coalesced": self.coalesced}
+
+
+# ============================================
+# TEST
+# ============================================
+
+if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor
+
+    print("\n" + "=" * 60)
+    print("   TEST SOUMISSIONS IDEMPOTENTES")
+    print("=" * 60 + "\n")
+
+    calls = []
+
+    def fake_turn(action: str) -> str:
+        calls.append(action)
+        time.sleep(0.2)
+        return f"Réponse à « {action} »"
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        registry = SubmissionRegistry()
+        key = idempotency_key("suggested", "Ouvrir la porte", 3)
+        first, created = registry.submit(key, 3, "Ouvrir la porte", "suggested", pool, fake_turn, "Ouvrir la porte")
+        # Double-clic pendant que le tour est en cours
+        second, created_again = registry.submit(key, 3, "Ouvrir la porte", "suggested", pool, fake_turn, "Ouvrir la porte")
+        # Autre action du même tour pendant l'attente : la première gagne
+        other_key = idempotency_key("text", "Je fuis", 3)
+        third, _ = registry.submit(other_key, 3, "Je fuis", "text", pool, fake_turn, "Je fuis")
+
+        print(f"   Même clé -> même tour : {'✅' if first is second and not created_again else '❌'}")
+        print(f"   Un seul tour à la fois : {'✅' if third is first else '❌'}")
+        print(f"   Appels LLM             : {len(calls)} (attendu : 1)")
+        print(f"   Application unique     : {registry.claim(first)} puis {registry.claim(second)}")
+        print(f"   Résultat               : {first.future.result()}")
+        print(f"   Statistiques           : {registry.stats()}")
+
+        # Tour en échec : la même action peut être rejouée
+        def failing_turn(action: str) -> str:
+            raise RuntimeError("LLM indisponible")
+
+        retry_key = idempotency_key("text", "Je crie", 4)
+        failed, _ = registry.submit(retry_key, 4, "Je crie", "text", pool, failing_turn, "Je crie")
+        try:
+            failed.future.result()
+        except RuntimeError:
+            registry.claim(failed, failed=True)
+        retry, created = registry.submit(retry_key, 4, "Je crie", "text", pool, fake_turn, "Je crie")
+        print(f"   Rejeu après échec      : {'✅' if created and retry is not failed else '❌'} ({retry.future.result()})")
+        # Sans claim (rerun interrompu) : le tour en échec ne bloque pas non plus
+        lost, _ = registry.submit(idempotency_key("text", "Je saute", 5), 5, "Je saute", "text", pool, failing_turn, "Je saute")
+        while not lost.future.done():
+            time.sleep(0.01)
+        again, created = registry.submit(idempotency_key("text", "Je saute", 5), 5, "Je saute", "text", pool, fake_turn, "Je saute")
+        print(f"   Échec non réclamé      : {'✅' if created and registry.pending(5) is again else '❌'}")
+
+    print("\n" + "=" * 60)
@@ -1,21 +1,32 @@
 # ============================================
 # HERO IA - Image Manager (Hugging Face - Gratuit)
 # Nouvelle API : router.huggingface.co
+# Backends interchangeables + sélection par latence
 # ============================================
 
 import os
+import time
+import random
 import requests
 import base64
+from abc import ABC, abstractmethod
+from collections import deque
 from pathlib import Path
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Dict, List, Deque
 
 from dotenv import load_dotenv
 env_path = Path(__file__).parent / ".env"
 load_dotenv(env_path)
 
+from placeholder_art import render_placeholder_svg, STYLE_PALETTES
+from backend_selector import BackendSelector, QUALITY_DRAFT, QUALITY_STANDARD
+from tracing import traced, annotate
+
 HUGGINGFACE_OK = False
 HF_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
+# Routeur de remplacement (serveurs factices de load_test.py)
+HF_ROUTER_URL = os.getenv("HERO_HF_ROUTER_URL", "https://router.huggingface.co/hf-inference/models/{model}")
 
 if HF_API_KEY:
     HUGGINGFACE_OK = True
@@ -29,58 +40,113 @@ class ImageResult:
     success: bool
     image_base64: Optional[str] = None
     error: Optional[str] = None
+    backend: Optional[str] = None
+    latency: float = 0.0
 
 
-class ImageGenerator:
-    """Générateur d'images avec Hugging Face (Gratuit)."""
-    
-    STYLES = {
-        "fantasy": "epic fantasy art, magical atmosphere, detailed illustration, high quality",
-        "ancient": "ancient egyptian art style, hieroglyphics, golden colors, pharaoh, detailed",
-        "space": "sci-fi space art, cosmic, futuristic, stars and nebulas, high quality",
-        "victorian": "victorian gothic style, dark manor, candlelight, mysterious, detailed",
-        "jungle": "lush jungle environment, tropical, adventure style, exploration, vibrant",
-        "dark": "dark underwater scene, deep sea, bioluminescent, mysterious depths, atmospheric",
-    }
-    
-    def __init__(self):
+@dataclass
+class ImageParams:
+    """Paramètres de génération (taille et nombre d'étapes)."""
+    width: int
+    height: int
+    steps: int
+
+
+# Deux niveaux : brouillon rapide puis image affinée.
+# L'image s'affiche dans une colonne étroite [3, 1] : inutile de viser plus grand.
+DRAFT_PARAMS = ImageParams(width=256, height=320, steps=1)
+REFINED_PARAMS = ImageParams(width=512, height=640, steps=4)
+
+
+# ============================================
+# STYLES (partagés par tous les backends)
+# ============================================
+
+STYLES = {
+    "fantasy": "epic fantasy art, magical atmosphere, detailed illustration, high quality",
+    "ancient": "ancient egyptian art style, hieroglyphics, golden colors, pharaoh, detailed",
+    "space": "sci-fi space art, cosmic, futuristic, stars and nebulas, high quality",
+    "victorian": "victorian gothic style, dark manor, candlelight, mysterious, detailed",
+    "jungle": "lush jungle environment, tropical, adventure style, exploration, vibrant",
+    "dark": "dark underwater scene, deep sea, bioluminescent, mysterious depths, atmospheric",
+}
+
+
+# Style d'illustration de chaque thème de jeu (GameTheme.id)
+THEME_STYLES = {
+    "orient_express": "fantasy",
+    "egypt": "ancient",
+    "space": "space",
+    "manor": "victorian",
+    "jungle": "jungle",
+    "submarine": "dark",
+}
+
+
+def theme_style(theme_id: Optional[str]) -> str:
+    return THEME_STYLES.get(theme_id or "", "fantasy")
+
+
+def style_prompt(prompt: str, style: str) -> str:
+    """Enrichit le prompt avec le suffixe du style."""
+    style_suffix = STYLES.get(style, STYLES["fantasy"])
+    return f"{prompt}, {style_suffix}"
+
+
+# ============================================
+# BACKENDS
+# ============================================
+
+class ImageBackend(ABC):
+    """Interface commune des générateurs d'images."""
+    
+    name: str = "base"
+    quality: int = QUALITY_STANDARD
+    
+    @abstractmethod
+    def generate(self, prompt: str, style: str, params: Optional[ImageParams] = None) -> ImageResult:
+        ...
+
+
+class HuggingFaceBackend(ImageBackend):
+    """Modèle texte-vers-image via le routeur Hugging Face."""
+    
+    ROUTER_URL = HF_ROUTER_URL
+    
+    def __init__(self, model: str, quality: int = QUALITY_STANDARD, min_steps: int = 1, timeout: int = 120):
         if not HUGGINGFACE_OK:
             raise ValueError("HUGGINGFACE_API_KEY manquante")
         
         self.api_key = HF_API_KEY
-        self.current_style = "fantasy"
-        
-        # Nouvelle URL de l'API Hugging Face
-        self.api_url = "https://router.huggingface.co/hf-inference/models/black-forest-labs/FLUX.1-schnell"
+        self.model = model
+        self.name = f"hf:{model.split('/')[-1]}"
+        self.quality = quality
+        self.min_steps = min_steps
+        self.timeout = timeout
+        self.api_url = self.ROUTER_URL.format(model=model)
     
-    def set_style(self, style: str):
-        if style in self.STYLES:
-            self.current_style = style
-    
-    def generate_image(self, prompt: str) -> ImageResult:
-        """Génère une image avec Hugging Face."""
+    def generate(self, prompt: str, style: str, params: Optional[ImageParams] = None) -> ImageResult:
         try:
-            if not prompt or len(prompt.strip()) < 5:
-                return ImageResult(success=False, error="Prompt trop court")
-            
-            # Enrichit le prompt
-            style_suffix = self.STYLES.get(self.current_style, self.STYLES["fantasy"])
-            full_prompt = f"{prompt}, {style_suffix}"
-            
             headers = {
                 "Authorization": f"Bearer {self.api_key}",
             }
             
             payload = {
-                "inputs": full_prompt,
+                "inputs": style_prompt(prompt, style),
             }
+            if params:
+                payload["parameters"] = {
+                    "width": params.width,
+                    "height": params.height,
+                    "num_inference_steps": max(params.steps, self.min_steps),
+                }
             
             # Requête
             response = requests.post(
                 self.api_url,
                 headers=headers,
                 json=payload,
-                timeout=120
+                timeout=self.timeout
             )
             
             if response.status_code == 200:
@@ -122,6 +188,160 @@ class ImageGenerator:
             return ImageResult(success=False, error=str(e)[:100])
 
 
+class LocalPlaceholderBackend(ImageBackend):
+    """Illustration procédurale locale (CPU, instantanée, qualité brouillon)."""
+    
+    name = "local:placeholder"
+    quality = QUALITY_DRAFT
+    
+    def generate(self, prompt: str, style: str, params: Optional[ImageParams] = None) -> ImageResult:
+        primary, secondary = STYLE_PALETTES.get(style, STYLE_PALETTES["fantasy"])
+        svg = render_placeholder_svg(primary, secondary, prompt.split(), prompt[:60])
+        image_b64 = base64.b64encode(svg.encode("utf-8")).decode("utf-8")
+        return ImageResult(success=True, image_base64=image_b64)
+
+
+class StubBackend(ImageBackend):
+    """Backend factice pour les tests (latence et taux d'échec réglables)."""
+    
+    # PNG 1x1 transparent
+    PIXEL_PNG = (
+        "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+    )
+    
+    def __init__(self, name: str = "stub", quality: int = QUALITY_STANDARD,
+                 latency: float = 0.0, failure_rate: float = 0.0):
+        self.name = name
+        self.quality = quality
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+    
+    def generate(self, prompt: str, style: str, params: Optional[ImageParams] = None) -> ImageResult:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            return ImageResult(success=False, error="Échec simulé")
+        return ImageResult(success=True, image_base64=self.PIXEL_PNG)
+
+
+# Modèles Hugging Face par défaut (ordre = préférence initiale)
+# (modèle, qualité, nombre minimal d'étapes)
+HF_MODELS = [
+    ("black-forest-labs/FLUX.1-schnell", QUALITY_STANDARD, 1),
+    ("stabilityai/stable-diffusion-xl-base-1.0", QUALITY_STANDARD, 10),
+]
+
+
+def default_backends() -> List[ImageBackend]:
+    """Backends Hugging Face configurés + générateur local."""
+    backends: List[ImageBackend] = []
+    if HUGGINGFACE_OK:
+        backends.extend(
+            HuggingFaceBackend(model, quality, min_steps) for model, quality, min_steps in HF_MODELS
+        )
+    backends.append(LocalPlaceholderBackend())
+    return backends
+
+
+# ============================================
+# GÉNÉRATEUR
+# ============================================
+
+class ImageGenerator:
+    """Générateur d'images multi-backends (Hugging Face, local, stub)."""
+    
+    STYLES = STYLES
+    
+    def __init__(self, backends: Optional[List[ImageBackend]] = None):
+        if backends is None:
+            if not HUGGINGFACE_OK:
+                raise ValueError("HUGGINGFACE_API_KEY manquante")
+            backends = default_backends()
+        
+        self.backends = backends
+        # Un classement par niveau : un brouillon 1 étape et une image affinée
+        # 4 étapes n'ont pas le même coût sur un même backend
+        self.selectors: Dict[str, BackendSelector] = {
+            tier: BackendSelector(backends) for tier in ("standard", "draft", "refine")
+        }
+        self.selector = self.selectors["standard"]
+        self.current_style = "fantasy"
+        
+        # Latences mesurées séparément par niveau
+        self.timings: Dict[str, Deque[float]] = {
+            "draft": deque(maxlen=50),
+            "refine": deque(maxlen=50),
+        }
+    
+    def set_style(self, style: str):
+        if style in self.STYLES:
+            self.current_style = style
+    
+    @traced("image.generate")
+    def generate_image(self, prompt: str, min_quality: int = QUALITY_STANDARD,
+                       params: Optional[ImageParams] = None, tier: str = "standard") -> ImageResult:
+        """
+        Génère une image avec le meilleur backend disponible pour ce niveau.
+        En cas d'échec, essaie le suivant dans le classement.
+        """
+        if not prompt or len(prompt.strip()) < 5:
+            return ImageResult(success=False, error="Prompt trop court")
+        
+        selector = self.selectors[tier]
+        candidates = selector.rank(min_quality)
+        if not candidates:
+            return ImageResult(success=False, error="Aucun backend disponible")
+        
+        # Backend écarté depuis longtemps : re-mesuré en tâche de fond, pas dans ce tour
+        style = self.current_style
+        selector.probe(min_quality, lambda b: b.generate(prompt, style, params).success)
+        
+        last_error = None
+        for backend in candidates:
+            start = time.perf_counter()
+            try:
+                result = backend.generate(prompt, self.current_style, params)
+            except Exception as e:
+                result = ImageResult(success=False, error=str(e)[:100])
+            latency = time.perf_counter() - start
+            
+            selector.record(backend.name, latency, result.success)
+            result.backend = backend.name
+            result.latency = latency
+            
+            if result.success:
+                annotate(backend=backend.name, b64_chars=len(result.image_base64 or ""),
+                         width=params.width if params else None)
+                return result
+            last_error = result.error
+        
+        annotate(error=(last_error or "")[:60])
+        return ImageResult(success=False, error=last_error)
+    
+    def generate_draft(self, prompt: str) -> ImageResult:
+        """Brouillon basse résolution, peu d'étapes (affiché immédiatement)."""
+        result = self.generate_image(prompt, params=DRAFT_PARAMS, tier="draft")
+        if result.success:
+            self.timings["draft"].append(result.latency)
+        return result
+    
+    def generate_refined(self, prompt: str) -> ImageResult:
+        """Version affinée (remplace le brouillon plus tard)."""
+        result = self.generate_image(prompt, params=REFINED_PARAMS, tier="refine")
+        if result.success:
+            self.timings["refine"].append(result.latency)
+        return result
+    
+    def latency_stats(self) -> Dict[str, Optional[float]]:
+        """Latence moyenne (s) de chaque niveau."""
+        return {
+            tier: (sum(values) / len(values) if values else None)
+            for tier, values in self.timings.items()
+        }
+
+
 # ============================================
 # TEST
 # ============================================
@@ -133,18 +353,44 @@ if __name__ == "__main__":
     
     print(f"\nHugging Face: {'✅ OK' if HUGGINGFACE_OK else '❌ Non configuré'}")
     
+    print("\n🧪 Test sélecteur (stubs, hors ligne)...")
+    stubs = [
+        StubBackend("stub:lent", latency=0.05),
+        StubBackend("stub:rapide", latency=0.01),
+        StubBackend("stub:instable", latency=0.005, failure_rate=0.7),
+        LocalPlaceholderBackend(),
+    ]
+    stub_gen = ImageGenerator(backends=stubs)
+    for _ in range(30):
+        stub_gen.generate_image("A brave hero in a cave")
+    for s in stub_gen.selector.snapshot():
+        avg = f"{s['avg_latency'] * 1000:.1f} ms" if s["avg_latency"] is not None else "-"
+        print(f"   {s['name']:<20} appels={s['calls']:<3} latence={avg:<9} échecs={s['failure_rate']:.0%}")
+    draft = stub_gen.generate_image("A brave hero in a cave", min_quality=QUALITY_DRAFT)
+    print(f"   Qualité brouillon acceptée -> {draft.backend}")
+    stub_gen.selector.PROBE_AFTER = 0.0
+    probed = stub_gen.selector.probe(QUALITY_STANDARD, lambda b: b.generate("probe", "fantasy").success)
+    print(f"   Sonde en tâche de fond -> {probed}")
+    
+    for _ in range(5):
+        stub_gen.generate_draft("A brave hero in a cave")
+        stub_gen.generate_refined("A brave hero in a cave")
+    for tier, avg in stub_gen.latency_stats().items():
+        print(f"   Latence {tier:<7}: {avg * 1000:.1f} ms")
+    
     if HUGGINGFACE_OK:
         print("\n🧪 Test génération...")
         print("⏳ Peut prendre 30-90 secondes la première fois...")
         
         try:
             gen = ImageGenerator()
-            print(f"📡 URL: {gen.api_url}")
+            for backend in gen.backends:
+                print(f"📡 Backend: {backend.name} (qualité {backend.quality})")
             
             result = gen.generate_image("A brave hero standing in a dark cave with glowing crystals")
             
             if result.success:
-                print(f"✅ Image générée! ({len(result.image_base64)} chars)")
+                print(f"✅ Image générée par {result.backend} en {result.latency:.1f}s ({len(result.image_base64)} chars)")
                 
                 img_data = base64.b64decode(result.image_base64)
                 with open("test_hf_image.png", "wb") as f:
@@ -0,0 +1,622 @@
+# ============================================
+# HERO IA - Test de charge (joueurs simultanés)
+# Parties complètes contre des serveurs factices locaux
+# ============================================
+"""
+Combien de joueurs simultanés une instance tient-elle ?
+
+- Serveurs factices (aiohttp, processus séparé) qui imitent les API réelles
+  sur le fil : Groq chat + Whisper (GROQ_BASE_URL), routeur Hugging Face
+  (HERO_HF_ROUTER_URL) et gTTS (HERO_GTTS_HOST). Latence tirée d'une
+  distribution réglable, taux d'erreur réglable par service.
+- K joueurs simulés jouent des parties complètes avec les vraies classes
+  (GameAgent, AudioManager, ImageGenerator) : introduction, N actions
+  (suggérées ou libres, certaines dictées en clip vocal), image brouillon et
+  narration en parallèle comme dans app.py
+- Rapport : débit, latences p50/p95/p99 par étape, mémoire par session,
+  threads et connexions (client et serveurs factices)
+
+    python load_test.py --players 50 --actions 10 --voice-rate 0.3
+    python load_test.py --players 20 --llm-latency lognormal:2.5,0.5 --llm-errors 0.05
+    python load_test.py stubs --port 9100     (serveurs seuls, pour game_service.py)
+    python load_test.py --service http://127.0.0.1:8765   (LLM via le service ;
+        les compteurs factices du rapport ne couvrent alors que STT/image/TTS)
+
+Distributions : fixed:S, uniform:A,B, lognormal:MÉDIANE,SIGMA (secondes).
+"""
+
+import argparse
+import base64
+import gc
+import io
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+# Budget média d'un tour (s), comme app.TURN_MEDIA_BUDGET
+MEDIA_BUDGET = 8.0
+# Threads du pool partagé, comme app.get_executor()
+MEDIA_THREADS = 8
+
+
+# ============================================
+# DISTRIBUTIONS DE LATENCE
+# ============================================
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """'fixed:0.5', 'uniform:0.2,1.0' ou 'lognormal:1.2,0.4' -> tirage en secondes."""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    if kind == "fixed" and len(values) == 1:
+        return lambda: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        mu, sigma = math.log(values[0]), values[1]
+        return lambda: random.lognormvariate(mu, sigma)
+    raise ValueError(f"Distribution invalide : {spec}")
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+# ============================================
+# SERVEURS FACTICES (processus séparé)
+# ============================================
+
+STORY_SENTENCES = [
+    "Le vent siffle entre les pierres.", "Une porte grince au loin.",
+    "Une odeur de poussière ancienne flotte dans l'air.", "Des pas résonnent derrière vous.",
+    "La lumière vacille, puis se stabilise.", "Un symbole étrange brille sur le mur.",
+    "Le sol tremble légèrement sous vos pieds.", "Une voix murmure votre nom.",
+]
+SUGGESTIONS = ["Ouvrir la porte", "Examiner le symbole", "Reculer prudemment", "Appeler à l'aide",
+               "Fouiller la pièce", "Suivre les pas", "Allumer une torche", "Attendre en silence"]
+# Trame MP3 silencieuse (voir tts_backends.StubTTSBackend)
+SILENT_FRAME = b"\xff\xfb\x10\xc4" + b"\x00" * 100
+
+
+@dataclass
+class StubConfig:
+    llm_latency: str = "lognormal:1.0,0.4"
+    llm_errors: float = 0.0
+    stt_latency: str = "lognormal:0.4,0.3"
+    stt_errors: float = 0.0
+    image_latency: str = "lognormal:3.0,0.5"
+    image_errors: float = 0.0
+    tts_latency: str = "lognormal:0.3,0.3"
+    tts_errors: float = 0.0
+
+
+def _completion(messages: List[Dict[str, str]], model: str) -> Dict[str, Any]:
+    rng = random.Random()
+    story = " ".join(rng.sample(STORY_SENTENCES, 4))
+    content = json.dumps({
+        "type": "game", "story": story, "hp_change": rng.choice([0, 0, 0, -1, -2, 1]),
+        "game_status": "playing", "input_quality": "valid", "inventory_validated": True,
+        "suggested_actions": rng.sample(SUGGESTIONS, 4), "scene_description": rng.choice(STORY_SENTENCES)[:-1],
+        "image_prompt": f"A mysterious corridor, {rng.choice(['torchlight', 'moonlight', 'fog'])}",
+        "inventory_add": [], "inventory_remove": [],
+    }, ensure_ascii=False)
+    # ~4 caractères par token : l'entrée grossit avec l'historique, comme en vrai
+    prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "id": f"chatcmpl-{rng.getrandbits(48):x}", "object": "chat.completion",
+        "created": int(time.time()), "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                     "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                  "total_tokens": prompt_tokens + completion_tokens},
+    }
+
+
+def build_stub_app(config: StubConfig):
+    from aiohttp import web
+    import asyncio
+    import weakref
+
+    latency = {
+        "chat": parse_latency(config.llm_latency), "stt": parse_latency(config.stt_latency),
+        "image": parse_latency(config.image_latency), "tts": parse_latency(config.tts_latency),
+    }
+    errors = {"chat": config.llm_errors, "stt": config.stt_errors,
+              "image": config.image_errors, "tts": config.tts_errors}
+    stats: Dict[str, Any] = {
+        "requests": {k: 0 for k in latency}, "errors": {k: 0 for k in latency},
+        "inflight": 0, "inflight_peak": 0, "connections_peak": 0,
+    }
+    transports: "weakref.WeakSet" = weakref.WeakSet()
+
+    async def simulate(request, kind: str) -> bool:
+        """Latence simulée ; False si une erreur doit être renvoyée."""
+        transports.add(request.transport)
+        stats["requests"][kind] += 1
+        stats["inflight"] += 1
+        stats["inflight_peak"] = max(stats["inflight_peak"], stats["inflight"])
+        open_connections = sum(1 for t in transports if not t.is_closing())
+        stats["connections_peak"] = max(stats["connections_peak"], open_connections)
+        try:
+            await asyncio.sleep(latency[kind]())
+        finally:
+            stats["inflight"] -= 1
+        if random.random() < errors[kind]:
+            stats["errors"][kind] += 1
+            return False
+        return True
+
+    def failure():
+        return web.json_response({"error": {"message": "Service surchargé (simulé)", "type": "server_error"}},
+                                 status=503)
+
+    async def chat(request):
+        body = await request.json()
+        if not await simulate(request, "chat"):
+            return failure()
+        return web.json_response(_completion(body.get("messages", []), body.get("model", "")))
+
+    async def transcriptions(request):
+        await request.read()
+        if not await simulate(request, "stt"):
+            return failure()
+        return web.Response(text=random.choice(SUGGESTIONS).lower(), content_type="text/plain")
+
+    async def image(request):
+        await request.read()
+        if not await simulate(request, "image"):
+            return failure()
+        # Image de taille réaliste (~30-60 Ko) : le client l'encode en base64
+        return web.Response(body=b"\x89PNG\r\n\x1a\n" + os.urandom(random.randint(30_000, 60_000)),
+                            content_type="image/png")
+
+    async def batchexecute(request):
+        await request.read()
+        if not await simulate(request, "tts"):
+            return failure()
+        audio = base64.b64encode(SILENT_FRAME * random.randint(40, 120)).decode("ascii")
+        body = ")]}'\n\n" + json.dumps([["wrb.fr", "jQ1olc", f'["{audio}"]', None, None, None, "generic"]])
+        return web.Response(text=body, content_type="application/json")
+
+    async def get_stats(request):
+        current = sum(1 for t in transports if not t.is_closing())
+        return web.json_response(dict(stats, connections=current))
+
+    app = web.Application(client_max_size=32 * 1024 ** 2)
+    app.add_routes([
+        web.post("/openai/v1/chat/completions", chat),
+        web.post("/openai/v1/audio/transcriptions", transcriptions),
+        web.post("/hf/models/{model:.+}", image),
+        web.post("/_/TranslateWebserverUi/data/batchexecute", batchexecute),
+        web.get("/_stats", get_stats),
+    ])
+    return app
+
+
+def run_stubs(port: int, config: StubConfig):
+    from aiohttp import web
+    web.run_app(build_stub_app(config), host="127.0.0.1", port=port, print=None,
+                handle_signals=True, access_log=None)
+
+
+def stub_env(base: str) -> Dict[str, str]:
+    """Variables qui redirigent les clients vers les serveurs factices."""
+    return {
+        "GROQ_BASE_URL": base,
+        "GROQ_API_KEY": os.getenv("GROQ_API_KEY") or "stub",
+        "HERO_HF_ROUTER_URL": base + "/hf/models/{model}",
+        "HUGGINGFACE_API_KEY": os.getenv("HUGGINGFACE_API_KEY") or "stub",
+        "HERO_GTTS_HOST": base,
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_stubs(config: StubConfig, port: int = 0):
+    """Lance les serveurs factices ; retourne (processus, URL de base)."""
+    import multiprocessing
+    import urllib.request
+
+    port = port or free_port()
+    proc = multiprocessing.Process(target=run_stubs, args=(port, config), daemon=True)
+    proc.start()
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(base + "/_stats", timeout=1).read()
+            return proc, base
+        except OSError:
+            time.sleep(0.05)
+    proc.terminate()
+    raise RuntimeError("Serveurs factices injoignables")
+
+
+def stub_stats(base: str) -> Dict[str, Any]:
+    import urllib.request
+    with urllib.request.urlopen(base + "/_stats", timeout=5) as resp:
+        return json.loads(resp.read())
+
+
+# ============================================
+# MESURES DU PROCESSUS
+# ============================================
+
+def rss_bytes() -> Optional[int]:
+    """Mémoire résidente du processus (Linux : /proc, sinon pic via resource)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except (ImportError, OSError):
+        return None
+
+
+def open_sockets() -> Optional[int]:
+    try:
+        fds = os.listdir("/proc/self/fd")
+    except OSError:
+        return None
+    count = 0
+    for fd in fds:
+        try:
+            if os.readlink(f"/proc/self/fd/{fd}").startswith("socket:"):
+                count += 1
+        except OSError:
+            pass
+    return count
+
+
+class Sampler:
+    """Pic de threads et de sockets pendant le test."""
+
+    def __init__(self, interval: float = 0.2):
+        self.interval = interval
+        self.threads_peak = 0
+        self.sockets_peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="hero-load-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.threads_peak = max(self.threads_peak, threading.active_count())
+            self.sockets_peak = max(self.sockets_peak, open_sockets() or 0)
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+# ============================================
+# JOUEURS SIMULÉS
+# ============================================
+
+def voice_clip(seconds: float = 2.0, rate: int = 16000) -> bytes:
+    """Clip WAV bruité (unique : pas de réponse du cache de transcription)."""
+    frames = bytes(random.getrandbits(8) for _ in range(int(seconds * rate) * 2))
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(frames)
+    return buffer.getvalue()
+
+
+@dataclass
+class PlayerResult:
+    player: int
+    turns: List[Dict[str, Any]] = field(default_factory=list)
+    failure: Optional[str] = None
+    session_bytes: int = 0
+
+
+class LoadTest:
+    """K joueurs simultanés, ressources partagées comme dans une instance de app.py."""
+
+    def __init__(self, players: int, actions: int, voice_rate: float = 0.0,
+                 free_text_rate: float = 0.3, think: float = 0.0, ramp: float = 0.0,
+                 media: bool = True, service_url: Optional[str] = None):
+        self.players = players
+        self.actions = actions
+        self.voice_rate = voice_rate
+        self.free_text_rate = free_text_rate
+        self.think = think
+        self.ramp = ramp
+        self.media = media
+        self.service_url = service_url
+        self.results: List[PlayerResult] = []
+        self._lock = threading.Lock()
+
+    def _setup(self):
+        # Importés après la configuration de l'environnement (URL des serveurs factices)
+        from config import ThemeLibrary
+        from tts_cache import TTSSegmentCache
+        from tts_backends import GTTSBackend, GTTS_OK
+        from image_manager import ImageGenerator, HuggingFaceBackend, HUGGINGFACE_OK, theme_style
+        from session_store import deep_sizeof
+
+        self.themes = ThemeLibrary.get_all_themes()
+        self.deep_sizeof = deep_sizeof
+        self.executor = ThreadPoolExecutor(max_workers=MEDIA_THREADS, thread_name_prefix="hero-media")
+        # Cache TTS jetable : chaque phrase passe par le réseau factice
+        self.tts_cache = TTSSegmentCache(tempfile.mkdtemp(prefix="hero-load-tts-"))
+        self.tts_backends = [GTTSBackend()] if GTTS_OK else None
+        self.theme_style = theme_style
+        self.image_ok = HUGGINGFACE_OK
+        self.make_image_gen = lambda: ImageGenerator(backends=[
+            HuggingFaceBackend("black-forest-labs/FLUX.1-schnell"),
+        ])
+
+    def _agent(self, meter):
+        if self.service_url:
+            from game_client import ServiceAgent
+            return ServiceAgent(self.service_url, meter=meter)
+        from game_agent import GameAgent
+        return GameAgent(meter=meter)
+
+    def _media(self, audio_mgr, image_gen, response) -> Optional[float]:
+        """Image brouillon et narration en parallèle, attendues dans le budget du tour."""
+        start = time.perf_counter()
+        futures = []
+        if image_gen is not None and response.image_prompt:
+            futures.append(self.executor.submit(image_gen.generate_draft, response.image_prompt))
+        if audio_mgr is not None:
+            futures.extend(audio_mgr.start_speech(response.story).futures)
+        if not futures:
+            return None
+        deadline = start + MEDIA_BUDGET
+        for future in futures:
+            try:
+                future.result(timeout=max(0.0, deadline - time.perf_counter()))
+            except FutureTimeout:
+                break
+            except Exception:
+                pass
+        return time.perf_counter() - start
+
+    def _play(self, index: int) -> PlayerResult:
+        from audio_manager import AudioManager
+        from usage_meter import UsageMeter
+
+        result = PlayerResult(player=index)
+        rng = random.Random(index)
+        theme = self.themes[index % len(self.themes)]
+        if self.ramp:
+            time.sleep(self.ramp * index / max(1, self.players))
+        try:
+            meter = UsageMeter(f"load-{index}", budget=0, export=False)
+            agent = self._agent(meter)
+            audio_mgr = image_gen = None
+            if self.media:
+                audio_mgr = AudioManager(cache=self.tts_cache, backends=self.tts_backends)
+                if self.image_ok:
+                    image_gen = self.make_image_gen()
+                    image_gen.set_style(self.theme_style(theme.id))
+            stats = agent.roll_initial_stats()
+            hp, inventory = stats["hp"], list(theme.custom_inventory or [])
+            history: List[Dict[str, Any]] = []
+
+            for turn in range(self.actions + 1):
+                record: Dict[str, Any] = {"turn": turn, "kind": "start" if turn == 0 else "suggested"}
+                if turn == 0:
+                    t0 = time.perf_counter()
+                    future = self.executor.submit(agent.initiate_game, theme, inventory)
+                else:
+                    if self.think:
+                        time.sleep(rng.expovariate(1 / self.think))
+                    action, suggested = rng.choice(response.suggested_actions), True
+                    if rng.random() < self.voice_rate and audio_mgr is not None:
+                        t_stt = time.perf_counter()
+                        heard = audio_mgr.speech_to_text(voice_clip(rng.uniform(1.0, 3.0)))
+                        record["stt"] = time.perf_counter() - t_stt
+                        record["kind"] = "voice"
+                        if heard.success and heard.text:
+                            action, suggested = heard.text, False
+                        else:
+                            record["stt_error"] = heard.error
+                    elif rng.random() < self.free_text_rate:
+                        action, suggested = f"J'examine {rng.choice(STORY_SENTENCES).lower()}", False
+                        record["kind"] = "text"
+                    t0 = time.perf_counter()
+                    step = agent.step_with_suggested_action if suggested else agent.step
+                    future = self.executor.submit(step, action, list(inventory))
+                response = future.result()
+                record["latency"] = time.perf_counter() - t0
+                record["error"] = response.error_message if response.is_error else None
+                if not response.is_error:
+                    hp = max(0, min(stats["hp_max"], hp + response.hp_change))
+                    history.append({"content": response.story, "narrator": True, "image": None})
+                    media = self._media(audio_mgr, image_gen, response) if self.media else None
+                    if media is not None:
+                        record["media"] = media
+                result.turns.append(record)
+
+            result.session_bytes = self.deep_sizeof([agent.export_state(), history, meter.records])
+        except Exception as e:
+            result.failure = f"{type(e).__name__}: {str(e)[:120]}"
+        return result
+
+    def run(self) -> Dict[str, Any]:
+        self._setup()
+        gc.collect()
+        rss_before = rss_bytes()
+        sampler = Sampler().start()
+        started = time.perf_counter()
+        threads = [threading.Thread(target=lambda i=i: self._collect(self._play(i)),
+                                    name=f"hero-player-{i}", daemon=True)
+                   for i in range(self.players)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - started
+        rss_after = rss_bytes()
+        sampler.stop()
+        self.executor.shutdown(wait=False)
+        shutil.rmtree(self.tts_cache.root, ignore_errors=True)
+        return self.report(wall, rss_before, rss_after, sampler)
+
+    def _collect(self, result: PlayerResult):
+        with self._lock:
+            self.results.append(result)
+
+    def report(self, wall: float, rss_before: Optional[int], rss_after: Optional[int],
+               sampler: Sampler) -> Dict[str, Any]:
+        turns = [t for r in self.results for t in r.turns]
+        ok = [t for t in turns if not t["error"]]
+
+        def dist(values: List[float]) -> Dict[str, Optional[float]]:
+            return {"n": len(values), "p50": percentile(values, 0.50),
+                    "p95": percentile(values, 0.95), "p99": percentile(values, 0.99)}
+
+        sizes = [r.session_bytes for r in self.results if r.session_bytes]
+        return {
+            "players": self.players,
+            "wall_time": wall,
+            "turns": len(turns),
+            "turns_per_s": len(turns) / wall if wall else None,
+            "games_per_min": 60 * sum(1 for r in self.results if not r.failure) / wall if wall else None,
+            "error_rate": 1 - len(ok) / len(turns) if turns else None,
+            "failures": [r.failure for r in self.results if r.failure],
+            "latency": {
+                "turn": dist([t["latency"] for t in ok]),
+                "start": dist([t["latency"] for t in ok if t["kind"] == "start"]),
+                "stt": dist([t["stt"] for t in turns if "stt" in t]),
+                "media": dist([t["media"] for t in turns if "media" in t]),
+            },
+            "memory": {
+                "session_bytes_avg": sum(sizes) / len(sizes) if sizes else None,
+                "rss_delta_per_session": (rss_after - rss_before) / self.players
+                if rss_before and rss_after else None,
+                "rss_after": rss_after,
+            },
+            "threads_peak": sampler.threads_peak,
+            "sockets_peak": sampler.sockets_peak,
+        }
+
+
+# ============================================
+# LANCEMENT
+# ============================================
+
+def _fmt_dist(name: str, d: Dict[str, Optional[float]]):
+    if not d["n"]:
+        return
+    print(f"   {name:<8} n={d['n']:>5}  p50 {d['p50']:.2f}s  p95 {d['p95']:.2f}s  p99 {d['p99']:.2f}s")
+
+
+def print_report(report: Dict[str, Any], stubs: Optional[Dict[str, Any]]):
+    print("\n" + "=" * 60)
+    print(f"   {report['players']} joueurs, {report['turns']} tours en {report['wall_time']:.1f}s")
+    print("=" * 60)
+    print(f"\n   Débit        : {report['turns_per_s']:.2f} tours/s, {report['games_per_min']:.1f} parties/min")
+    print(f"   Erreurs      : {report['error_rate']:.1%} des tours, {len(report['failures'])} partie(s) interrompue(s)")
+    print("\n   Latences")
+    for name in ("turn", "start", "stt", "media"):
+        _fmt_dist(name, report["latency"][name])
+    mem = report["memory"]
+    print("\n   Mémoire")
+    if mem["session_bytes_avg"]:
+        print(f"   État d'une session     : {mem['session_bytes_avg'] / 1024:.0f} Ko")
+    if mem["rss_delta_per_session"] is not None:
+        print(f"   RSS par session        : {mem['rss_delta_per_session'] / 1024:.0f} Ko "
+              f"(RSS final {mem['rss_after'] / 1e6:.0f} Mo)")
+    print(f"\n   Threads (pic)          : {report['threads_peak']}")
+    print(f"   Sockets client (pic)   : {report['sockets_peak']}")
+    if stubs:
+        print(f"   Connexions serveurs    : pic {stubs['connections_peak']}, "
+              f"requêtes simultanées pic {stubs['inflight_peak']}")
+        print(f"   Requêtes factices      : {stubs['requests']} (erreurs injectées {stubs['errors']})")
+    for failure in report["failures"][:5]:
+        print(f"   ❌ {failure}")
+    print()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="HERO IA - test de charge")
+    parser.add_argument("command", nargs="?", choices=["run", "stubs"], default="run")
+    parser.add_argument("--players", type=int, default=10)
+    parser.add_argument("--actions", type=int, default=5)
+    parser.add_argument("--voice-rate", type=float, default=0.0, help="part des actions dictées")
+    parser.add_argument("--free-text-rate", type=float, default=0.3, help="part des actions libres")
+    parser.add_argument("--think", type=float, default=0.0, help="temps de réflexion moyen (s)")
+    parser.add_argument("--ramp", type=float, default=0.0, help="arrivée étalée des joueurs (s)")
+    parser.add_argument("--no-media", action="store_true", help="sans image ni narration")
+    parser.add_argument("--service", help="URL de game_service.py (LLM via le service)")
+    parser.add_argument("--port", type=int, default=0, help="port des serveurs factices")
+    parser.add_argument("--json", help="écrit le rapport dans ce fichier")
+    for name, default in (("llm", StubConfig.llm_latency), ("stt", StubConfig.stt_latency),
+                          ("image", StubConfig.image_latency), ("tts", StubConfig.tts_latency)):
+        parser.add_argument(f"--{name}-latency", default=default)
+        parser.add_argument(f"--{name}-errors", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    config = StubConfig(
+        llm_latency=args.llm_latency, llm_errors=args.llm_errors,
+        stt_latency=args.stt_latency, stt_errors=args.stt_errors,
+        image_latency=args.image_latency, image_errors=args.image_errors,
+        tts_latency=args.tts_latency, tts_errors=args.tts_errors,
+    )
+    for spec in (config.llm_latency, config.stt_latency, config.image_latency, config.tts_latency):
+        parse_latency(spec)
+
+    if args.command == "stubs":
+        # Premier plan : arrêter ce processus arrête les serveurs
+        port = args.port or free_port()
+        print(f"🧪 Serveurs factices sur http://127.0.0.1:{port} (Ctrl+C pour arrêter)")
+        for key, value in stub_env(f"http://127.0.0.1:{port}").items():
+            print(f"export {key}='{value}'", flush=True)
+        run_stubs(port, config)
+        return 0
+
+    proc, base = start_stubs(config, args.port)
+    os.environ.update(stub_env(base))
+    try:
+        test = LoadTest(
+            args.players, args.actions, voice_rate=args.voice_rate,
+            free_text_rate=args.free_text_rate, think=args.think, ramp=args.ramp,
+            media=not args.no_media, service_url=args.service,
+        )
+        report = test.run()
+        stubs = stub_stats(base)
+    finally:
+        proc.terminate()
+    print_report(report, stubs)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(dict(report, stubs=stubs, config=config.__dict__), f, ensure_ascii=False, indent=1)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
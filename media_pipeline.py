@@ -0,0 +1,139 @@
+# ============================================
+# HERO IA - Pipeline média par tour
+# Image et narration lancées en parallèle
+# ============================================
+"""
+Après chaque réponse du LLM, l'image et la narration sont indépendantes :
+- Chaque étape est lancée sur un pool de threads partagé
+- On attend au plus le budget du tour (et le timeout propre à chaque étape)
+- Les étapes en retard restent disponibles pour être rattachées plus tard
+
+Temps d'attente du tour = max(étapes) au lieu de leur somme.
+"""
+
+import time
+from concurrent.futures import Executor, Future, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+
+@dataclass
+class StageResult:
+    """Résultat d'une étape (valeur si terminée à temps)."""
+    name: str
+    done: bool
+    value: Any = None
+    error: Optional[str] = None
+    latency: Optional[float] = None
+
+
+class TurnMediaPipeline:
+    """Lance les étapes média d'un tour en parallèle et collecte dans le budget."""
+
+    def __init__(self, executor: Executor, budget: float = 8.0):
+        self.executor = executor
+        self.budget = budget
+        self._stages: Dict[str, Future] = {}
+        self._timeouts: Dict[str, float] = {}
+        self._latencies: Dict[str, float] = {}
+        self._started_at = time.perf_counter()
+        # Étapes vues en cours à la fin de collect() (None avant collect)
+        self._late: Optional[Dict[str, Future]] = None
+        self.wait_time: Optional[float] = None
+
+    def add(self, name: str, fn: Callable, *args, timeout: Optional[float] = None) -> Future:
+        """Soumet une étape (timeout : attente maximale pour cette étape)."""
+        started = time.perf_counter()
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(
+            lambda _f, n=name: self._latencies.__setitem__(n, time.perf_counter() - started)
+        )
+        self._stages[name] = future
+        self._timeouts[name] = timeout if timeout is not None else self.budget
+        return future
+
+    def collect(self) -> Dict[str, StageResult]:
+        """
+        Attend les étapes jusqu'à leur timeout ou la fin du budget du tour.
+
+        Returns:
+            dict: nom -> StageResult (done=False pour les étapes en retard)
+        """
+        start = time.perf_counter()
+        pending = set(self._stages.values())
+
+        while pending:
+            elapsed = time.perf_counter() - start
+            # Étapes dont le timeout est dépassé : on ne les attend plus
+            pending = {
+                f for f in pending
+                if elapsed < min(self._timeout_of(f), self.budget)
+            }
+            if not pending:
+                break
+            remaining = min(min(self._timeout_of(f) for f in pending), self.budget) - elapsed
+            _, pending = wait(pending, timeout=max(remaining, 0), return_when=FIRST_COMPLETED)
+
+        self.wait_time = time.perf_counter() - start
+        # Un seul relevé : une étape qui se termine ensuite reste « en retard »
+        # (rattachée via late()) au lieu de n'être ni dans les résultats ni en retard
+        self._late = {name: f for name, f in self._stages.items() if not f.done()}
+        return {
+            name: StageResult(name=name, done=False) if name in self._late else self._result(name, f)
+            for name, f in self._stages.items()
+        }
+
+    def late(self) -> Dict[str, Future]:
+        """Étapes non terminées à la fin de collect() (exactement celles marquées done=False)."""
+        if self._late is None:
+            return {name: f for name, f in self._stages.items() if not f.done()}
+        return dict(self._late)
+
+    def stage_latencies(self) -> Dict[str, float]:
+        """Latence réelle de chaque étape terminée (s)."""
+        return dict(self._latencies)
+
+    def _timeout_of(self, future: Future) -> float:
+        for name, f in self._stages.items():
+            if f is future:
+                return self._timeouts[name]
+        return self.budget
+
+    def _result(self, name: str, future: Future) -> StageResult:
+        if not future.done():
+            return StageResult(name=name, done=False)
+        try:
+            value = future.result()
+        except Exception as e:
+            return StageResult(name=name, done=True, error=str(e)[:100],
+                               latency=self._latencies.get(name))
+        return StageResult(name=name, done=True, value=value, latency=self._latencies.get(name))
+
+
+# ============================================
+# TEST
+# ============================================
+
+if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor
+
+    print("\n" + "=" * 60)
+    print("   TEST PIPELINE MÉDIA")
+    print("=" * 60 + "\n")
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        pipeline = TurnMediaPipeline(pool, budget=1.0)
+        pipeline.add("image", lambda: time.sleep(0.6) or "image", timeout=1.0)
+        pipeline.add("voice", lambda: time.sleep(0.4) or "voice", timeout=1.0)
+        pipeline.add("lent", lambda: time.sleep(1.5) or "lent", timeout=0.5)
+        results = pipeline.collect()
+
+        for name, r in results.items():
+            lat = f"{r.latency:.2f}s" if r.latency is not None else "-"
+            print(f"   {name:<6} terminé={'✅' if r.done else '⏳'}  latence={lat}")
+        print(f"\n   Attente du tour : {pipeline.wait_time:.2f}s (séquentiel : ~1.0s + étape lente)")
+        print(f"   En retard       : {list(pipeline.late())}")
+        time.sleep(1.2)  # L'étape lente se termine après collect()
+        print(f"   Toujours rattachée après sa fin : {'✅' if 'lent' in pipeline.late() else '❌'}")
+
+    print("\n" + "=" * 60)
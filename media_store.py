@@ -0,0 +1,231 @@
+# ============================================
+# HERO IA - Media Store (adressage par contenu)
+# Images et audio écrits une seule fois sur disque
+# ============================================
+"""
+Stockage des médias générés (images, narration) :
+- Chaque fichier est nommé par le SHA-256 de son contenu (déduplication)
+- L'historique ne garde que l'identifiant "<hash>.<ext>"
+- Le navigateur récupère les fichiers via la route statique de Streamlit
+  (server.enableStaticServing = true, dossier ./static)
+- Limite en octets avec éviction des plus anciens (date d'écriture ou de
+  dernière déduplication), en tâche de fond ; les médias encore référencés
+  (sessions, journaux de sauvegarde) ne sont jamais supprimés
+"""
+
+import base64
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional, Set
+
+
+STATIC_DIR = Path(__file__).parent / "static"
+STATIC_URL = "./app/static"
+
+
+# Type MIME -> extension
+EXTENSIONS = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/webp": ".webp",
+    "image/svg+xml": ".svg",
+    "audio/mpeg": ".mp3",
+}
+
+
+def sniff_mime(data: bytes) -> str:
+    """Devine le type MIME à partir des premiers octets."""
+    if data.startswith(b"\x89PNG"):
+        return "image/png"
+    if data.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data.lstrip()[:4] in (b"<svg", b"<?xm"):
+        return "image/svg+xml"
+    if data.startswith(b"ID3") or data[:2] in (b"\xff\xfb", b"\xff\xf3", b"\xff\xf2"):
+        return "audio/mpeg"
+    return "application/octet-stream"
+
+
+class MediaStore:
+    """Stockage sur disque adressé par contenu."""
+
+    DEFAULT_MAX_BYTES = int(os.getenv("HERO_MEDIA_MAX_MB", "500")) * 1024 * 1024
+    # Un média tout juste écrit n'est peut-être pas encore dans un historique (s)
+    MIN_AGE = 600.0
+
+    def __init__(self, root: Path = STATIC_DIR / "media", url_prefix: str = f"{STATIC_URL}/media",
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 pinned: Optional[Callable[[], Set[str]]] = None):
+        """
+        Args:
+            max_bytes: taille au-delà de laquelle les plus anciens sont supprimés
+            pinned: identifiants encore référencés (jamais supprimés)
+        """
+        self.root = Path(root)
+        self.url_prefix = url_prefix
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.pinned = pinned
+        self._lock = threading.Lock()
+        self._evicting = False
+        self._total_bytes = sum(size for _, size, _ in self._entries())
+
+    def _entries(self):
+        """(mtime, taille, chemin) de chaque média (hors fichiers temporaires)."""
+        for p in self.root.iterdir():
+            if p.suffix == ".tmp":
+                continue
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            yield st.st_mtime, st.st_size, p
+
+    def put(self, data: bytes, mime: Optional[str] = None) -> str:
+        """
+        Écrit le média (si absent) et retourne son identifiant.
+
+        Args:
+            data: Contenu binaire
+            mime: Type MIME (deviné si absent)
+
+        Returns:
+            str: Identifiant "<sha256>.<ext>"
+        """
+        mime = mime or sniff_mime(data)
+        media_id = hashlib.sha256(data).hexdigest() + EXTENSIONS.get(mime, ".bin")
+        path = self.root / media_id
+
+        if path.exists():
+            try:
+                os.utime(path)  # Déjà stocké : redevient récent (LRU)
+            except OSError:
+                pass
+        else:
+            # Écriture atomique : jamais de fichier partiel servi au navigateur
+            fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except Exception:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+            with self._lock:
+                self._total_bytes += len(data)
+                start = self._total_bytes > self.max_bytes and not self._evicting
+                self._evicting = self._evicting or start
+            if start:
+                # Hors du script : la liste des références peut demander de lire les journaux
+                threading.Thread(target=self._evict_background, name="hero-media-evict", daemon=True).start()
+
+        return media_id
+
+    def _evict_background(self):
+        try:
+            self.evict()
+        except Exception:
+            pass  # Réessayé à la prochaine écriture
+        finally:
+            with self._lock:
+                self._evicting = False
+
+    def evict(self) -> int:
+        """
+        Supprime les médias les plus anciens jusqu'à 90% de la limite, sauf ceux
+        référencés (pinned) ou écrits depuis moins de MIN_AGE.
+
+        Returns:
+            Octets libérés
+        """
+        keep = self.pinned() if self.pinned else set()
+        entries = sorted(self._entries(), key=lambda e: e[0])
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        now = time.time()
+        freed = 0
+        for mtime, size, path in entries:
+            if total <= target:
+                break
+            if path.name in keep or now - mtime < self.MIN_AGE:
+                continue
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            freed += size
+        with self._lock:
+            self._total_bytes = total
+        return freed
+
+    def put_base64(self, data_b64: str, mime: Optional[str] = None) -> str:
+        return self.put(base64.b64decode(data_b64), mime)
+
+    def path(self, media_id: str) -> Path:
+        # Le nom est toujours un simple fichier du dossier (pas de "../")
+        return self.root / Path(media_id).name
+
+    def exists(self, media_id: str) -> bool:
+        return self.path(media_id).exists()
+
+    def get(self, media_id: str) -> Optional[bytes]:
+        try:
+            return self.path(media_id).read_bytes()
+        except OSError:
+            return None
+
+    def url(self, media_id: str) -> str:
+        return f"{self.url_prefix}/{Path(media_id).name}"
+
+
+# ============================================
+# TEST
+# ============================================
+
+if __name__ == "__main__":
+    print("\n" + "=" * 60)
+    print("   TEST MEDIA STORE")
+    print("=" * 60 + "\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = MediaStore(Path(tmp))
+        png = base64.b64decode(
+            "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+        )
+        first = store.put(png)
+        second = store.put(png)
+        print(f"   Identifiant : {first}")
+        print(f"   Dédupliqué  : {'✅' if first == second and len(os.listdir(tmp)) == 1 else '❌'}")
+        print(f"   URL         : {store.url(first)}")
+        print(f"   Relecture   : {'✅' if store.get(first) == png else '❌'}")
+        b64_size = len(base64.b64encode(png))
+        print(f"   Octets      : {len(png)} (base64 : {b64_size}, +{(b64_size / len(png) - 1):.0%})")
+
+        # Éviction : les plus anciens partent, sauf les médias référencés
+        keep = set()
+        small = MediaStore(Path(tmp) / "lru", max_bytes=10_000, pinned=lambda: keep)
+        small.MIN_AGE = 0
+        ids = []
+        for i in range(20):
+            ids.append(small.put(bytes([i]) * 1000, "image/png"))
+            os.utime(small.path(ids[-1]), (i, i))  # Dates d'écriture croissantes
+            keep.add(ids[0])
+        small.evict()
+        kept = ids[0]
+        remaining = [m for m in ids if small.exists(m)]
+        print(f"   Éviction    : {len(remaining)} restants, ≤ 9 Ko : "
+              f"{'✅' if sum(small.path(m).stat().st_size for m in remaining) <= 9000 else '❌'}")
+        print(f"   Référencé   : {'✅ gardé' if small.exists(kept) else '❌ supprimé'}")
+        print(f"   Plus récent : {'✅ gardé' if small.exists(ids[-1]) else '❌ supprimé'}")
+
+    print("\n" + "=" * 60)
@@ -0,0 +1,336 @@
+# ============================================
+# HERO IA - Micro-benchmarks des chemins chauds
+# Fonctions pur Python appelées à chaque tour / chaque rerun
+# ============================================
+"""
+Mesure les fonctions exécutées à chaque tour (parsing de la réponse,
+inventaire, dés) ou à chaque rerun Streamlit (fmt_story, load_css), sur des
+données réalistes : longues histoires, gros inventaires, JSON malformé.
+
+- Hors ligne, quelques secondes : aucun appel réseau, traces désactivées
+- Référence versionnée (benchmarks/microbench.json) ; les temps sont
+  normalisés par une boucle de calibration pour rester comparables d'une
+  machine à l'autre
+- Code de sortie 1 si un benchmark dépasse la référence de plus du seuil
+  (seuil élargi pour les appels de quelques microsecondes, plus bruités)
+
+    python microbench.py                    (compare à la référence)
+    python microbench.py --update           (nouvelle référence : médiane de 3 passages)
+    python microbench.py --threshold 1.5 --only parse
+"""
+
+import argparse
+import atexit
+import json
+import logging
+import os
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Avant les imports du jeu : pas de spans écrits, client Groq construit sans clé réelle
+os.environ["HERO_TRACE"] = "0"
+os.environ.setdefault("GROQ_API_KEY", "bench")
+
+BASELINE_FILE = Path(os.getenv("HERO_BENCH_BASELINE", Path(__file__).parent / "benchmarks" / "microbench.json"))
+# Régression : temps normalisé > référence × seuil
+THRESHOLD = float(os.getenv("HERO_BENCH_THRESHOLD", "1.30"))
+# Durée minimale d'une mesure (s) et nombre de mesures (on garde la meilleure)
+MIN_TIME = 0.01
+REPEATS = 11
+# Appels de moins de SHORT_NS : plus sensibles au bruit, mesurés plus longtemps
+# et comparés avec un seuil élargi de SHORT_SLACK
+SHORT_NS = 10_000
+SHORT_REPEATS = 31
+SHORT_SLACK = 1.25
+# Passages complets pour une référence (médiane : pas de référence « chanceuse »)
+UPDATE_ROUNDS = 3
+# Nouvelles mesures d'un benchmark au-dessus du seuil avant de conclure
+CONFIRM_ROUNDS = 2
+
+
+# ============================================
+# DONNÉES RÉALISTES
+# ============================================
+
+STORY_SENTENCES = [
+    "La porte de la crypte s'ouvre dans un grincement sinistre.",
+    "Une odeur de cire froide et de pierre humide vous saisit à la gorge !",
+    "« Qui ose troubler le repos des anciens ? » murmure une voix rauque.",
+    "Des torches s'allument une à une le long du couloir, révélant des fresques effacées.",
+    "Le *gardien* se tient immobile, sa lance rouillée pointée vers vous.",
+    "Vous sentez le poids de votre sac, chaque objet cliquetant à chaque pas.",
+    "Au loin, un éboulement fait trembler la voûte… puis le silence retombe.",
+    "Sur l'autel, un parchemin scellé attend, couvert de runes que vous ne savez pas lire ?",
+    "\"Approche, voyageur\", dit le gardien, \"mais laisse tes armes au seuil.\"",
+    "🗝️ Une clé d'argent brille faiblement entre deux dalles disjointes.",
+]
+# ~2 000 caractères : une réponse longue du narrateur
+LONG_STORY = " ".join(STORY_SENTENCES * 2)
+# Texte tel qu'envoyé à la synthèse vocale (HTML de fmt_story, markdown, emojis)
+TTS_TEXT = "<p>" + "</p><p>".join(STORY_SENTENCES * 2) + "</p> **Que faites-vous ?** ⚔️🛡️"
+
+BIG_INVENTORY = [
+    f"{name} {quality}"
+    for quality in ("usé", "en bon état", "enchanté", "maudit", "d'argent")
+    for name in ("Épée courte", "Bouclier de chêne", "Potion de soin", "Corde de chanvre",
+                 "Torche", "Carte déchirée", "Clé rouillée", "Amulette", "Dague", "Arc long",
+                 "Carquois", "Grimoire", "Lanterne", "Pierre à feu", "Gourde", "Ration de voyage",
+                 "Cape de voyage", "Anneau", "Fiole vide", "Parchemin scellé", "Pied-de-biche",
+                 "Boussole", "Miroir de poche", "Sac de pièces", "Herbes médicinales", "Marteau")
+]  # 130 objets
+
+RESPONSE = {
+    "type": "game",
+    "story": LONG_STORY,
+    "hp_change": -3,
+    "game_status": "playing",
+    "input_quality": "valid",
+    "inventory_validated": True,
+    "suggested_actions": ["Ouvrir le parchemin", "Ramasser la clé d'argent",
+                          "Parler au gardien", "Reculer vers la porte"],
+    "scene_description": "Une crypte éclairée de torches, un gardien immobile devant l'autel",
+    "image_prompt": "Ancient crypt lit by torches, armored guardian before an altar, dark fantasy",
+    "inventory_add": ["Clé d'argent"],
+    "inventory_remove": ["Torche usé"],
+}
+RAW_JSON = json.dumps(RESPONSE, ensure_ascii=False, indent=2)
+RAW_FENCED = f"Voici la suite de l'aventure :\n```json\n{RAW_JSON}\n```\nBonne chance !"
+RAW_BARE_FENCE = f"```\n{RAW_JSON}\n```"
+# Réponse coupée par max_tokens : le chemin d'erreur doit rester bon marché
+RAW_TRUNCATED = RAW_JSON[: len(RAW_JSON) * 2 // 3]
+# Actions manquantes : complétées par les actions par défaut
+RAW_FEW_ACTIONS = json.dumps(dict(RESPONSE, suggested_actions=["Fuir"]), ensure_ascii=False)
+
+INV_ADD = [f"Trésor {i}" for i in range(10)] + BIG_INVENTORY[:5]
+INV_REMOVE = [item.upper() for item in BIG_INVENTORY[-10:]] + ["Objet inexistant"]
+
+
+# ============================================
+# BENCHMARKS
+# ============================================
+
+CALIBRATION_DOC = json.dumps({"items": [{"name": f"objet {i}", "qty": i} for i in range(20)]})
+
+
+def calibration():
+    """Charge de référence (dict, chaînes, regex, JSON) : normalise les temps entre machines."""
+    d = {}
+    for i in range(100):
+        d[f"k{i}"] = i * i
+    text = re.sub(r"\s+", " ", " ".join(d)).upper()
+    return sum(v for k, v in d.items() if k.endswith("7")), len(text), json.loads(CALIBRATION_DOC)
+
+
+def build_benchmarks() -> Dict[str, Callable[[], Any]]:
+    # Hors `streamlit run`, chaque accès à session_state journalise « missing
+    # ScriptRunContext » : coupé avant `import app` (set_log_level ne suffit pas,
+    # la configuration de Streamlit remet son niveau au chargement)
+    logging.disable(logging.WARNING)
+    import streamlit as st
+    import app
+    from config import DiceRoller
+    from game_agent import GameAgent, GameResponse
+    from audio_manager import AudioManager
+    from tts_cache import TTSSegmentCache
+    from tts_backends import StubTTSBackend
+    from stt_backends import StubSTTBackend
+
+    agent = GameAgent()
+    cache_dir = tempfile.mkdtemp(prefix="hero-bench-")
+    atexit.register(shutil.rmtree, cache_dir, True)
+    audio = AudioManager(cache=TTSSegmentCache(cache_dir),
+                         backends=[StubTTSBackend()], stt_backends=[StubSTTBackend()])
+    st.session_state.visual_theme = "dark"
+    st.session_state.inventory = []
+    inv_response = GameResponse(inventory_add=INV_ADD, inventory_remove=INV_REMOVE)
+    fmt_story_uncached = app.fmt_story.__wrapped__
+
+    def apply_inv():
+        st.session_state.inventory = list(BIG_INVENTORY)
+        app.apply_inv(inv_response)
+
+    def load_css():
+        # Seule la construction du CSS est mesurée, pas l'envoi au navigateur
+        markdown = st.markdown
+        st.markdown = lambda *args, **kwargs: None
+        try:
+            app.load_css()
+        finally:
+            st.markdown = markdown
+
+    return {
+        "parse_json.plain": lambda: agent._parse_json_response(RAW_JSON),
+        "parse_json.fenced": lambda: agent._parse_json_response(RAW_FENCED),
+        "parse_json.bare_fence": lambda: agent._parse_json_response(RAW_BARE_FENCE),
+        "parse_json.truncated": lambda: agent._parse_json_response(RAW_TRUNCATED),
+        "parse_json.few_actions": lambda: agent._parse_json_response(RAW_FEW_ACTIONS),
+        "format_inventory.130": lambda: agent._format_inventory_for_ai(BIG_INVENTORY),
+        "format_inventory.empty": lambda: agent._format_inventory_for_ai([]),
+        "response.from_dict": lambda: GameResponse.from_dict(RESPONSE),
+        "fmt_story.miss": lambda: fmt_story_uncached(LONG_STORY),
+        "fmt_story.hit": lambda: app.fmt_story(LONG_STORY),
+        "apply_inv.130": apply_inv,
+        "clean_text.long": lambda: audio._clean_text(TTS_TEXT),
+        "dice.roll": lambda: DiceRoller.roll("3d6+2"),
+        "dice.roll_with_details": lambda: DiceRoller.roll_with_details("4d6"),
+        "load_css": load_css,
+    }
+
+
+# ============================================
+# MESURE
+# ============================================
+
+def measure(fn: Callable[[], Any], min_time: float = MIN_TIME, repeats: int = REPEATS) -> float:
+    """
+    Meilleur temps par appel (ns) sur `repeats` mesures d'au moins `min_time` s.
+    Les appels courts (< SHORT_NS) ont au moins SHORT_REPEATS mesures de 2 × `min_time`.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed * 4 > min_time else 8
+    best = elapsed / number
+    if best * 1e9 < SHORT_NS and repeats < SHORT_REPEATS:
+        number *= 2
+        repeats = SHORT_REPEATS
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best * 1e9
+
+
+def run(benchmarks: Dict[str, Callable[[], Any]], names: List[str],
+        previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Mesure `names` ; avec `previous`, garde le meilleur des deux passages."""
+    previous = previous or {"calibration_ns": float("inf"), "results": {}}
+    # Temps relatifs à la calibration mesurée autour de chaque benchmark : un
+    # ralentissement passager de la machine touche les deux mesures et s'annule
+    relative = {name: ns / previous["calibration_ns"] for name, ns in previous["results"].items()}
+    calibration_ns = min(previous["calibration_ns"], measure(calibration))
+    for name in names:
+        fn = benchmarks[name]
+        fn()  # Échauffement (regex compilées, caches)
+        local = measure(calibration, repeats=3)
+        ns = measure(fn)
+        local = min(local, measure(calibration, repeats=3))
+        relative[name] = min(relative.get(name, float("inf")), ns / local)
+        # On garde la calibration la plus rapide (machine la moins chargée)
+        calibration_ns = min(calibration_ns, local)
+    return {"calibration_ns": round(calibration_ns, 1),
+            "results": {name: round(r * calibration_ns, 1) for name, r in relative.items()},
+            "python": sys.version.split()[0]}
+
+
+def run_median(benchmarks: Dict[str, Callable[[], Any]], names: List[str],
+               rounds: int = UPDATE_ROUNDS) -> Dict[str, Any]:
+    """Référence : médiane de `rounds` passages, chacun ramené à la même calibration."""
+    passes = [run(benchmarks, names) for _ in range(rounds)]
+    calibration_ns = min(p["calibration_ns"] for p in passes)
+    results = {
+        name: round(statistics.median(
+            p["results"][name] * calibration_ns / p["calibration_ns"] for p in passes
+        ), 1)
+        for name in names
+    }
+    return {"calibration_ns": calibration_ns, "results": results, "python": passes[0]["python"]}
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Ratio normalisé par la calibration de chaque machine (1.0 = inchangé)."""
+    scale = baseline["calibration_ns"] / current["calibration_ns"]
+    rows = []
+    for name, ns in current["results"].items():
+        ref = baseline["results"].get(name)
+        ratio = ns * scale / ref if ref else None
+        limit = threshold * SHORT_SLACK if ref and ref < SHORT_NS else threshold
+        rows.append({"name": name, "ns": ns, "baseline_ns": ref, "ratio": ratio, "threshold": limit,
+                     "regression": ratio is not None and ratio > limit})
+    return rows
+
+
+def _fmt_ns(ns: Optional[float]) -> str:
+    if ns is None:
+        return "—"
+    return f"{ns / 1000:.2f} µs" if ns >= 1000 else f"{ns:.0f} ns"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="HERO IA - micro-benchmarks")
+    parser.add_argument("--update", action="store_true", help="enregistre la référence")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help=f"ratio toléré avant régression (défaut {THRESHOLD})")
+    parser.add_argument("--only", help="benchmarks dont le nom contient ce texte")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--json", help="écrit les résultats dans ce fichier")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    benchmarks = build_benchmarks()
+    names = [name for name in benchmarks if not args.only or args.only in name]
+    current = run_median(benchmarks, names) if args.update else run(benchmarks, names)
+
+    print("\n" + "=" * 60)
+    print("   MICRO-BENCHMARKS")
+    print("=" * 60 + "\n")
+
+    if args.update:
+        if args.only and args.baseline.exists():
+            # Mise à jour partielle : les autres références sont conservées
+            baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+            scale = baseline["calibration_ns"] / current["calibration_ns"]
+            baseline["results"].update({k: round(v * scale, 1) for k, v in current["results"].items()})
+            current = baseline
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(current, indent=1, sort_keys=True) + "\n", encoding="utf-8")
+        for name, ns in current["results"].items():
+            print(f"   {name:<28} {_fmt_ns(ns):>12}")
+        print(f"\n   💾 Référence enregistrée : {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"   ❌ Pas de référence ({args.baseline}) : lancez avec --update")
+        return 1
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    rows = compare(current, baseline, args.threshold)
+    for _ in range(CONFIRM_ROUNDS):
+        # Machine partagée : une régression n'est retenue que si elle se confirme
+        suspects = [r["name"] for r in rows if r["regression"]]
+        if not suspects:
+            break
+        current = run(benchmarks, suspects, previous=current)
+        rows = compare(current, baseline, args.threshold)
+    for row in rows:
+        status = "❌" if row["regression"] else ("🆕" if row["ratio"] is None else "✅")
+        ratio = f"×{row['ratio']:.2f}" if row["ratio"] is not None else "nouveau"
+        print(f"   {status} {row['name']:<28} {_fmt_ns(row['ns']):>12}  réf. {_fmt_ns(row['baseline_ns']):>12}  {ratio}")
+
+    regressions = [r["name"] for r in rows if r["regression"]]
+    print(f"\n   Calibration : {current['calibration_ns']:.0f} ns (réf. {baseline['calibration_ns']:.0f} ns)")
+    print(f"   Seuil : ×{args.threshold:.2f} (×{args.threshold * SHORT_SLACK:.2f} sous {_fmt_ns(SHORT_NS)}) "
+          f"• {time.perf_counter() - started:.1f}s")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"current": current, "rows": rows, "threshold": args.threshold}, f, indent=1)
+    if regressions:
+        print(f"\n   ❌ {len(regressions)} régression(s) : {', '.join(regressions)}\n")
+        return 1
+    print("\n   ✅ Aucune régression\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+# ============================================
+# HERO IA - Placeholder Art (Local, CPU, instantané)
+# Illustrations procédurales SVG en attendant FLUX
+# ============================================
+"""
+Génère une petite illustration stylisée (dégradé, silhouettes, grain)
+à partir des couleurs et mots-clés d'un GameTheme et de la scène courante.
+
+- Aucune dépendance externe, aucun appel réseau
+- Rendu déterministe : même scène = même image
+- Quelques millisecondes par image (voir benchmark en bas de fichier)
+"""
+
+import base64
+import hashlib
+import random
+from typing import Callable, Dict, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from config import GameTheme
+
+
+# ============================================
+# CONSTANTES
+# ============================================
+
+WIDTH = 240
+HEIGHT = 320
+
+# Palettes de secours (quand aucun GameTheme n'est disponible)
+STYLE_PALETTES: Dict[str, Tuple[str, str]] = {
+    "fantasy": ("#4B2E83", "#D4AF37"),
+    "ancient": ("#D4AF37", "#8B4513"),
+    "space": ("#00FFAA", "#1a1a2e"),
+    "victorian": ("#8B0000", "#2F2F2F"),
+    "jungle": ("#228B22", "#8B4513"),
+    "dark": ("#000080", "#20B2AA"),
+}
+
+
+# ============================================
+# COULEURS
+# ============================================
+
+def _parse_hex(color: str) -> Tuple[int, int, int]:
+    color = (color or "").lstrip("#")
+    if len(color) == 3:
+        color = "".join(c * 2 for c in color)
+    try:
+        return int(color[0:2], 16), int(color[2:4], 16), int(color[4:6], 16)
+    except (ValueError, IndexError):
+        return 40, 40, 60
+
+
+def _mix(color_a: str, color_b: str, t: float) -> str:
+    """Mélange linéaire de deux couleurs hex (t=0 -> a, t=1 -> b)."""
+    ra, ga, ba = _parse_hex(color_a)
+    rb, gb, bb = _parse_hex(color_b)
+    return "#{:02x}{:02x}{:02x}".format(
+        int(ra + (rb - ra) * t),
+        int(ga + (gb - ga) * t),
+        int(ba + (bb - ba) * t),
+    )
+
+
+# ============================================
+# MOTIFS (selon les mots-clés d'ambiance)
+# ============================================
+
+def _motif_stars(rng: random.Random, light: str) -> str:
+    return "".join(
+        f'<circle cx="{rng.randint(0, WIDTH)}" cy="{rng.randint(0, HEIGHT // 2)}" '
+        f'r="{rng.choice((0.6, 0.9, 1.3))}" fill="{light}" opacity="{rng.uniform(0.4, 1):.2f}"/>'
+        for _ in range(40)
+    )
+
+
+def _motif_rain(rng: random.Random, light: str) -> str:
+    lines = []
+    for _ in range(35):
+        x, y = rng.randint(0, WIDTH), rng.randint(0, HEIGHT)
+        lines.append(f'<line x1="{x}" y1="{y}" x2="{x - 4}" y2="{y + 14}" stroke="{light}" stroke-width="0.8" opacity="0.35"/>')
+    return "".join(lines)
+
+
+def _motif_pyramids(rng: random.Random, light: str) -> str:
+    shapes = []
+    for _ in range(rng.randint(2, 3)):
+        cx, w = rng.randint(30, WIDTH - 30), rng.randint(60, 110)
+        base = int(HEIGHT * 0.72)
+        top = base - int(w * 0.6)
+        shapes.append(f'<polygon points="{cx - w // 2},{base} {cx},{top} {cx + w // 2},{base}" fill="{light}" opacity="0.25"/>')
+    return "".join(shapes)
+
+
+def _motif_bubbles(rng: random.Random, light: str) -> str:
+    return "".join(
+        f'<circle cx="{rng.randint(0, WIDTH)}" cy="{rng.randint(HEIGHT // 3, HEIGHT)}" '
+        f'r="{rng.randint(2, 7)}" fill="none" stroke="{light}" stroke-width="0.8" opacity="0.45"/>'
+        for _ in range(18)
+    )
+
+
+def _motif_vines(rng: random.Random, light: str) -> str:
+    paths = []
+    for _ in range(5):
+        x = rng.randint(0, WIDTH)
+        length = rng.randint(HEIGHT // 4, HEIGHT // 2)
+        paths.append(f'<path d="M{x},0 Q{x + rng.randint(-25, 25)},{length // 2} {x + rng.randint(-10, 10)},{length}" '
+                     f'stroke="{light}" stroke-width="2" fill="none" opacity="0.35"/>')
+    return "".join(paths)
+
+
+def _motif_windows(rng: random.Random, light: str) -> str:
+    y = int(HEIGHT * 0.45)
+    count = rng.randint(3, 5)
+    step = WIDTH // (count + 1)
+    return "".join(
+        f'<rect x="{step * (i + 1) - 8}" y="{y}" width="16" height="22" rx="2" fill="{light}" opacity="0.55"/>'
+        for i in range(count)
+    )
+
+
+# Mot-clé (racine) -> motif
+MOTIFS: Dict[str, Callable[[random.Random, str], str]] = {
+    "étoile": _motif_stars,
+    "vide": _motif_stars,
+    "vaisseau": _motif_stars,
+    "pluie": _motif_rain,
+    "brouillard": _motif_rain,
+    "hiver": _motif_rain,
+    "pyramide": _motif_pyramids,
+    "désert": _motif_pyramids,
+    "sable": _motif_pyramids,
+    "profondeur": _motif_bubbles,
+    "lueur": _motif_bubbles,
+    "pression": _motif_bubbles,
+    "liane": _motif_vines,
+    "ruine": _motif_vines,
+    "perroquet": _motif_vines,
+    "train": _motif_windows,
+    "chandelier": _motif_windows,
+    "bibliothèque": _motif_windows,
+}
+
+
+def _pick_motifs(words: List[str]) -> List[Callable[[random.Random, str], str]]:
+    found = []
+    for word in words:
+        word = word.lower()
+        for key, motif in MOTIFS.items():
+            if key in word and motif not in found:
+                found.append(motif)
+    return found[:2]
+
+
+# ============================================
+# RENDU
+# ============================================
+
+def _ridge(rng: random.Random, base_y: int, amplitude: int, color: str) -> str:
+    points = [f"0,{HEIGHT}"]
+    y = base_y
+    for x in range(0, WIDTH + 20, 20):
+        y = max(base_y - amplitude, min(base_y + amplitude, y + rng.randint(-amplitude // 2, amplitude // 2)))
+        points.append(f"{x},{y}")
+    points.append(f"{WIDTH},{HEIGHT}")
+    return f'<polygon points="{" ".join(points)}" fill="{color}"/>'
+
+
+def render_placeholder_svg(
+    primary_color: str,
+    secondary_color: str,
+    keywords: Optional[List[str]] = None,
+    scene_description: str = "",
+) -> str:
+    """
+    Construit le SVG de l'illustration provisoire.
+
+    Args:
+        primary_color: Couleur principale du thème (ciel)
+        secondary_color: Couleur secondaire du thème (reliefs)
+        keywords: Mots-clés d'ambiance (choix des motifs)
+        scene_description: Scène courante (graine + légende)
+
+    Returns:
+        str: Document SVG complet
+    """
+    keywords = keywords or []
+    seed_text = f"{primary_color}|{secondary_color}|{scene_description}"
+    rng = random.Random(int(hashlib.md5(seed_text.encode("utf-8")).hexdigest()[:8], 16))
+
+    sky_top = _mix(primary_color, "#000000", 0.55)
+    sky_bottom = _mix(primary_color, secondary_color, 0.5)
+    light = _mix(secondary_color, "#ffffff", 0.6)
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {WIDTH} {HEIGHT}" width="{WIDTH}" height="{HEIGHT}">',
+        '<defs>',
+        f'<linearGradient id="sky" x1="0" y1="0" x2="0" y2="1"><stop offset="0" stop-color="{sky_top}"/>'
+        f'<stop offset="1" stop-color="{sky_bottom}"/></linearGradient>',
+        f'<radialGradient id="glow"><stop offset="0" stop-color="{light}" stop-opacity="0.8"/>'
+        f'<stop offset="1" stop-color="{light}" stop-opacity="0"/></radialGradient>',
+        '<filter id="grain"><feTurbulence type="fractalNoise" baseFrequency="0.9" numOctaves="2" stitchTiles="stitch"/>'
+        '<feColorMatrix values="0 0 0 0 0  0 0 0 0 0  0 0 0 0 0  0 0 0 0.12 0"/></filter>',
+        '</defs>',
+        f'<rect width="{WIDTH}" height="{HEIGHT}" fill="url(#sky)"/>',
+        f'<circle cx="{rng.randint(40, WIDTH - 40)}" cy="{rng.randint(50, 110)}" r="{rng.randint(35, 60)}" fill="url(#glow)"/>',
+    ]
+
+    # Motifs d'ambiance (derrière les reliefs)
+    words = list(keywords) + scene_description.split()
+    for motif in _pick_motifs(words):
+        parts.append(motif(rng, light))
+
+    # Silhouettes : trois plans, du plus clair au plus sombre
+    for i, depth in enumerate((0.25, 0.55, 0.85)):
+        base_y = int(HEIGHT * (0.6 + 0.12 * i))
+        parts.append(_ridge(rng, base_y, 24 - i * 6, _mix(secondary_color, "#000000", depth)))
+
+    # Grain
+    parts.append(f'<rect width="{WIDTH}" height="{HEIGHT}" filter="url(#grain)"/>')
+
+    if scene_description:
+        caption = escape(scene_description[:38] + ("…" if len(scene_description) > 38 else ""))
+        parts.append(
+            f'<text x="{WIDTH // 2}" y="{HEIGHT - 14}" text-anchor="middle" font-family="serif" '
+            f'font-size="11" fill="{light}" opacity="0.85">{caption}</text>'
+        )
+
+    parts.append('</svg>')
+    return "".join(parts)
+
+
+def render_placeholder_base64(theme: Optional[GameTheme], scene_description: str = "") -> str:
+    """
+    Illustration provisoire encodée en base64 (image/svg+xml).
+
+    Args:
+        theme: GameTheme courant (couleurs + mots-clés), ou None
+        scene_description: Scène courante
+
+    Returns:
+        str: SVG encodé en base64
+    """
+    if theme:
+        svg = render_placeholder_svg(
+            theme.primary_color, theme.secondary_color,
+            theme.ambient_keywords, scene_description
+        )
+    else:
+        primary, secondary = STYLE_PALETTES["fantasy"]
+        svg = render_placeholder_svg(primary, secondary, [], scene_description)
+    return base64.b64encode(svg.encode("utf-8")).decode("utf-8")
+
+
+# ============================================
+# TEST / BENCHMARK
+# ============================================
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+    import time
+    from config import ThemeLibrary
+
+    print("\n" + "=" * 60)
+    print("   BENCHMARK PLACEHOLDER ART")
+    print("=" * 60 + "\n")
+
+    runs = 200
+    for gt in ThemeLibrary.get_all_themes():
+        start = time.perf_counter()
+        for i in range(runs):
+            b64 = render_placeholder_base64(gt, f"Scène de test numéro {i}")
+        elapsed_ms = (time.perf_counter() - start) * 1000 / runs
+        print(f"   {gt.icon} {gt.id:<15} {elapsed_ms:6.3f} ms/image   {len(b64):>6} chars")
+
+    path = os.path.join(tempfile.gettempdir(), "test_placeholder.svg")
+    with open(path, "wb") as f:
+        f.write(base64.b64decode(render_placeholder_base64(ThemeLibrary.get_theme("egypt"), "Le temple de Karnak")))
+    print(f"\n📁 Sauvegardée: {path}")
+    print("\n" + "=" * 60)
@@ -0,0 +1,385 @@
+# ============================================
+# HERO IA - Benchmark d'efficacité des prompts
+# Tokens envoyés au LLM au fil d'une partie, par thème
+# ============================================
+"""
+Une retouche de system_prompt.txt, du message d'ouverture (initiate_game) ou
+du bandeau d'inventaire de step() change le nombre de tokens envoyés à
+chaque tour, donc la latence et le coût, sans que rien ne le signale.
+
+- Parties scénarisées de 20 tours dans chaque thème de ThemeLibrary, jouées
+  par le vrai GameAgent : le client Groq est remplacé par un client qui
+  enregistre les messages envoyés et répond par un JSON déterministe
+- Tokens comptés localement : tokenizer.json du modèle (HERO_TOKENIZER,
+  paquet tokenizers), sinon tiktoken si ses encodages sont en cache, sinon
+  estimation par découpage en mots. tiktoken (o200k_base) est l'encodage de
+  GPT-4o, pas celui de Llama : ses comptes sont marqués ≈ comme l'estimation
+- Avec une référence, le tokenizer par défaut est celui de la référence ;
+  code de sortie 1 s'il est indisponible sur la machine
+- Rapport : tokens d'entrée par tour, cumul, croissance par tour, latence
+  de prefill et coût estimés, écart à la référence (benchmarks/prompt_tokens.json)
+- Aucun réseau ; code de sortie 1 si le cumul dépasse la référence de plus du seuil
+
+    python prompt_bench.py                     (compare à la référence)
+    python prompt_bench.py --update            (enregistre une nouvelle référence)
+    python prompt_bench.py --context-turns 6   (contexte court du palier budget)
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+# Avant les imports du jeu : pas de spans écrits, client Groq construit sans clé réelle
+os.environ["HERO_TRACE"] = "0"
+os.environ.setdefault("GROQ_API_KEY", "bench")
+
+from config import LLMConfig, ThemeLibrary, GameTheme
+from game_agent import GameAgent
+from hero_cli import PlayerState
+from usage_meter import call_cost
+
+TIKTOKEN_OK = False
+try:
+    import tiktoken
+    TIKTOKEN_OK = True
+except ImportError:
+    pass
+
+TOKENIZERS_OK = False
+try:
+    from tokenizers import Tokenizer
+    TOKENIZERS_OK = True
+except ImportError:
+    pass
+
+BASELINE_FILE = Path(os.getenv("HERO_PROMPT_BASELINE", Path(__file__).parent / "benchmarks" / "prompt_tokens.json"))
+# tokenizer.json du modèle (ex. Llama 3), prioritaire sur tiktoken et l'estimation
+TOKENIZER_FILE = os.getenv("HERO_TOKENIZER", "")
+# Régression : cumul des tokens d'entrée > référence × (1 + seuil)
+THRESHOLD = float(os.getenv("HERO_PROMPT_THRESHOLD", "0.02"))
+# Débit de prefill indicatif (tokens d'entrée traités par seconde)
+PREFILL_TPS = float(os.getenv("HERO_PREFILL_TPS", "6000"))
+# Tokens du gabarit de chat autour de chaque message (rôle, séparateurs)
+MESSAGE_OVERHEAD = 5
+TURNS = 20
+
+
+# ============================================
+# COMPTAGE DES TOKENS
+# ============================================
+
+_PIECES = re.compile(r" ?[^\W\d_]+| ?\d{1,3}| ?[^\w\s]+|\s+")
+
+
+def approx_tokens(text: str) -> int:
+    """Estimation sans tokenizer : mots ~4 caractères/token, symboles ~2, nombres par 3 chiffres."""
+    count = 0
+    for piece in _PIECES.findall(text):
+        stripped = piece.strip()
+        if not stripped:
+            count += piece.count("\n") > 0
+        elif stripped[0].isalpha():
+            count += math.ceil(len(stripped) / 4)
+        elif stripped[0].isdigit():
+            count += 1
+        else:
+            count += math.ceil(len(stripped) / 2)
+    return count
+
+
+def is_approximate(name: str) -> bool:
+    """Comptes qui ne sont pas ceux du tokenizer du modèle (estimation, encodage d'un autre modèle)."""
+    return name == "approx" or name.startswith("tiktoken:")
+
+
+def tokenizer_choice(name: str) -> str:
+    """Valeur de --tokenizer qui redonne le tokenizer d'une référence ("hf:llama3" -> "hf")."""
+    return name.split(":", 1)[0]
+
+
+def load_tokenizer(choice: str = "auto") -> tuple:
+    """(nom, fonction texte -> tokens) selon ce qui est disponible hors ligne."""
+    if choice in ("auto", "hf") and TOKENIZERS_OK and TOKENIZER_FILE and Path(TOKENIZER_FILE).exists():
+        tokenizer = Tokenizer.from_file(TOKENIZER_FILE)
+        return f"hf:{Path(TOKENIZER_FILE).parent.name or TOKENIZER_FILE}", \
+            lambda text: len(tokenizer.encode(text, add_special_tokens=False).ids)
+    if choice in ("auto", "tiktoken") and TIKTOKEN_OK:
+        try:
+            # Encodage de GPT-4o (approximation pour Llama) ; échoue hors ligne si absent du cache
+            encoding = tiktoken.get_encoding("o200k_base")
+            return f"tiktoken:{encoding.name}", lambda text: len(encoding.encode(text, disallowed_special=()))
+        except Exception:
+            pass
+    if choice not in ("auto", "approx"):
+        raise RuntimeError(f"Tokenizer '{choice}' indisponible hors ligne")
+    return "approx", approx_tokens
+
+
+# ============================================
+# PARTIES SCÉNARISÉES
+# ============================================
+
+SENTENCES = [
+    "Un silence pesant s'installe, seulement troublé par le craquement du bois.",
+    "Vous avancez prudemment, chaque pas soulevant un peu de poussière.",
+    "« Vous n'auriez pas dû venir ici », souffle une voix derrière vous.",
+    "Une lueur vacillante révèle des inscriptions à demi effacées sur le mur.",
+    "Votre cœur s'accélère : quelque chose a bougé dans l'ombre.",
+    "L'air se charge d'une odeur métallique, presque électrique.",
+    "Vous remarquez une trace récente sur le sol, comme si l'on avait traîné un objet lourd.",
+    "Un mécanisme cliquette quelque part, puis plus rien.",
+    "La situation vous échappe un instant, mais vous reprenez vite vos esprits.",
+    "Au loin, un cri bref déchire le calme, suivi d'un bruit de course.",
+]
+ACTIONS = [
+    "Examiner les inscriptions de plus près", "Suivre la trace sur le sol",
+    "Interroger la personne la plus proche", "Fouiller les alentours en silence",
+    "Revenir sur mes pas", "Attendre caché dans l'ombre",
+    "Forcer la porte", "Appeler pour voir si quelqu'un répond",
+]
+FOUND_ITEMS = ["Clé en laiton", "Carnet annoté", "Fiole inconnue", "Médaillon terni", "Plan sommaire"]
+
+
+def scripted_response(theme: GameTheme, turn: int) -> str:
+    """Réponse JSON déterministe (même longueur à chaque lancement) du narrateur."""
+    rng = random.Random(f"{theme.id}:{turn}")
+    found = [FOUND_ITEMS[(turn // 4) % len(FOUND_ITEMS)]] if turn and turn % 4 == 0 else []
+    return json.dumps({
+        "type": "init" if turn == 0 else "game",
+        "story": " ".join(rng.sample(SENTENCES, 6 if turn == 0 else 4)),
+        "hp_change": rng.choice([0, 0, 0, -1, 1]),
+        "game_status": "playing",
+        "input_quality": "valid",
+        "inventory_validated": True,
+        "suggested_actions": rng.sample(ACTIONS, 4),
+        "scene_description": rng.choice(SENTENCES)[:-1],
+        "image_prompt": f"{theme.name}, cinematic scene, dramatic lighting, detailed",
+        "inventory_add": found,
+        "inventory_remove": [],
+    }, ensure_ascii=False, indent=2)
+
+
+def scripted_action(player: PlayerState, turn: int) -> str:
+    """Alternance action suggérée / action libre citant un objet de l'inventaire."""
+    if turn % 2 and player.actions:
+        return player.actions[turn % len(player.actions)]
+    item = player.inventory[turn % len(player.inventory)] if player.inventory else "mes mains"
+    return f"{ACTIONS[turn % len(ACTIONS)]} en utilisant {item}"
+
+
+class ScriptedClient:
+    """Remplace le client Groq : garde les messages de chaque appel, répond par le script."""
+
+    def __init__(self, respond: Callable[[int], str]):
+        self.respond = respond
+        self.calls: List[Dict[str, Any]] = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model: str, messages: List[Dict[str, str]], **kwargs):
+        content = self.respond(len(self.calls))
+        # Copie : l'historique de l'agent continue de grandir après l'appel
+        self.calls.append({"model": model, "messages": list(messages), "output": content})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+
+def play(theme: GameTheme, turns: int, context_turns: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Joue une partie scénarisée ; retourne les appels (modèle, messages, sortie)."""
+    agent = GameAgent()
+    client = ScriptedClient(lambda i: scripted_response(theme, i))
+    agent.client = client
+    agent.context_turns = context_turns
+    player = PlayerState(inventory=list(theme.custom_inventory or []))
+    player.apply(agent.initiate_game(theme, list(player.inventory)))
+    for turn in range(1, turns + 1):
+        player.apply(agent.step(scripted_action(player, turn), list(player.inventory)))
+    return client.calls
+
+
+# ============================================
+# MESURE
+# ============================================
+
+def slope(values: List[float]) -> float:
+    """Pente des moindres carrés (tokens ajoutés par tour)."""
+    n = len(values)
+    if n < 2:
+        return 0.0
+    mean_x, mean_y = (n - 1) / 2, sum(values) / n
+    num = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(values))
+    return num / sum((x - mean_x) ** 2 for x in range(n))
+
+
+def measure_theme(theme: GameTheme, count: Callable[[str], int], turns: int,
+                  context_turns: Optional[int], model: str) -> Dict[str, Any]:
+    memo: Dict[str, int] = {}
+
+    def tokens(text: str) -> int:
+        if text not in memo:
+            memo[text] = count(text)
+        return memo[text]
+
+    calls = play(theme, turns, context_turns)
+    per_turn, outputs, cost = [], [], 0.0
+    for call in calls:
+        input_tokens = sum(tokens(m["content"]) + MESSAGE_OVERHEAD for m in call["messages"])
+        output_tokens = tokens(call["output"])
+        per_turn.append(input_tokens)
+        outputs.append(output_tokens)
+        cost += call_cost(model, input_tokens, output_tokens)
+    opening = calls[0]["messages"]
+    return {
+        "theme": theme.id,
+        "input_tokens": per_turn,
+        "cumulative_input": sum(per_turn),
+        "cumulative_output": sum(outputs),
+        "system_prompt": tokens(opening[0]["content"]),
+        "opening_message": tokens(opening[1]["content"]),
+        # Dernier message utilisateur de chaque tour : bandeau d'inventaire + action
+        "step_message_avg": round(sum(tokens(c["messages"][-1]["content"]) for c in calls[1:])
+                                  / max(1, len(calls) - 1), 1),
+        "growth_per_turn": round(slope(per_turn), 1),
+        "prefill_s": round(sum(per_turn) / PREFILL_TPS, 2),
+        "last_turn_prefill_s": round(per_turn[-1] / PREFILL_TPS, 3),
+        "cost": round(cost, 5),
+    }
+
+
+def run(tokenizer: str = "auto", turns: int = TURNS, context_turns: Optional[int] = None,
+        model: str = LLMConfig.DEFAULT_MODEL) -> Dict[str, Any]:
+    name, count = load_tokenizer(tokenizer)
+    themes = [measure_theme(theme, count, turns, context_turns, model)
+              for theme in ThemeLibrary.get_all_themes()]
+    return {
+        "tokenizer": name, "turns": turns, "context_turns": context_turns, "model": model,
+        "prefill_tps": PREFILL_TPS,
+        "total_input": sum(t["cumulative_input"] for t in themes),
+        "total_cost": round(sum(t["cost"] for t in themes), 5),
+        "themes": {t["theme"]: t for t in themes},
+    }
+
+
+# ============================================
+# RAPPORT
+# ============================================
+
+def _delta(current: float, reference: Optional[float]) -> str:
+    if not reference:
+        return "nouveau"
+    return f"{(current - reference) / reference:+.1%}"
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Thèmes (et total) dont le cumul d'entrée dépasse la référence au-delà du seuil."""
+    regressions = []
+    for theme_id, result in current["themes"].items():
+        reference = baseline["themes"].get(theme_id)
+        if reference and result["cumulative_input"] > reference["cumulative_input"] * (1 + threshold):
+            regressions.append(theme_id)
+    if current["total_input"] > baseline["total_input"] * (1 + threshold):
+        regressions.append("total")
+    return regressions
+
+
+def print_report(current: Dict[str, Any], baseline: Optional[Dict[str, Any]]):
+    approx = "≈" if is_approximate(current["tokenizer"]) else ""
+    ref_themes = baseline["themes"] if baseline else {}
+    context = f"contexte {current['context_turns']} échanges" if current["context_turns"] else "contexte complet"
+    label = f"{current['tokenizer']} (approximation)" if approx else current["tokenizer"]
+    print(f"   Tokenizer {label} • {current['turns']} tours • {context} • {current['model']}\n")
+    print(f"   {'thème':<16}{'system':>8}{'ouvert.':>9}{'tour':>7}{'1er':>8}{'dernier':>9}"
+          f"{'+/tour':>8}{'cumul':>10}{'réf.':>9}")
+    for theme_id, t in current["themes"].items():
+        ref = ref_themes.get(theme_id, {})
+        print(f"   {theme_id:<16}{t['system_prompt']:>8}{t['opening_message']:>9}{t['step_message_avg']:>7.0f}"
+              f"{t['input_tokens'][0]:>8}{t['input_tokens'][-1]:>9}{t['growth_per_turn']:>8.0f}"
+              f"{approx}{t['cumulative_input']:>9}{_delta(t['cumulative_input'], ref.get('cumulative_input')):>9}")
+
+    total = current["total_input"]
+    prefill = sum(t["prefill_s"] for t in current["themes"].values())
+    print(f"\n   Entrée cumulée : {approx}{total} tokens ({len(current['themes'])} parties)")
+    print(f"   Prefill estimé : {prefill:.1f}s au total, "
+          f"{max(t['last_turn_prefill_s'] for t in current['themes'].values()):.2f}s au dernier tour "
+          f"({current['prefill_tps']:.0f} tokens/s)")
+    print(f"   Coût estimé    : {current['total_cost']:.4f}$ "
+          f"({current['total_cost'] / len(current['themes']):.4f}$ par partie)")
+    if baseline:
+        ratio = total / baseline["total_input"] - 1
+        ref_prefill = baseline["total_input"] / baseline.get("prefill_tps", current["prefill_tps"])
+        print(f"\n   Référence      : {baseline['total_input']} tokens • écart {ratio:+.1%} • "
+              f"prefill {total / current['prefill_tps'] - ref_prefill:+.2f}s • "
+              f"coût {current['total_cost'] - baseline['total_cost']:+.4f}$")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="HERO IA - tokens des prompts par thème")
+    parser.add_argument("--update", action="store_true", help="enregistre la référence")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help=f"hausse tolérée du cumul (défaut {THRESHOLD:.0%})")
+    parser.add_argument("--turns", type=int, default=TURNS)
+    parser.add_argument("--context-turns", type=int, help="échanges gardés (contexte court)")
+    parser.add_argument("--model", default=LLMConfig.DEFAULT_MODEL, help="prix utilisés pour le coût")
+    parser.add_argument("--tokenizer", choices=["auto", "hf", "tiktoken", "approx"],
+                        help="défaut : celui de la référence (auto avec --update ou sans référence)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--json", help="écrit les résultats dans ce fichier")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if not args.update and args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    # Même tokenizer que la référence : sinon la comparaison serait sautée
+    choice = args.tokenizer or (tokenizer_choice(baseline["tokenizer"]) if baseline else "auto")
+    try:
+        current = run(choice, args.turns, args.context_turns, args.model)
+    except RuntimeError as e:
+        reference = f" (référence mesurée avec {baseline['tokenizer']})" if baseline else ""
+        print(f"\n   ❌ {e}{reference}\n")
+        return 1
+
+    print("\n" + "=" * 60)
+    print("   TOKENS DES PROMPTS")
+    print("=" * 60 + "\n")
+
+    if args.update:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(current, ensure_ascii=False, indent=1) + "\n", encoding="utf-8")
+        print_report(current, None)
+        print(f"\n   💾 Référence enregistrée : {args.baseline}\n")
+        return 0
+
+    comparable = baseline is not None and all(
+        baseline.get(k) == current[k] for k in ("tokenizer", "turns", "context_turns")
+    )
+    print_report(current, baseline if comparable else None)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=1)
+
+    if baseline is None:
+        print(f"\n   ❌ Pas de référence ({args.baseline}) : lancez avec --update\n")
+        return 1
+    if baseline["tokenizer"] != current["tokenizer"]:
+        print(f"\n   ❌ Tokenizer {current['tokenizer']} ≠ référence {baseline['tokenizer']} : "
+              f"comparaison impossible\n")
+        return 1
+    if not comparable:
+        print(f"\n   ⚠️ Référence mesurée autrement ({baseline['tokenizer']}, {baseline['turns']} tours, "
+              f"contexte {baseline['context_turns'] or 'complet'}) : pas de comparaison\n")
+        return 0
+    regressions = compare(current, baseline, args.threshold)
+    if regressions:
+        print(f"\n   ❌ Hausse > {args.threshold:.0%} : {', '.join(regressions)}\n")
+        return 1
+    print(f"\n   ✅ Aucune hausse au-delà de {args.threshold:.0%}\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,544 @@
+# ============================================
+# HERO IA - Sauvegarde par journal d'événements
+# Journal append-only par partie + instantanés compacts
+# ============================================
+"""
+Chaque partie a son dossier saves/<joueur>/<game_id>/ :
+- journal.jsonl : un événement par ligne, jamais réécrit
+    start : état initial complet (thème, PV, inventaire, messages du LLM)
+    turn  : nouveaux messages du LLM, messages affichés, deltas PV /
+            inventaire, actions, scène, statut, compteurs anti-troll
+    media : image rattachée après coup (identifiant MediaStore)
+    end   : partie abandonnée
+- snapshot.json : état complet + nombre d'événements qu'il couvre,
+  réécrit atomiquement tous les SNAPSHOT_EVERY événements (ou sur demande)
+- lease.json : bail d'écriture de la session qui a la partie ouverte
+- meta.json : résumé (PV, tours, statut, date) réécrit à chaque tour ;
+  list_saves ne lit que lui, jamais le journal
+
+Chaque partie appartient à un joueur (GameState.owner) : list_saves ne
+parcourt que son dossier. Une seule session écrit dans un journal à la fois :
+le bail est renouvelé à chaque écriture, une autre session ne peut ouvrir
+la partie qu'après son expiration (onglet fermé ou inactif).
+
+Reprise = dernier instantané + rejeu des événements suivants. Aucun appel
+au LLM n'est rejoué : ses réponses sont dans le journal.
+
+Un tour coûte l'ajout d'une ligne (quelques Ko) : la sauvegarde est
+automatique et le bouton "Sauvegarder" ne fait que forcer un instantané.
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from copy import deepcopy
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+SAVE_DIR = Path(os.getenv("HERO_SAVE_DIR", Path(__file__).parent / "saves"))
+SNAPSHOT_EVERY = 25
+JOURNAL_VERSION = 1
+LEASE_SECONDS = float(os.getenv("HERO_SAVE_LEASE", "90"))
+
+_lease_lock = threading.Lock()
+# Identifiant de joueur utilisable comme nom de dossier
+_OWNER_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+# Identifiant MediaStore ("<sha256>.<ext>") tel qu'écrit dans les journaux
+_MEDIA_RE = re.compile(r"[0-9a-f]{64}\.[a-z0-9]{2,4}")
+
+
+class JournalLocked(OSError):
+    """Partie déjà ouverte par une autre session active."""
+
+
+# ============================================
+# ÉTAT D'UNE PARTIE
+# ============================================
+
+@dataclass
+class GameState:
+    """État sérialisable d'une partie (agent + interface)."""
+    game_id: str
+    theme_id: str
+    owner: str = ""  # Joueur propriétaire (seules ses parties lui sont proposées)
+    hp: int = 20
+    hp_max: int = 20
+    inventory: List[str] = field(default_factory=list)
+    history: List[Dict[str, Any]] = field(default_factory=list)  # {'content', 'narrator', 'image'}
+    actions: List[str] = field(default_factory=list)
+    scene: str = ""
+    game_active: bool = True
+    game_over: bool = False
+    victory: bool = False
+    # GameAgent.export_state()
+    agent: Dict[str, Any] = field(default_factory=dict)
+    started_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    @property
+    def turns(self) -> int:
+        return sum(1 for m in self.history if not m.get("narrator"))
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "GameState":
+        known = cls.__dataclass_fields__
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+@dataclass
+class SaveSummary:
+    """Résumé d'une partie (meta.json) : de quoi l'afficher sans rejouer le journal."""
+    game_id: str
+    theme_id: str
+    owner: str = ""
+    hp: int = 20
+    hp_max: int = 20
+    turns: int = 0
+    game_active: bool = True
+    updated_at: float = field(default_factory=time.time)
+
+    @classmethod
+    def of(cls, state: GameState) -> "SaveSummary":
+        return cls(state.game_id, state.theme_id, state.owner, state.hp, state.hp_max,
+                   state.turns, state.game_active, state.updated_at)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SaveSummary":
+        known = cls.__dataclass_fields__
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+def valid_owner(owner: str) -> bool:
+    return bool(_OWNER_RE.match(owner))
+
+
+def owner_dir(owner: str, root: Path = SAVE_DIR) -> Path:
+    """Dossier des parties d'un joueur (racine pour les parties sans joueur)."""
+    if not owner:
+        return Path(root)
+    if not valid_owner(owner):
+        raise ValueError(f"Identifiant de joueur invalide : {owner!r}")
+    return Path(root) / owner
+
+
+def _write_atomic(path: Path, payload: str):
+    """Écrit un fichier d'un bloc : fichier temporaire puis renommage."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(payload)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _remove_items(inventory: List[str], items: List[str]):
+    for item in items:
+        for inv_item in inventory[:]:
+            if inv_item.lower() == item.strip().lower():
+                inventory.remove(inv_item)
+                break
+
+
+def inventory_delta(before: List[str], after: List[str]) -> Dict[str, List[str]]:
+    """Objets ajoutés / retirés entre deux inventaires (multi-ensembles)."""
+    added, remaining = [], list(before)
+    for item in after:
+        if item in remaining:
+            remaining.remove(item)
+        else:
+            added.append(item)
+    return {"add": added, "remove": remaining}
+
+
+def apply_event(state: GameState, event: Dict[str, Any]) -> GameState:
+    """Rejoue un événement sur l'état (sans effet de bord)."""
+    kind = event.get("type")
+    if kind == "turn":
+        state.agent.setdefault("conversation_history", []).extend(event.get("messages", []))
+        for key in ("useless_counter", "is_blocked", "model", "api_calls"):
+            if key in event.get("agent", {}):
+                state.agent[key] = event["agent"][key]
+        state.history.extend(event.get("history", []))
+        state.hp += event.get("hp_delta", 0)
+        _remove_items(state.inventory, event.get("inventory_remove", []))
+        state.inventory.extend(event.get("inventory_add", []))
+        if "actions" in event:
+            state.actions = event["actions"]
+        if "scene" in event:
+            state.scene = event["scene"]
+        status = event.get("status", "playing")
+        state.game_over = status == "lost"
+        state.victory = status == "won"
+        state.game_active = status == "playing"
+    elif kind == "end":
+        state.game_active = False
+    elif kind == "media":
+        index = event["index"]
+        if 0 <= index < len(state.history):
+            state.history[index]["image"] = event["image"]
+    state.updated_at = event.get("ts", state.updated_at)
+    return state
+
+
+# ============================================
+# JOURNAL
+# ============================================
+
+class GameJournal:
+    """Journal append-only d'une partie, avec instantanés périodiques."""
+
+    def __init__(self, game_id: str, root: Path = SAVE_DIR, snapshot_every: int = SNAPSHOT_EVERY,
+                 holder: str = "", owner: str = ""):
+        self.game_id = game_id
+        self.dir = owner_dir(owner, root) / game_id
+        self.snapshot_every = snapshot_every
+        self.holder = holder          # session qui écrit dans le journal
+        self.lease_until = 0.0
+        self.events = 0               # événements écrits dans le journal
+        self.snapshot_events = 0      # événements couverts par le dernier instantané
+        self.messages_seen = 0        # messages du LLM déjà journalisés
+        self.write_times: List[float] = []
+        self.summary: Optional[SaveSummary] = None
+        self._lock = threading.Lock()
+
+    @property
+    def journal_path(self) -> Path:
+        return self.dir / "journal.jsonl"
+
+    @property
+    def snapshot_path(self) -> Path:
+        return self.dir / "snapshot.json"
+
+    @property
+    def lease_path(self) -> Path:
+        return self.dir / "lease.json"
+
+    @property
+    def meta_path(self) -> Path:
+        return self.dir / "meta.json"
+
+    @classmethod
+    def create(cls, state: GameState, root: Path = SAVE_DIR, holder: str = "") -> "GameJournal":
+        """Nouvelle partie : le premier événement contient l'état initial complet."""
+        journal = cls(state.game_id, root, holder=holder, owner=state.owner)
+        journal.dir.mkdir(parents=True, exist_ok=True)
+        journal.acquire()
+        journal.messages_seen = len(state.agent.get("conversation_history", []))
+        journal.summary = SaveSummary.of(state)
+        journal._append({"type": "start", "version": JOURNAL_VERSION, "state": asdict(state)})
+        return journal
+
+    # ------------------------------------------
+    # Bail d'écriture (une session à la fois)
+    # ------------------------------------------
+
+    def _read_lease(self) -> Dict[str, Any]:
+        try:
+            with open(self.lease_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def acquire(self) -> bool:
+        """
+        Prend (ou renouvelle) le bail d'écriture pour self.holder.
+
+        Returns:
+            False si une autre session a la partie ouverte et que son bail court encore
+        """
+        with _lease_lock:
+            lease = self._read_lease()
+            now = time.time()
+            if lease.get("holder", self.holder) != self.holder and lease.get("expires", 0) > now:
+                return False
+            expires = now + LEASE_SECONDS
+            _write_atomic(self.lease_path, json.dumps({"holder": self.holder, "expires": expires}))
+            self.lease_until = expires
+            return True
+
+    def renew(self) -> bool:
+        """Renouvelle le bail à mi-parcours (pas d'accès disque avant)."""
+        if self.lease_until - time.time() > LEASE_SECONDS / 2:
+            return True
+        return self.acquire()
+
+    def release(self):
+        """Libère le bail (partie quittée) : une autre session peut l'ouvrir tout de suite."""
+        with _lease_lock:
+            if self.lease_until and self._read_lease().get("holder") == self.holder:
+                try:
+                    self.lease_path.unlink()
+                except OSError:
+                    pass  # Déjà supprimé : le bail expirera de lui-même sinon
+            self.lease_until = 0.0
+
+    def _append(self, event: Dict[str, Any]):
+        event.setdefault("ts", time.time())
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        start = time.perf_counter()
+        if not self.renew():
+            raise JournalLocked(f"Partie ouverte dans une autre session : {self.game_id}")
+        with self._lock:
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(line)
+            self.events += 1
+            if self.summary is not None and event["type"] != "media":
+                self.summary.updated_at = event["ts"]
+                _write_atomic(self.meta_path, json.dumps(asdict(self.summary), ensure_ascii=False))
+        self.write_times.append(time.perf_counter() - start)
+
+    def record_turn(self, agent_state: Dict[str, Any], history: List[Dict[str, Any]],
+                    hp_delta: int, inventory_add: List[str], inventory_remove: List[str],
+                    actions: List[str], scene: str, status: str) -> bool:
+        """
+        Journalise un tour appliqué.
+
+        Args:
+            agent_state: GameAgent.export_state() après le tour
+            history: messages affichés ajoutés pendant ce tour
+
+        Returns:
+            True si un instantané est dû (voir snapshot_due)
+        """
+        messages = agent_state.get("conversation_history", [])
+        if self.summary is not None:
+            self.summary.hp += hp_delta
+            self.summary.turns += sum(1 for m in history if not m.get("narrator"))
+            self.summary.game_active = status == "playing"
+        self._append({
+            "type": "turn",
+            "messages": messages[self.messages_seen:],
+            "agent": {k: v for k, v in agent_state.items() if k != "conversation_history"},
+            "history": history,
+            "hp_delta": hp_delta,
+            "inventory_add": inventory_add,
+            "inventory_remove": inventory_remove,
+            "actions": actions,
+            "scene": scene,
+            "status": status,
+        })
+        self.messages_seen = len(messages)
+        return self.snapshot_due()
+
+    def record_media(self, index: int, image_id: str):
+        """Image rattachée à un message après le tour (brouillon ou version affinée)."""
+        self._append({"type": "media", "index": index, "image": image_id})
+
+    def record_end(self, reason: str = "abandoned"):
+        if self.summary is not None:
+            self.summary.game_active = False
+        self._append({"type": "end", "reason": reason})
+
+    def snapshot_due(self) -> bool:
+        return self.events - self.snapshot_events >= self.snapshot_every
+
+    def snapshot(self, state: GameState, events: Optional[int] = None) -> float:
+        """
+        Écrit l'instantané (atomique : fichier temporaire puis renommage).
+
+        Args:
+            events: événements couverts par state (défaut : tout le journal) ;
+                à fournir si l'instantané est écrit depuis un autre thread
+
+        Returns:
+            Durée d'écriture (s)
+        """
+        start = time.perf_counter()
+        if not self.renew():
+            raise JournalLocked(f"Partie ouverte dans une autre session : {self.game_id}")
+        if events is None:
+            with self._lock:
+                events = self.events
+        payload = json.dumps(
+            {"version": JOURNAL_VERSION, "events": events, "state": asdict(state)},
+            ensure_ascii=False
+        )
+        _write_atomic(self.snapshot_path, payload)
+        self.snapshot_events = events
+        return time.perf_counter() - start
+
+    # ------------------------------------------
+    # Reprise
+    # ------------------------------------------
+
+    @classmethod
+    def load(cls, game_id: str, root: Path = SAVE_DIR, holder: str = "",
+             owner: str = "") -> Tuple["GameJournal", GameState]:
+        """
+        Reconstruit l'état : dernier instantané + événements suivants.
+        Le bail n'est pas pris : appeler acquire() avant d'écrire.
+
+        Raises:
+            FileNotFoundError: partie inconnue
+            ValueError: identifiant de joueur invalide
+        """
+        journal = cls(game_id, root, holder=holder, owner=owner)
+        state: Optional[GameState] = None
+        skip = 0
+        try:
+            with open(journal.snapshot_path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            state = GameState.from_dict(snapshot["state"])
+            skip = journal.snapshot_events = snapshot["events"]
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
+
+        with open(journal.journal_path, encoding="utf-8") as f:
+            for number, line in enumerate(f):
+                journal.events = number + 1
+                if number < skip:
+                    continue
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    journal.events = number  # Dernière ligne tronquée (arrêt pendant l'écriture)
+                    break
+                if event.get("type") == "start":
+                    state = GameState.from_dict(deepcopy(event["state"]))
+                elif state is not None:
+                    apply_event(state, event)
+
+        if state is None:
+            raise FileNotFoundError(f"Journal vide : {game_id}")
+        journal.messages_seen = len(state.agent.get("conversation_history", []))
+        journal.summary = SaveSummary.of(state)
+        return journal, state
+
+
+def new_game_id() -> str:
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+def list_saves(owner: str = "", root: Path = SAVE_DIR, limit: int = 5,
+               active_only: bool = True) -> List[SaveSummary]:
+    """
+    Parties les plus récentes d'un joueur (en cours par défaut), de la plus
+    récente à la plus ancienne. Ne lit que les meta.json de son dossier.
+    """
+    try:
+        base = owner_dir(owner, root)
+    except ValueError:
+        return []
+    if not base.exists():
+        return []
+    saves = []
+    for d in base.iterdir():
+        try:
+            with open(d / "meta.json", encoding="utf-8") as f:
+                summary = SaveSummary.from_dict(json.load(f))
+        except (OSError, ValueError, TypeError):
+            continue  # Pas une partie (dossier d'un autre joueur) ou méta illisible
+        if active_only and not summary.game_active:
+            continue
+        saves.append(summary)
+    saves.sort(key=lambda s: s.updated_at, reverse=True)
+    return saves[:limit]
+
+
+def referenced_media(root: Path = SAVE_DIR) -> Set[str]:
+    """Images citées par les sauvegardes (journaux et instantanés) : à garder sur disque."""
+    ids: Set[str] = set()
+    for name in ("journal.jsonl", "snapshot.json"):
+        for path in Path(root).rglob(name):
+            try:
+                ids.update(_MEDIA_RE.findall(path.read_text(encoding="utf-8", errors="replace")))
+            except OSError:
+                continue
+    return ids
+
+
+# ============================================
+# BENCHMARK
+# ============================================
+
+if __name__ == "__main__":
+    import shutil
+
+    print("\n" + "=" * 60)
+    print("   BENCHMARK SAUVEGARDE / REPRISE (100 tours)")
+    print("=" * 60 + "\n")
+
+    root = Path(tempfile.mkdtemp())
+    system_prompt = "Tu es un Maître du Jeu. " * 600  # ~14 Ko, comme system_prompt.txt
+    story = "Le vent siffle entre les colonnes du temple, et une lueur vacille au loin. " * 8
+    raw = json.dumps({"type": "game", "story": story, "suggested_actions": ["A", "B", "C", "D"]})
+
+    def play(snapshot_every: int) -> tuple:
+        state = GameState(
+            game_id=new_game_id(), theme_id="egypt", hp=20, hp_max=20,
+            inventory=["Sacoche en cuir", "Gourde d'eau"],
+            agent={"conversation_history": [{"role": "system", "content": system_prompt},
+                                            {"role": "user", "content": "NOUVEAU JEU"}],
+                   "useless_counter": 0, "is_blocked": False},
+        )
+        journal = GameJournal.create(state, root)
+        journal.snapshot_every = snapshot_every
+        snapshot_times = []
+        history = state.agent["conversation_history"]
+        for turn in range(100):
+            history += [{"role": "user", "content": f"INVENTAIRE...\nACTION: avancer {turn}"},
+                        {"role": "assistant", "content": raw}]
+            added = [f"Objet {turn}"] if turn % 10 == 0 else []
+            msgs = [{"content": f"avancer {turn}", "narrator": False, "image": None},
+                    {"content": story, "narrator": True, "image": f"{turn:064x}.png"}]
+            state.history += msgs
+            state.inventory += added
+            state.actions, state.scene = ["A", "B", "C", "D"], "Temple"
+            due = journal.record_turn(
+                {"conversation_history": history, "useless_counter": 0, "is_blocked": False},
+                msgs, 0, added, [], ["A", "B", "C", "D"], "Temple", "playing",
+            )
+            if due:
+                snapshot_times.append(journal.snapshot(state))
+        return journal, state, snapshot_times
+
+    for every in (SNAPSHOT_EVERY, 10 ** 9):
+        journal, state, snaps = play(every)
+        start = time.perf_counter()
+        _, restored = GameJournal.load(journal.game_id, root)
+        resume = time.perf_counter() - start
+        same = all(
+            getattr(restored, name) == getattr(state, name)
+            for name in GameState.__dataclass_fields__ if name != "updated_at"
+        )
+        size = journal.journal_path.stat().st_size
+        label = f"instantané tous les {every} tours" if every < 10 ** 9 else "sans instantané"
+        print(f"   {label}")
+        print(f"     Écriture par tour   : {sum(journal.write_times) / len(journal.write_times) * 1000:.2f} ms "
+              f"(max {max(journal.write_times) * 1000:.2f} ms)")
+        if snaps:
+            print(f"     Instantané          : {sum(snaps) / len(snaps) * 1000:.2f} ms ({len(snaps)} écrits)")
+        print(f"     Reprise             : {resume * 1000:.2f} ms")
+        print(f"     Journal             : {size / 1024:.0f} Ko, état identique : {'✅' if same else '❌'}\n")
+
+    # Parties d'un joueur et bail d'écriture
+    mine = GameJournal.create(GameState(game_id=new_game_id(), theme_id="egypt", owner="alice"), root, holder="onglet-1")
+    GameJournal.create(GameState(game_id=new_game_id(), theme_id="egypt", owner="bob"), root, holder="onglet-2")
+    listed = [s.owner for s in list_saves("alice", root, limit=10)]
+    print(f"   Parties du joueur       : {'✅' if listed == ['alice'] else '❌'} {listed}")
+    other, _ = GameJournal.load(mine.game_id, root, holder="onglet-3", owner="alice")
+    refused = not other.acquire()
+    try:
+        other.record_end()
+        blocked = False
+    except JournalLocked:
+        blocked = True
+    print(f"   Ouverture concurrente   : {'✅ refusée' if refused and blocked else '❌ acceptée'}")
+    mine.release()
+    print(f"   Après libération        : {'✅' if other.acquire() else '❌'}")
+    try:
+        mine.record_end()
+        print("   Ancien onglet           : ❌ écrit encore")
+    except JournalLocked:
+        print("   Ancien onglet           : ✅ écriture refusée")
+
+    shutil.rmtree(root)
+    print("=" * 60)
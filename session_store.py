@@ -0,0 +1,426 @@
+# ============================================
+# HERO IA - Stockage des sessions (chaud / froid)
+# Mémoire pour les sessions actives, SQLite pour les onglets inactifs
+# ============================================
+"""
+Un onglet resté ouvert garde toute sa partie en mémoire (messages du LLM,
+historique affiché) aussi longtemps qu'il est connecté. Sur un serveur
+avec beaucoup d'onglets oubliés, la RAM s'épuise lentement.
+
+- Tier chaud : chaque exécution du script enregistre les objets lourds de
+  sa session (agent, historique) auprès du store (touch / release)
+- Un thread de ménage repère les sessions sans interaction depuis
+  IDLE_TIMEOUT : leur état lourd est sérialisé (JSON compressé) dans
+  SQLite, puis vidé sur place (les objets restent référencés par la
+  session Streamlit, mais ne pèsent plus rien)
+- Tier froid : à la prochaine interaction, touch() recharge l'état sur
+  place avant que le script ne le lise (réhydratation transparente)
+- Les sessions froides sans interaction depuis FORGET_AFTER sont oubliées
+  du store (la ligne SQLite reste COLD_TTL) ; les objets annexes (audio,
+  compteurs) ne sont tenus que par références faibles
+
+Les fragments à rafraîchissement automatique (micro, médias en retard)
+ne comptent pas comme des interactions : seules les exécutions complètes
+du script appellent touch().
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+SESSION_DB = Path(os.getenv("HERO_SESSION_DB", Path(__file__).parent / "sessions" / "cold.sqlite3"))
+# Sans interaction depuis (s) : la session passe dans le tier froid
+IDLE_TIMEOUT = float(os.getenv("HERO_SESSION_IDLE", 15 * 60))
+# Période du thread de ménage (s)
+REAP_INTERVAL = 30.0
+# Sessions froides jamais revenues : supprimées après (s)
+COLD_TTL = 7 * 24 * 3600
+# Sessions froides oubliées de la mémoire après (s) : seul SQLite les garde ensuite
+FORGET_AFTER = float(os.getenv("HERO_SESSION_FORGET", 3600))
+
+_log = logging.getLogger(__name__)
+
+
+# ============================================
+# TAILLE EN MÉMOIRE
+# ============================================
+
+def deep_sizeof(obj: Any, limit: int = 200_000) -> int:
+    """
+    Taille approximative d'un graphe d'objets (conteneurs, __dict__, dataclasses).
+    Les objets partagés ne sont comptés qu'une fois ; parcours borné à `limit` objets.
+    """
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack and len(seen) < limit:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, (type, threading.Thread)):
+            continue
+        seen.add(id(o))
+        try:
+            total += sys.getsizeof(o)
+        except TypeError:
+            continue
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        elif not isinstance(o, (str, bytes, bytearray, int, float, bool)) and hasattr(o, "__dict__"):
+            stack.append(vars(o))
+    return total
+
+
+# ============================================
+# ENTRÉES
+# ============================================
+
+@dataclass
+class SessionEntry:
+    """Session connue du store (tier chaud ou froid)."""
+    session_id: str
+    agent: Any = None                   # GameAgent (conversation_history vidé si froid)
+    history: Optional[List[Dict[str, Any]]] = None
+    extras: Dict[str, weakref.ref] = field(default_factory=dict)  # mesurés, jamais évincés
+    last_seen: float = field(default_factory=time.monotonic)
+    running: int = 0
+    cold: bool = False
+    resident_bytes: int = 0
+    cold_bytes: int = 0
+    evictions: int = 0
+    rehydrations: int = 0
+
+
+class SessionStore:
+    """Sessions actives en mémoire, sessions inactives dans SQLite."""
+
+    def __init__(self, db_path: Path = SESSION_DB, idle_timeout: float = IDLE_TIMEOUT):
+        self.db_path = Path(db_path)
+        self.idle_timeout = idle_timeout
+        self._entries: Dict[str, SessionEntry] = {}
+        self._lock = threading.RLock()
+        self._reaper: Optional[threading.Thread] = None
+        self.rehydrate_times: List[float] = []
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " session_id TEXT PRIMARY KEY, payload BLOB NOT NULL,"
+                " raw_bytes INTEGER NOT NULL, evicted_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # Une connexion par opération : appelé depuis le script et le thread de ménage
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    # ------------------------------------------
+    # Cycle d'une exécution du script
+    # ------------------------------------------
+
+    def touch(self, session_id: str, agent: Any, history: Optional[list],
+              **extras) -> Optional[float]:
+        """
+        Début d'une exécution : enregistre les objets de la session et la
+        réhydrate si elle était passée dans le tier froid.
+
+        Returns:
+            Durée de la réhydratation (s), None si la session était chaude
+        """
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                entry = self._entries[session_id] = SessionEntry(session_id, agent, history)
+                # Oubliée du store mais encore dans SQLite : réhydratée comme une session froide
+                entry.cold = self._has_cold_row(session_id)
+            entry.running += 1
+            entry.last_seen = time.monotonic()
+            elapsed = self._rehydrate(entry) if entry.cold else None
+            entry.agent, entry.history = agent, history
+            self._set_extras(entry, extras)
+            return elapsed
+
+    def release(self, session_id: str, agent: Any, history: Optional[list], **extras):
+        """Fin d'une exécution : les objets ont pu être remplacés (nouvelle partie, reprise)."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return
+            entry.running = max(0, entry.running - 1)
+            entry.last_seen = time.monotonic()
+            entry.agent, entry.history = agent, history
+            self._set_extras(entry, extras)
+
+    @staticmethod
+    def _set_extras(entry: SessionEntry, extras: Dict[str, Any]):
+        """Références faibles : le store ne prolonge pas la vie des objets de la session."""
+        for name, obj in extras.items():
+            try:
+                entry.extras[name] = weakref.ref(obj)
+            except TypeError:
+                entry.extras.pop(name, None)  # None ou type sans référence faible : non mesuré
+
+    def heartbeat(self, session_id: str):
+        """Activité sans exécution complète (enregistrement vocal en cours) : repousse l'éviction."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                entry.last_seen = time.monotonic()
+
+    # ------------------------------------------
+    # Éviction / réhydratation
+    # ------------------------------------------
+
+    def _evict(self, entry: SessionEntry) -> int:
+        """Sérialise l'état lourd dans SQLite puis le vide sur place."""
+        conversation = getattr(entry.agent, "conversation_history", None)
+        payload = {"history": entry.history or [], "conversation_history": conversation or []}
+        raw = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        blob = zlib.compress(raw, 6)
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?)",
+                (entry.session_id, blob, len(raw), time.time())
+            )
+        # Vidé sur place : la session Streamlit garde les mêmes objets
+        if entry.history is not None:
+            entry.history.clear()
+        if conversation is not None:
+            entry.agent.conversation_history = []
+        entry.cold = True
+        entry.cold_bytes = len(blob)
+        entry.evictions += 1
+        return len(blob)
+
+    def _has_cold_row(self, session_id: str) -> bool:
+        with self._connect() as db:
+            return db.execute(
+                "SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone() is not None
+
+    def _rehydrate(self, entry: SessionEntry) -> float:
+        start = time.perf_counter()
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT payload FROM sessions WHERE session_id = ?", (entry.session_id,)
+            ).fetchone()
+            db.execute("DELETE FROM sessions WHERE session_id = ?", (entry.session_id,))
+        if row is not None:
+            payload = json.loads(zlib.decompress(row[0]).decode("utf-8"))
+            if entry.history is not None:
+                entry.history[:] = payload["history"]
+            if entry.agent is not None:
+                entry.agent.conversation_history = payload["conversation_history"]
+        entry.cold = False
+        entry.cold_bytes = 0
+        entry.rehydrations += 1
+        elapsed = time.perf_counter() - start
+        self.rehydrate_times.append(elapsed)
+        return elapsed
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Passe dans le tier froid les sessions inactives. Retourne leur nombre."""
+        now = time.monotonic() if now is None else now
+        evicted = 0
+        with self._lock:
+            for entry in list(self._entries.values()):
+                if entry.cold or entry.running or now - entry.last_seen < self.idle_timeout:
+                    continue
+                try:
+                    self._evict(entry)
+                    evicted += 1
+                except (sqlite3.Error, TypeError, ValueError):
+                    pass  # Session gardée en mémoire si la sérialisation échoue
+        return evicted
+
+    def prune(self, ttl: float = COLD_TTL) -> int:
+        """Oublie les sessions froides jamais revenues (onglet fermé)."""
+        cutoff = time.time() - ttl
+        with self._connect() as db:
+            ids = [r[0] for r in db.execute(
+                "SELECT session_id FROM sessions WHERE evicted_at < ?", (cutoff,)
+            )]
+            db.execute("DELETE FROM sessions WHERE evicted_at < ?", (cutoff,))
+        with self._lock:
+            for session_id in ids:
+                self._entries.pop(session_id, None)
+        return len(ids)
+
+    def forget_unseen(self, ttl: float = FORGET_AFTER, now: Optional[float] = None) -> int:
+        """
+        Oublie les sessions froides sans interaction depuis ttl (onglet fermé) :
+        plus aucune référence du store. Si l'onglet revient, touch() les retrouve dans SQLite.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            ids = [
+                e.session_id for e in self._entries.values()
+                if e.cold and not e.running and now - e.last_seen >= ttl
+            ]
+            for session_id in ids:
+                del self._entries[session_id]
+        return len(ids)
+
+    def start_reaper(self, interval: float = REAP_INTERVAL):
+        """Thread de ménage : éviction des sessions inactives et mesure mémoire."""
+        with self._lock:
+            if self._reaper is not None:
+                return
+
+            def run():
+                reported: Set[type] = set()
+                while True:
+                    time.sleep(interval)
+                    try:
+                        self.evict_idle()
+                        self.forget_unseen()
+                        self.measure()
+                        self.prune()
+                    except Exception as e:
+                        # Le ménage continue au tour suivant ; trace complète une fois par type d'erreur
+                        if type(e) not in reported:
+                            reported.add(type(e))
+                            _log.exception("Ménage des sessions en échec")
+                        else:
+                            _log.debug("Ménage des sessions en échec : %r", e)
+
+            self._reaper = threading.Thread(target=run, name="hero-session-reaper", daemon=True)
+            self._reaper.start()
+
+    # ------------------------------------------
+    # Rapport mémoire
+    # ------------------------------------------
+
+    def measure(self, session_id: Optional[str] = None) -> int:
+        """
+        Met à jour la mémoire résidente (toutes les sessions, ou une seule).
+        Parcours hors verrou : peut prendre quelques millisecondes par session.
+
+        Returns:
+            Total mesuré (octets)
+        """
+        with self._lock:
+            if session_id is None:
+                entries = list(self._entries.values())
+            else:
+                entries = [self._entries[session_id]] if session_id in self._entries else []
+        for entry in entries:
+            entry.resident_bytes = deep_sizeof(
+                [entry.agent, entry.history, [ref() for ref in entry.extras.values()]]
+            )
+        return sum(e.resident_bytes for e in entries)
+
+    def report(self) -> List[Dict[str, Any]]:
+        """Une ligne par session : tier, mémoire résidente, taille froide, inactivité."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "session_id": e.session_id,
+                    "tier": "froid" if e.cold else "chaud",
+                    "resident_bytes": e.resident_bytes,
+                    "cold_bytes": e.cold_bytes,
+                    "idle": now - e.last_seen,
+                    "messages": len(e.history or []),
+                    "evictions": e.evictions,
+                    "rehydrations": e.rehydrations,
+                }
+                for e in self._entries.values()
+            ]
+
+    def media_ids(self) -> Set[str]:
+        """Images référencées par l'historique des sessions, chaudes ou froides."""
+        with self._lock:
+            histories = [list(e.history or []) for e in self._entries.values()]
+        with self._connect() as db:
+            for (blob,) in db.execute("SELECT payload FROM sessions"):
+                histories.append(json.loads(zlib.decompress(blob).decode("utf-8"))["history"])
+        ids = {m.get("image") for history in histories for m in history}
+        ids.discard(None)
+        return ids
+
+    def entry(self, session_id: str) -> Optional[SessionEntry]:
+        with self._lock:
+            return self._entries.get(session_id)
+
+
+# ============================================
+# TEST
+# ============================================
+
+if __name__ == "__main__":
+    import tempfile
+
+    print("\n" + "=" * 60)
+    print("   TEST STOCKAGE DES SESSIONS")
+    print("=" * 60 + "\n")
+
+    class FakeAgent:
+        def __init__(self, turns: int):
+            self.conversation_history = [{"role": "system", "content": "Tu es un Maître du Jeu. " * 600}]
+            for t in range(turns):
+                self.conversation_history += [
+                    {"role": "user", "content": f"INVENTAIRE...\nACTION: avancer {t}"},
+                    {"role": "assistant", "content": "{\"story\": \"" + "Le vent siffle. " * 60 + "\"}"},
+                ]
+
+    store = SessionStore(Path(tempfile.mkdtemp()) / "cold.sqlite3", idle_timeout=60)
+    sessions = {}
+    for i in range(20):
+        agent = FakeAgent(turns=40)
+        history = [{"content": "Le vent siffle. " * 60, "narrator": True, "image": None} for _ in range(80)]
+        sessions[f"s{i}"] = (agent, history)
+        store.touch(f"s{i}", agent, history)
+        store.release(f"s{i}", agent, history)
+
+    store.measure()
+    before = sum(r["resident_bytes"] for r in store.report())
+    # 15 onglets oubliés depuis 2 minutes
+    for i in range(15):
+        store.entry(f"s{i}").last_seen -= 120
+    start = time.perf_counter()
+    evicted = store.evict_idle()
+    evict_time = time.perf_counter() - start
+    store.measure()
+    after = sum(r["resident_bytes"] for r in store.report())
+    cold = sum(r["cold_bytes"] for r in store.report())
+
+    print(f"   Sessions évincées     : {evicted} en {evict_time * 1000:.0f} ms")
+    print(f"   Mémoire résidente     : {before / 1e6:.1f} Mo -> {after / 1e6:.1f} Mo")
+    print(f"   Tier froid (SQLite)   : {cold / 1e6:.2f} Mo compressés")
+
+    agent, history = sessions["s3"]
+    elapsed = store.touch("s3", agent, history)
+    ok = len(history) == 80 and len(agent.conversation_history) == 81
+    print(f"   Réhydratation         : {elapsed * 1000:.1f} ms, état intact : {'✅' if ok else '❌'}")
+    store.release("s3", agent, history)
+
+    # Onglet fermé : les objets annexes ne sont pas retenus par le store
+    class FakeMeter:
+        pass
+
+    meter = FakeMeter()
+    store.touch("s19", *sessions["s19"], usage=meter)
+    store.release("s19", *sessions["s19"], usage=meter)
+    ref = store.entry("s19").extras["usage"]
+    del meter
+    print(f"   Annexes libérées      : {'✅' if ref() is None else '❌'}")
+
+    # Sessions froides oubliées du store, retrouvées dans SQLite si l'onglet revient
+    forgotten = store.forget_unseen(ttl=60)
+    agent, history = sessions["s5"]
+    elapsed = store.touch("s5", agent, history)
+    ok = elapsed is not None and len(history) == 80 and len(agent.conversation_history) == 81
+    print(f"   Sessions oubliées     : {forgotten}, retour après oubli : {'✅' if ok else '❌'}")
+    store.release("s5", agent, history)
+
+    print("\n" + "=" * 60)
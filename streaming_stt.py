@@ -0,0 +1,184 @@
+# ============================================
+# HERO IA - Transcription en continu
+# Segments envoyés pendant l'enregistrement
+# ============================================
+"""
+Pendant que le joueur parle, l'enregistreur découpe l'audio aux pauses et
+envoie chaque segment (WAV 16 kHz) au serveur :
+- Chaque segment est transcrit dès réception, en parallèle
+- Le texte partiel est renvoyé à l'enregistreur et affiché en direct
+- Au clic sur "Envoyer", seul le dernier segment reste à transcrire
+
+Protocole : la valeur d'un composant Streamlit est "dernière écrite gagne",
+donc le client renvoie tous les segments non acquittés à chaque message ;
+le serveur déduplique par numéro de séquence et acquitte via les args
+(acked_rec / acked, propres à chaque enregistrement).
+"""
+
+import base64
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, wait
+from typing import Any, Callable, Dict, List, Optional, Set
+
+
+class StreamingTranscriber:
+    """Transcription incrémentale d'un enregistrement découpé en segments."""
+
+    def __init__(self, transcribe: Callable[[bytes], Any], executor: Executor):
+        """
+        Args:
+            transcribe: audio -> AudioResult (AudioManager.speech_to_text)
+            executor: pool partagé pour les transcriptions
+        """
+        self.transcribe = transcribe
+        self.executor = executor
+        self.rec_id: Optional[str] = None
+        self._futures: Dict[int, Future] = {}
+        self._count: Optional[int] = None
+        self._final_at: Optional[float] = None
+        self._client_lag = 0.0
+        self._finished: Set[str] = set()
+        # Latences mesurées (s) : arrêt -> texte, arrêt -> action
+        self.metrics: deque = deque(maxlen=50)
+
+    def _reset(self, rec_id: str):
+        for future in self._futures.values():
+            future.cancel()
+        self.rec_id = rec_id
+        self._futures = {}
+        self._count = None
+        self._final_at = None
+        self._client_lag = 0.0
+
+    def feed(self, message: Optional[Dict[str, Any]]):
+        """
+        Intègre un message de l'enregistreur (idempotent : peut être rejoué).
+
+        Message : {"rec", "segments": [{"seq", "audio"}], "final", "count", "stop_lag_ms"}
+        """
+        if not message or not message.get("rec") or message["rec"] in self._finished:
+            return
+        if message["rec"] != self.rec_id:
+            self._reset(message["rec"])
+
+        for segment in message.get("segments", []):
+            seq = segment["seq"]
+            if seq not in self._futures:
+                audio = base64.b64decode(segment["audio"])
+                self._futures[seq] = self.executor.submit(self.transcribe, audio)
+
+        if message.get("final") and self._final_at is None:
+            self._final_at = time.perf_counter()
+            self._count = message.get("count", len(self._futures))
+            self._client_lag = message.get("stop_lag_ms", 0) / 1000
+
+    def received(self) -> List[int]:
+        """Numéros de segments reçus (acquittés côté client)."""
+        return sorted(self._futures)
+
+    @staticmethod
+    def _text(future: Future) -> str:
+        try:
+            result = future.result(timeout=0)
+        except Exception:
+            return ""
+        return (result.text or "").strip() if result and result.success else ""
+
+    def partial(self) -> str:
+        """Texte transcrit jusqu'ici (segments terminés, dans l'ordre)."""
+        parts = []
+        for seq in sorted(self._futures):
+            future = self._futures[seq]
+            if not future.done():
+                break
+            parts.append(self._text(future))
+        return " ".join(p for p in parts if p)
+
+    @property
+    def active(self) -> bool:
+        return self.rec_id is not None and self.rec_id not in self._finished
+
+    def ready(self) -> bool:
+        """Arrêt reçu et tous les segments arrivés."""
+        return (
+            self.active and self._final_at is not None
+            and all(seq in self._futures for seq in range(self._count or 0))
+        )
+
+    def finish(self, timeout: float = 10.0) -> str:
+        """Attend les dernières transcriptions et retourne le texte complet."""
+        wait(list(self._futures.values()), timeout=timeout)
+        done = [self._futures[seq] for seq in sorted(self._futures) if self._futures[seq].done()]
+        text = " ".join(t for t in map(self._text, done) if t)
+        self._finished.add(self.rec_id)
+        self.metrics.append({
+            "segments": len(self._futures),
+            "stop_to_text": self._client_lag + time.perf_counter() - self._final_at,
+            "stop_to_action": None,
+        })
+        return text
+
+    def mark_action(self):
+        """Note le moment où l'action du joueur est envoyée au jeu."""
+        if self.metrics and self._final_at is not None:
+            self.metrics[-1]["stop_to_action"] = self._client_lag + time.perf_counter() - self._final_at
+
+    def latency_report(self) -> Dict[str, Optional[float]]:
+        """Latences moyennes arrêt -> texte et arrêt -> action (s)."""
+        def avg(key: str) -> Optional[float]:
+            values = [m[key] for m in self.metrics if m[key] is not None]
+            return sum(values) / len(values) if values else None
+
+        return {"stop_to_text": avg("stop_to_text"), "stop_to_action": avg("stop_to_action")}
+
+
+# ============================================
+# TEST
+# ============================================
+
+if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor
+    from dataclasses import dataclass
+
+    print("\n" + "=" * 60)
+    print("   TEST TRANSCRIPTION EN CONTINU")
+    print("=" * 60 + "\n")
+
+    @dataclass
+    class FakeResult:
+        success: bool
+        text: str
+
+    # Transcription simulée : 0.3 s fixe + 0.1 s par seconde d'audio
+    def fake_transcribe(audio: bytes) -> FakeResult:
+        seconds = len(audio) / 32000
+        time.sleep(0.3 + 0.1 * seconds)
+        return FakeResult(True, audio[:7].decode())
+
+    segments = [f"mot{i:04d}".encode() + b"\x00" * (32000 * 3 - 7) for i in range(5)]  # 5 x 3 s
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        # En continu : les segments arrivent pendant que le joueur parle
+        stream = StreamingTranscriber(fake_transcribe, pool)
+        sent = []
+        for seq, audio in enumerate(segments):
+            sent.append({"seq": seq, "audio": base64.b64encode(audio).decode()})
+            final = seq == len(segments) - 1
+            stream.feed({"rec": "r1", "segments": sent, "final": final, "count": len(segments)})
+            stream.feed({"rec": "r1", "segments": sent, "final": final, "count": len(segments)})  # rejoué
+            if not final:
+                time.sleep(0.5)  # le joueur continue de parler
+        print(f"   Partiel avant arrêt : {stream.partial()!r}")
+        text = stream.finish()
+        streaming = stream.latency_report()["stop_to_text"]
+
+        # En bloc : tout l'audio envoyé après l'arrêt
+        start = time.perf_counter()
+        fake_transcribe(b"".join(segments))
+        batch = time.perf_counter() - start
+
+    print(f"   Texte final         : {text!r}")
+    print(f"   Arrêt -> texte      : continu {streaming:.2f}s / en bloc {batch:.2f}s")
+
+    print("\n" + "=" * 60)
@@ -0,0 +1,301 @@
+# ============================================
+# HERO IA - Moteurs STT interchangeables
+# Groq Whisper (réseau) + Whisper quantifié local (CPU)
+# ============================================
+"""
+Reconnaissance vocale derrière une interface commune :
+- Groq whisper-large-v3 : précis, mais un aller-retour réseau par phrase
+  et indisponible en cas de rate-limit
+- faster-whisper (CTranslate2, int8) : local sur CPU, idéal pour les
+  commandes courtes ("je vais à gauche")
+
+Routage : local d'abord pour les énoncés courts, distant d'abord pour les
+longs ; l'autre moteur sert de secours en cas d'échec.
+"""
+
+import os
+import io
+import re
+import threading
+import time
+import wave
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, List
+
+from dotenv import load_dotenv
+
+from audio_preprocess import PreparedAudio
+
+env_path = Path(__file__).parent / ".env"
+load_dotenv(env_path)
+
+# ============================================
+# VÉRIFICATION DES MOTEURS
+# ============================================
+
+# Groq Whisper (STT)
+GROQ_OK = False
+groq_client = None
+try:
+    from groq import Groq
+
+    api_key = os.getenv("GROQ_API_KEY")
+    if api_key:
+        groq_client = Groq(api_key=api_key)
+        GROQ_OK = True
+        print("✅ Groq Whisper (STT) configuré")
+    else:
+        print("⚠️ GROQ_API_KEY manquante")
+except ImportError:
+    print("⚠️ groq non installé : pip install groq")
+
+# Whisper local quantifié (optionnel)
+FASTER_WHISPER_OK = False
+try:
+    from faster_whisper import WhisperModel
+    FASTER_WHISPER_OK = True
+except ImportError:
+    pass
+
+LOCAL_WHISPER_MODEL = os.getenv("LOCAL_WHISPER_MODEL", "base")
+
+# En dessous de cette durée, l'énoncé est une commande courte (local d'abord)
+SHORT_UTTERANCE_SECONDS = 4.0
+# Débit supposé de l'enregistrement quand la durée n'a pas pu être mesurée
+ASSUMED_BITRATE = 32000
+
+
+# ============================================
+# BACKENDS
+# ============================================
+
+class STTBackend(ABC):
+    """Interface commune des moteurs de reconnaissance vocale."""
+
+    name: str = "base"
+    local: bool = False
+
+    @abstractmethod
+    def transcribe(self, audio: PreparedAudio) -> str:
+        """Transcrit un énoncé. Retourne le texte reconnu."""
+
+
+class GroqWhisperBackend(STTBackend):
+    """Groq whisper-large-v3 (fichier envoyé en mémoire)."""
+
+    name = "groq:whisper-large-v3"
+
+    def transcribe(self, audio: PreparedAudio) -> str:
+        transcription = groq_client.audio.transcriptions.create(
+            model="whisper-large-v3",
+            file=(audio.filename, audio.data),
+            language="fr",
+            response_format="text"
+        )
+        return transcription.strip() if isinstance(transcription, str) else str(transcription).strip()
+
+
+class LocalWhisperBackend(STTBackend):
+    """Whisper quantifié int8 sur CPU (faster-whisper). Modèle chargé au premier appel."""
+
+    local = True
+
+    def __init__(self, model_size: str = LOCAL_WHISPER_MODEL, threads: int = 4):
+        self.model_size = model_size
+        self.threads = threads
+        self.name = f"local:whisper-{model_size}"
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                self._model = WhisperModel(
+                    self.model_size, device="cpu", compute_type="int8", cpu_threads=self.threads
+                )
+            return self._model
+
+    def transcribe(self, audio: PreparedAudio) -> str:
+        model = self._get_model()
+        # Le modèle n'est pas ré-entrant : une transcription à la fois
+        with self._lock:
+            segments, _ = model.transcribe(
+                io.BytesIO(audio.data), language="fr", beam_size=1, vad_filter=False
+            )
+            return " ".join(s.text.strip() for s in segments).strip()
+
+
+class StubSTTBackend(STTBackend):
+    """Moteur factice pour les tests (texte, latence et taux d'échec réglables)."""
+
+    def __init__(self, name: str = "stub", text: str = "je vais à gauche",
+                 latency: float = 0.0, fail: bool = False, local: bool = True):
+        self.name = name
+        self.text = text
+        self.latency = latency
+        self.fail = fail
+        self.local = local
+        self.calls = 0
+
+    def transcribe(self, audio: PreparedAudio) -> str:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail:
+            raise RuntimeError("Échec simulé")
+        return self.text
+
+
+def default_stt_backends() -> List[STTBackend]:
+    """Moteurs disponibles dans cet environnement."""
+    backends: List[STTBackend] = []
+    if GROQ_OK:
+        backends.append(GroqWhisperBackend())
+    if FASTER_WHISPER_OK:
+        backends.append(LocalWhisperBackend())
+    return backends
+
+
+# ============================================
+# ROUTAGE
+# ============================================
+
+def estimate_duration(audio: PreparedAudio) -> float:
+    """Durée de l'énoncé (mesurée si le PCM a été décodé, sinon estimée)."""
+    if audio.duration is not None:
+        return audio.duration
+    if audio.data[:4] == b"RIFF":
+        # WAV (enregistreur en continu) : durée exacte depuis l'en-tête
+        try:
+            with wave.open(io.BytesIO(audio.data)) as w:
+                return w.getnframes() / w.getframerate()
+        except (wave.Error, EOFError):
+            pass
+    return len(audio.data) * 8 / ASSUMED_BITRATE
+
+
+def route(backends: List[STTBackend], audio: PreparedAudio) -> List[STTBackend]:
+    """Ordre d'essai : local d'abord pour les énoncés courts, distant pour les longs."""
+    short = estimate_duration(audio) < SHORT_UTTERANCE_SECONDS
+    # sorted() est stable : l'ordre de configuration est conservé à égalité
+    return sorted(backends, key=lambda b: b.local != short)
+
+
+# ============================================
+# TAUX D'ERREUR (WER)
+# ============================================
+
+def _words(text: str) -> List[str]:
+    return re.sub(r"[^\w'\s-]", " ", text.lower()).replace("'", "' ").split()
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """WER = distance d'édition sur les mots / nombre de mots de la référence."""
+    ref, hyp = _words(reference), _words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i]
+        for j, h in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h)))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+# Petit jeu de test : commandes de jeu courtes et une narration longue
+FRENCH_TEST_SET = [
+    "Je vais à gauche.",
+    "J'ouvre le coffre.",
+    "J'attaque le garde avec mon épée.",
+    "Je fouille la pièce.",
+    "Je bois la potion de soin.",
+    "Je m'approche prudemment de la porte et j'écoute si quelqu'un parle de l'autre côté, "
+    "puis je décide de l'ouvrir doucement.",
+]
+
+
+def benchmark(backends: List[STTBackend], samples: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    WER moyen et latence de chaque moteur.
+
+    Args:
+        samples: [{"text": référence, "audio": PreparedAudio}]
+    """
+    rows = []
+    for backend in backends:
+        wers, latencies, errors = [], [], 0
+        for sample in samples:
+            start = time.perf_counter()
+            try:
+                hypothesis = backend.transcribe(sample["audio"])
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            wers.append(word_error_rate(sample["text"], hypothesis))
+        rows.append({
+            "name": backend.name,
+            "wer": sum(wers) / len(wers) if wers else None,
+            "avg_latency": sum(latencies) / len(latencies) if latencies else None,
+            "max_latency": max(latencies) if latencies else None,
+            "errors": errors,
+        })
+    return rows
+
+
+# ============================================
+# TEST
+# ============================================
+
+if __name__ == "__main__":
+    print("\n" + "=" * 60)
+    print("   TEST MOTEURS STT")
+    print("=" * 60 + "\n")
+
+    print(f"Groq Whisper   : {'✅' if GROQ_OK else '❌'}")
+    print(f"Whisper local  : {'✅ ' + LOCAL_WHISPER_MODEL + ' (int8)' if FASTER_WHISPER_OK else '❌ pip install faster-whisper'}")
+
+    print("\n🧪 WER (sanity check)")
+    print(f"   identique : {word_error_rate('Je vais à gauche.', 'je vais à gauche'):.2f}")
+    print(f"   1 erreur  : {word_error_rate('Je vais à gauche.', 'je vais à droite'):.2f}")
+
+    print("\n🧪 Routage")
+    stubs = [StubSTTBackend("distant", local=False), StubSTTBackend("local", local=True)]
+    short = PreparedAudio(data=b"\x00" * 4000, filename="a.webm", duration=1.5)
+    long_ = PreparedAudio(data=b"\x00" * 60000, filename="a.webm", duration=9.0)
+    print(f"   1.5 s -> {[b.name for b in route(stubs, short)]}")
+    print(f"   9.0 s -> {[b.name for b in route(stubs, long_)]}")
+
+    backends = default_stt_backends()
+    if backends:
+        # Jeu de test synthétisé par les moteurs TTS disponibles
+        from tts_backends import default_tts_backends
+
+        voice = {"lang": "fr", "tld": "fr", "edge": {"voice": "fr-FR-HenriNeural"}, "espeak": {"voice": "fr-fr"}}
+        samples = []
+        for text in FRENCH_TEST_SET:
+            for tts in default_tts_backends():
+                try:
+                    audio = tts.synthesize(text, voice)
+                except Exception:
+                    continue
+                if audio:
+                    samples.append({"text": text, "audio": PreparedAudio(data=audio, filename="sample.mp3")})
+                    break
+
+        print(f"\n🧪 Benchmark ({len(samples)} énoncés français)")
+        if not samples:
+            print("   ❌ Aucun moteur TTS joignable pour générer le jeu de test")
+            rows = []
+        else:
+            rows = benchmark(backends, samples)
+        for row in rows:
+            if row["wer"] is None:
+                print(f"   {row['name']:<24} ❌ {row['errors']} échecs")
+            else:
+                print(f"   {row['name']:<24} WER={row['wer']:.1%}  latence moy={row['avg_latency']:.2f}s  "
+                      f"max={row['max_latency']:.2f}s  échecs={row['errors']}")
+
+    print("\n" + "=" * 60)
@@ -0,0 +1,16 @@
+# ============================================
+# HERO IA - Configuration des tests
+# ============================================
+"""
+Modules du jeu importables depuis tests/, sans traces écrites ni clé Groq réelle
+(aucun test n'appelle le réseau).
+"""
+
+import os
+import sys
+from pathlib import Path
+
+os.environ["HERO_TRACE"] = "0"
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,80 @@
+"""Classement des backends par qualité, latence et échecs (backend_selector)."""
+
+from dataclasses import dataclass
+
+import pytest
+
+from backend_selector import BackendSelector, QUALITY_DRAFT, QUALITY_HIGH, QUALITY_STANDARD
+
+
+@dataclass
+class Backend:
+    name: str
+    quality: int
+
+
+def _names(backends):
+    return [b.name for b in backends]
+
+
+def _selector():
+    return BackendSelector([
+        Backend("brouillon", QUALITY_DRAFT),
+        Backend("standard", QUALITY_STANDARD),
+        Backend("hd", QUALITY_HIGH),
+    ])
+
+
+def test_untried_backends_rank_by_quality():
+    assert _names(_selector().rank(QUALITY_DRAFT)) == ["hd", "standard", "brouillon"]
+
+
+def test_equal_backends_keep_configuration_order():
+    selector = BackendSelector([Backend("groq", QUALITY_STANDARD), Backend("openai", QUALITY_STANDARD)])
+    assert _names(selector.rank(QUALITY_STANDARD)) == ["groq", "openai"]
+
+
+def test_min_quality_filters_backends():
+    selector = _selector()
+    assert _names(selector.rank(QUALITY_STANDARD)) == ["hd", "standard"]
+    assert _names(selector.rank(QUALITY_HIGH)) == ["hd"]
+
+
+def test_untried_backend_ranks_before_measured_ones():
+    selector = _selector()
+    selector.record("hd", 0.2, True)
+    assert _names(selector.rank(QUALITY_STANDARD)) == ["standard", "hd"]
+
+
+def test_faster_backend_ranks_first():
+    selector = _selector()
+    selector.record("standard", 2.0, True)
+    selector.record("hd", 0.5, True)
+    assert _names(selector.rank(QUALITY_STANDARD)) == ["hd", "standard"]
+
+
+def test_failures_penalise_latency():
+    selector = _selector()
+    for ok in (True, False):
+        selector.record("hd", 0.5, ok)   # 0.5 s x (1 + 4 x 50 %) = 1.5 s
+    selector.record("standard", 1.0, True)
+
+    assert selector.score(Backend("hd", QUALITY_HIGH)) == pytest.approx(1.5)
+    assert _names(selector.rank(QUALITY_STANDARD)) == ["standard", "hd"]
+
+
+def test_backend_that_only_failed_ranks_last():
+    selector = _selector()
+    selector.record("brouillon", 0.1, False)
+    selector.record("standard", 5.0, True)
+    selector.record("hd", 9.0, True)
+
+    assert selector.score(Backend("brouillon", QUALITY_DRAFT)) == float("inf")
+    assert _names(selector.rank(QUALITY_DRAFT)) == ["standard", "hd", "brouillon"]
+
+
+def test_equal_score_prefers_higher_quality():
+    selector = _selector()
+    selector.record("standard", 1.0, True)
+    selector.record("hd", 1.0, True)
+    assert _names(selector.rank(QUALITY_STANDARD)) == ["hd", "standard"]
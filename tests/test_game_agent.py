@@ -0,0 +1,59 @@
+"""Contexte envoyé au LLM en contexte court (game_agent.GameAgent._messages_for_api)."""
+
+import pytest
+
+from game_agent import GameAgent
+
+
+@pytest.fixture
+def agent():
+    agent = GameAgent()
+    agent.conversation_history = [
+        {"role": "system", "content": "MJ"},
+        {"role": "user", "content": "NOUVEAU JEU : egypt"},
+    ]
+    return agent
+
+
+def _play(agent, turns):
+    for turn in range(turns):
+        agent.conversation_history += [{"role": "assistant", "content": f"Tour {turn}"},
+                                       {"role": "user", "content": f"ACTION: {turn}"}]
+
+
+def test_full_context_by_default(agent):
+    _play(agent, 10)
+    assert agent._messages_for_api() is agent.conversation_history
+
+
+def test_short_context_keeps_head_and_last_exchanges(agent):
+    _play(agent, 10)
+    agent.context_turns = 2
+
+    messages = agent._messages_for_api()
+
+    assert messages[:2] == agent.conversation_history[:2]
+    assert messages[2:] == agent.conversation_history[-5:]
+    assert messages[-1] == {"role": "user", "content": "ACTION: 9"}
+    assert len(agent.conversation_history) == 22  # l'historique complet reste en mémoire
+
+
+def test_short_context_on_short_game_sends_everything(agent):
+    _play(agent, 2)
+    agent.context_turns = 2
+    assert agent._messages_for_api() == agent.conversation_history
+
+
+def test_apply_budget_sets_model_and_context(agent):
+    from usage_meter import BudgetPolicy
+
+    agent.apply_budget(BudgetPolicy(level=3, model="petit-modele", context_turns=1,
+                                    speculative=False, blocked=False))
+    _play(agent, 5)
+    assert agent.model == "petit-modele"
+    assert len(agent._messages_for_api()) == 2 + 3
+
+    agent.apply_budget(BudgetPolicy(level=0, model=None, context_turns=None,
+                                    speculative=True, blocked=False))
+    assert agent.model == agent.base_model
+    assert agent._messages_for_api() is agent.conversation_history
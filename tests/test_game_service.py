@@ -0,0 +1,106 @@
+"""Service de jeu : verrous par session et erreurs du WebSocket (game_service)."""
+
+import asyncio
+
+import pytest
+
+from game_service import GameEngine, ServiceSession, SessionRepository
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return GameEngine(SessionRepository(tmp_path / "service.sqlite3"), max_hot=2)
+
+
+def _keep(engine, session_id):
+    engine._keep(ServiceSession(session_id=session_id, theme_id="egypt"), object())
+
+
+def test_lock_dropped_with_hot_agent(engine):
+    for session_id in ("a", "b", "c"):
+        with engine._session_lock(session_id):
+            _keep(engine, session_id)
+
+    assert list(engine._hot) == ["b", "c"]
+    assert set(engine._locks) == {"b", "c"}
+
+
+def test_lock_of_cold_session_dropped_after_turn(engine):
+    with engine._session_lock("a"):
+        assert "a" in engine._locks
+    assert engine._locks == {} and engine._lock_users == {}
+
+
+def test_lock_in_use_survives_eviction(engine):
+    with engine._session_lock("a"):
+        _keep(engine, "a")
+        lock = engine._locks["a"]
+        _keep(engine, "b")
+        _keep(engine, "c")  # "a" sort des agents en mémoire pendant son tour
+        assert engine._locks["a"] is lock
+    assert "a" not in engine._locks
+
+
+def test_delete_drops_lock(engine):
+    with engine._session_lock("a"):
+        _keep(engine, "a")
+    engine.delete("a")
+    assert "a" not in engine._locks
+
+
+class _FailingEngine:
+    def describe(self, session_id):
+        return {"theme_id": "egypt", "scene": ""}
+
+    def step(self, session_id, **kwargs):
+        raise RuntimeError("LLM indisponible")
+
+
+def test_stream_reports_failed_turn_and_stays_open():
+    test_utils = pytest.importorskip("aiohttp.test_utils")
+    from game_service import create_app
+
+    async def scenario():
+        app = create_app(engine=_FailingEngine(), threads=2)
+        async with test_utils.TestClient(test_utils.TestServer(app)) as client:
+            ws = await client.ws_connect("/v1/sessions/a/stream")
+            replies = []
+            for _ in range(2):
+                await ws.send_json({"type": "step", "action": "Ouvrir", "turn": 0})
+                assert (await ws.receive_json())["type"] == "accepted"
+                replies.append(await ws.receive_json())
+            await ws.close()
+            return replies
+
+    replies = asyncio.run(scenario())
+    assert [r["type"] for r in replies] == ["error", "error"]
+    assert "LLM indisponible" in replies[0]["error"]
+
+
+class _Engine(_FailingEngine):
+    def step(self, session_id, **kwargs):
+        return {"response": {"image_prompt": "Un temple au crépuscule", "is_error": False}}
+
+
+class _FailingMedia:
+    def image(self, prompt, theme_id=None, quality="draft"):
+        raise OSError("API image injoignable")
+
+
+def test_stream_reports_failed_image():
+    test_utils = pytest.importorskip("aiohttp.test_utils")
+    from game_service import create_app
+
+    async def scenario():
+        app = create_app(engine=_Engine(), media=_FailingMedia(), threads=2)
+        async with test_utils.TestClient(test_utils.TestServer(app)) as client:
+            ws = await client.ws_connect("/v1/sessions/a/stream")
+            await ws.send_json({"type": "step", "action": "Ouvrir", "turn": 0, "image": True})
+            replies = [await ws.receive_json() for _ in range(3)]
+            await ws.close()
+            return replies
+
+    accepted, response, media = asyncio.run(scenario())
+    assert response["type"] == "response"
+    assert media["type"] == "media" and not media["success"]
+    assert "injoignable" in media["error"]
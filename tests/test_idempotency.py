@@ -0,0 +1,107 @@
+"""Soumissions de tour idempotentes (idempotency.SubmissionRegistry)."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from idempotency import SubmissionRegistry, idempotency_key
+
+
+@pytest.fixture
+def pool():
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        yield executor
+
+
+def _submit(registry, pool, action, turn, fn):
+    key = idempotency_key("text", action, turn)
+    return registry.submit(key, turn, action, "text", pool, fn, action)
+
+
+def test_same_key_returns_running_submission(pool):
+    registry = SubmissionRegistry()
+    release = threading.Event()
+    calls = []
+
+    def turn(action):
+        calls.append(action)
+        release.wait(5)
+        return action
+
+    first, created = _submit(registry, pool, "Ouvrir la porte", 3, turn)
+    second, created_again = _submit(registry, pool, "Ouvrir la porte", 3, turn)
+    release.set()
+
+    assert created and not created_again
+    assert second is first
+    assert first.future.result() == "Ouvrir la porte"
+    assert calls == ["Ouvrir la porte"]
+    assert registry.stats() == {"submitted": 1, "coalesced": 1}
+
+
+def test_other_action_of_same_turn_waits_for_first(pool):
+    registry = SubmissionRegistry()
+    release = threading.Event()
+    first, _ = _submit(registry, pool, "Ouvrir la porte", 3, lambda a: release.wait(5) and a)
+    other, created = _submit(registry, pool, "Je fuis", 3, lambda a: a)
+    release.set()
+
+    assert other is first and not created
+    assert registry.pending(3) is first
+
+
+def test_claim_applies_once(pool):
+    registry = SubmissionRegistry()
+    submission, _ = _submit(registry, pool, "Attendre", 1, lambda a: a)
+    submission.future.result()
+
+    assert registry.claim(submission)
+    assert not registry.claim(submission)
+    assert registry.pending(1) is None
+
+
+def _fail(action):
+    raise RuntimeError("LLM indisponible")
+
+
+def test_retry_after_claimed_failure_starts_fresh(pool):
+    registry = SubmissionRegistry()
+    failed, _ = _submit(registry, pool, "Je crie", 4, _fail)
+    with pytest.raises(RuntimeError):
+        failed.future.result()
+    assert registry.claim(failed, failed=True)
+
+    retry, created = _submit(registry, pool, "Je crie", 4, lambda a: a)
+    assert created and retry is not failed
+    assert retry.future.result() == "Je crie"
+
+
+def test_unclaimed_failure_does_not_block_turn(pool):
+    registry = SubmissionRegistry()
+    failed, _ = _submit(registry, pool, "Je saute", 5, _fail)
+    with pytest.raises(RuntimeError):
+        failed.future.result()
+
+    assert registry.pending(5) is None
+    retry, created = _submit(registry, pool, "Je saute", 5, lambda a: a)
+    assert created and registry.pending(5) is retry
+
+
+def test_oldest_entries_dropped_beyond_max(pool):
+    registry = SubmissionRegistry()
+    submissions = []
+    for turn in range(SubmissionRegistry.MAX_ENTRIES + 5):
+        submission, _ = _submit(registry, pool, f"Action {turn}", turn, lambda a: a)
+        submission.future.result()
+        registry.claim(submission)
+        submissions.append(submission)
+
+    assert len(registry._entries) == SubmissionRegistry.MAX_ENTRIES
+    # Les plus anciennes sont oubliées : une même soumission est relancée
+    again, created = _submit(registry, pool, "Action 0", 0, lambda a: a)
+    assert created and again is not submissions[0]
+    # Les plus récentes sont encore dédupliquées
+    last = SubmissionRegistry.MAX_ENTRIES + 4
+    recent, created = _submit(registry, pool, f"Action {last}", last, lambda a: a)
+    assert not created and recent is submissions[-1]
@@ -0,0 +1,70 @@
+"""Étapes média d'un tour : collecte dans le budget et étapes en retard (media_pipeline)."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from media_pipeline import TurnMediaPipeline
+
+
+@pytest.fixture
+def pool():
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        yield executor
+
+
+def test_collect_waits_for_stages_within_budget(pool):
+    pipeline = TurnMediaPipeline(pool, budget=2.0)
+    pipeline.add("image", lambda: time.sleep(0.1) or "image.png")
+    pipeline.add("voice", lambda: "voice.mp3")
+
+    results = pipeline.collect()
+
+    assert results["image"].done and results["image"].value == "image.png"
+    assert results["voice"].done and results["voice"].value == "voice.mp3"
+    assert results["image"].latency >= 0.1
+    assert pipeline.late() == {}
+
+
+def test_stage_timeout_bounds_the_wait(pool):
+    release = threading.Event()
+    pipeline = TurnMediaPipeline(pool, budget=2.0)
+    pipeline.add("fast", lambda: "ok")
+    pipeline.add("slow", release.wait, 5, timeout=0.1)
+
+    results = pipeline.collect()
+    release.set()
+
+    assert pipeline.wait_time < 1.0
+    assert results["fast"].done
+    assert not results["slow"].done and results["slow"].value is None
+
+
+def test_error_is_reported_not_raised(pool):
+    def broken():
+        raise RuntimeError("API image indisponible")
+
+    pipeline = TurnMediaPipeline(pool, budget=1.0)
+    pipeline.add("image", broken)
+
+    result = pipeline.collect()["image"]
+    assert result.done and result.value is None
+    assert "indisponible" in result.error
+
+
+def test_late_keeps_stages_that_finish_after_collect(pool):
+    release = threading.Event()
+    pipeline = TurnMediaPipeline(pool, budget=0.1)
+    pipeline.add("image", lambda: "image.png")
+    pipeline.add("voice", lambda: release.wait(5) and "voice.mp3")
+
+    results = pipeline.collect()
+    assert not results["voice"].done
+    release.set()
+    late = pipeline.late()
+    assert late["voice"].result(timeout=5) == "voice.mp3"
+
+    # Terminée depuis, mais toujours marquée en retard : rattachée par l'appelant
+    assert set(pipeline.late()) == {"voice"}
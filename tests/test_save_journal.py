@@ -0,0 +1,123 @@
+"""Journal de partie : reprise, instantanés et bail d'écriture (save_journal)."""
+
+import time
+
+import pytest
+
+import save_journal
+from save_journal import GameJournal, GameState, JournalLocked, list_saves
+
+
+def _new_state(owner="alice"):
+    return GameState(
+        game_id=save_journal.new_game_id(), theme_id="egypt", owner=owner,
+        inventory=["Sacoche en cuir"],
+        agent={"conversation_history": [{"role": "system", "content": "MJ"},
+                                        {"role": "user", "content": "NOUVEAU JEU"}],
+               "useless_counter": 0},
+    )
+
+
+def _play(journal, state, turns):
+    """Joue `turns` tours en tenant state à jour comme le fait app.py."""
+    history = state.agent["conversation_history"]
+    for turn in range(turns):
+        history += [{"role": "user", "content": f"ACTION: avancer {turn}"},
+                    {"role": "assistant", "content": f"Tour {turn}"}]
+        msgs = [{"content": f"avancer {turn}", "narrator": False, "image": None},
+                {"content": f"Tour {turn}", "narrator": True, "image": None}]
+        added = [f"Objet {turn}"] if turn % 3 == 0 else []
+        state.history += msgs
+        state.inventory += added
+        state.hp -= 1
+        state.actions, state.scene = [f"Suite {turn}"], f"Salle {turn}"
+        if journal.record_turn({"conversation_history": history, "useless_counter": 0},
+                               msgs, -1, added, [], state.actions, state.scene, "playing"):
+            journal.snapshot(state)
+
+
+def _same(restored, state):
+    for name in GameState.__dataclass_fields__:
+        if name != "updated_at":
+            assert getattr(restored, name) == getattr(state, name), name
+
+
+def test_replay_rebuilds_state(tmp_path):
+    state = _new_state()
+    journal = GameJournal.create(state, tmp_path, holder="onglet")
+    _play(journal, state, 7)
+    journal.record_media(3, "a" * 64 + ".png")
+    state.history[3]["image"] = "a" * 64 + ".png"
+
+    restored_journal, restored = GameJournal.load(state.game_id, tmp_path, owner="alice")
+
+    _same(restored, state)
+    assert restored.hp == 13 and restored.turns == 7
+    assert restored_journal.events == journal.events
+    assert not restored_journal.snapshot_path.exists()
+
+
+def test_snapshot_then_tail_events(tmp_path):
+    state = _new_state()
+    journal = GameJournal.create(state, tmp_path, holder="onglet")
+    journal.snapshot_every = 4
+    _play(journal, state, 10)
+
+    assert journal.snapshot_path.exists()
+    assert 0 < journal.snapshot_events < journal.events
+    restored_journal, restored = GameJournal.load(state.game_id, tmp_path, owner="alice")
+    _same(restored, state)
+    assert restored_journal.snapshot_events == journal.snapshot_events
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    state = _new_state()
+    journal = GameJournal.create(state, tmp_path, holder="onglet")
+    _play(journal, state, 2)
+    with open(journal.journal_path, "a", encoding="utf-8") as f:
+        f.write('{"type": "turn", "hp_de')
+
+    restored_journal, restored = GameJournal.load(state.game_id, tmp_path, owner="alice")
+    _same(restored, state)
+    assert restored_journal.events == journal.events
+
+
+def test_second_holder_refused_while_lease_runs(tmp_path):
+    state = _new_state()
+    mine = GameJournal.create(state, tmp_path, holder="onglet-1")
+    other, _ = GameJournal.load(state.game_id, tmp_path, holder="onglet-2", owner="alice")
+
+    assert not other.acquire()
+    with pytest.raises(JournalLocked):
+        other.record_end()
+    mine.release()
+    assert other.acquire()
+    with pytest.raises(JournalLocked):
+        mine.record_end()
+
+
+def test_expired_lease_can_be_taken_over(tmp_path, monkeypatch):
+    monkeypatch.setattr(save_journal, "LEASE_SECONDS", 0.05)
+    state = _new_state()
+    GameJournal.create(state, tmp_path, holder="onglet-1")  # onglet fermé sans release()
+    other, _ = GameJournal.load(state.game_id, tmp_path, holder="onglet-2", owner="alice")
+
+    assert not other.acquire()
+    time.sleep(0.1)
+    assert other.acquire()
+    other.record_end()
+
+
+def test_list_saves_reads_summaries_of_owner(tmp_path):
+    state = _new_state()
+    journal = GameJournal.create(state, tmp_path, holder="onglet")
+    _play(journal, state, 3)
+    GameJournal.create(_new_state(owner="bob"), tmp_path, holder="autre")
+
+    saves = list_saves("alice", tmp_path, limit=10)
+    assert [s.game_id for s in saves] == [state.game_id]
+    assert saves[0].hp == 17 and saves[0].turns == 3 and saves[0].game_active
+
+    journal.record_end()
+    assert list_saves("alice", tmp_path) == []
+    assert len(list_saves("alice", tmp_path, active_only=False)) == 1
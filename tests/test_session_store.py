@@ -0,0 +1,113 @@
+"""Éviction des sessions inactives vers SQLite et réhydratation (session_store)."""
+
+import gc
+import sqlite3
+import time
+
+import pytest
+
+from session_store import SessionStore
+
+
+class FakeAgent:
+    def __init__(self, turns):
+        self.conversation_history = [{"role": "system", "content": "MJ"}]
+        for t in range(turns):
+            self.conversation_history += [{"role": "user", "content": f"ACTION: avancer {t}"},
+                                          {"role": "assistant", "content": f"Tour {t}"}]
+
+
+class FakeMeter:
+    pass
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SessionStore(tmp_path / "cold.sqlite3", idle_timeout=60)
+
+
+def _open(store, session_id, turns=5):
+    agent = FakeAgent(turns)
+    history = [{"content": f"Tour {t}", "narrator": True, "image": f"{t:064x}.png"} for t in range(turns)]
+    store.touch(session_id, agent, history)
+    store.release(session_id, agent, history)
+    return agent, history
+
+
+def test_only_idle_sessions_are_evicted(store):
+    idle_agent, idle_history = _open(store, "idle")
+    busy_agent, busy_history = _open(store, "busy")
+    store.entry("idle").last_seen -= 120
+
+    assert store.evict_idle() == 1
+    assert store.entry("idle").cold and not store.entry("busy").cold
+    assert idle_history == [] and idle_agent.conversation_history == []
+    assert len(busy_history) == 5 and len(busy_agent.conversation_history) == 11
+
+
+def test_running_session_is_not_evicted(store):
+    agent, history = _open(store, "s")
+    store.touch("s", agent, history)  # exécution du script en cours
+    assert store.evict_idle(now=time.monotonic() + 3600) == 0
+
+
+def test_touch_rehydrates_in_place(store):
+    agent, history = _open(store, "s")
+    expected = (list(history), list(agent.conversation_history))
+    store.evict_idle(now=time.monotonic() + 120)
+
+    elapsed = store.touch("s", agent, history)
+    assert elapsed is not None
+    assert (history, agent.conversation_history) == expected
+    assert not store.entry("s").cold
+    assert store.touch("s", agent, history) is None  # déjà chaude
+
+
+def test_forgotten_session_comes_back_from_sqlite(store):
+    agent, history = _open(store, "s")
+    expected = list(history)
+    store.evict_idle(now=time.monotonic() + 120)
+
+    assert store.forget_unseen(ttl=60, now=time.monotonic() + 120) == 1
+    assert store.entry("s") is None
+    assert store.touch("s", agent, history) is not None
+    assert history == expected
+
+
+def test_media_ids_cover_hot_and_cold_sessions(store):
+    _open(store, "hot", turns=2)
+    _open(store, "cold", turns=4)
+    store.entry("cold").last_seen -= 120
+    store.evict_idle()
+
+    assert store.media_ids() == {f"{t:064x}.png" for t in range(4)}
+
+
+def test_extras_are_held_weakly(store):
+    agent, history = FakeAgent(1), []
+    meter = FakeMeter()
+    store.touch("s", agent, history, usage=meter)
+    store.release("s", agent, history, usage=meter)
+    ref = store.entry("s").extras["usage"]
+
+    del meter
+    gc.collect()
+    assert ref() is None
+
+
+def test_reaper_logs_failures_once_per_type(store, monkeypatch, caplog):
+    calls = []
+
+    def broken_measure(session_id=None):
+        calls.append(session_id)
+        raise sqlite3.OperationalError("database is locked") if len(calls) > 3 else RuntimeError("parcours interrompu")
+
+    monkeypatch.setattr(store, "measure", broken_measure)
+    store.start_reaper(interval=0.01)
+    deadline = time.monotonic() + 5
+    while len(calls) < 6 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    traces = [r for r in caplog.records if r.name == "session_store" and r.exc_info]
+    assert len(calls) >= 6  # le thread de ménage continue après les erreurs
+    assert [r.exc_info[0] for r in traces] == [RuntimeError, sqlite3.OperationalError]
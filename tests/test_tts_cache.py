@@ -0,0 +1,44 @@
+"""Éviction LRU du cache TTS, segment et variantes ensemble (tts_cache)."""
+
+import os
+
+from tts_cache import TTSSegmentCache, VARIANTS
+
+
+def _put(cache, text, at):
+    key = TTSSegmentCache.key(text, "fr")
+    cache.put(key, b"\x00" * 1000)
+    for variant in VARIANTS:
+        cache.put(key, b"\x00" * 200, variant=variant)
+    for path in cache.root.glob(f"{key}.*"):
+        os.utime(path, (at, at))
+    return key
+
+
+def _files(cache, key):
+    return sorted(p.name for p in cache.root.glob(f"{key}.*"))
+
+
+def test_segment_evicted_with_its_variants(tmp_path):
+    cache = TTSSegmentCache(tmp_path, max_bytes=10_000)
+    keys = [_put(cache, f"Phrase {i}.", at=1_000 + i) for i in range(6)]
+
+    cache.max_bytes = 4_000
+    cache._evict()
+
+    assert [k for k in keys if _files(cache, k)] == keys[-2:]
+    assert all(len(_files(cache, k)) == 3 for k in keys[-2:])
+    assert cache.stats()["bytes"] == 2 * 1400
+
+
+def test_replayed_segment_keeps_its_variants(tmp_path):
+    cache = TTSSegmentCache(tmp_path, max_bytes=10_000)
+    old = _put(cache, "Ancienne.", at=1_000)
+    recent = _put(cache, "Récente.", at=2_000)
+    assert cache.get(old)  # rejouée : seul le MP3 est marqué
+
+    cache.max_bytes = 2_000
+    cache._evict()
+
+    assert len(_files(cache, old)) == 3
+    assert _files(cache, recent) == []
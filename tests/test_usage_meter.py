@@ -0,0 +1,54 @@
+"""Paliers de dégradation du budget de tokens (usage_meter.UsageMeter.level)."""
+
+import pytest
+
+from config import BudgetConfig
+from usage_meter import (
+    UsageMeter, LEVEL_NORMAL, LEVEL_NO_SPECULATIVE, LEVEL_SHORT_CONTEXT,
+    LEVEL_ECONOMY_MODEL, LEVEL_EXHAUSTED,
+)
+
+BUDGET = 10_000
+
+
+def _meter(used, budget=BUDGET):
+    meter = UsageMeter("test", budget=budget, export=False)
+    if used:
+        meter.record("llama", "egypt", 1, {"prompt_tokens": used - used // 4,
+                                           "completion_tokens": used // 4}, 0.5)
+    return meter
+
+
+@pytest.mark.parametrize("fraction, level", [
+    (0.0, LEVEL_NORMAL),
+    (BudgetConfig.NO_SPECULATIVE_AT - 0.01, LEVEL_NORMAL),
+    (BudgetConfig.NO_SPECULATIVE_AT, LEVEL_NO_SPECULATIVE),
+    (BudgetConfig.SHORT_CONTEXT_AT, LEVEL_SHORT_CONTEXT),
+    (BudgetConfig.ECONOMY_MODEL_AT, LEVEL_ECONOMY_MODEL),
+    (0.99, LEVEL_ECONOMY_MODEL),
+    (1.0, LEVEL_EXHAUSTED),
+    (1.5, LEVEL_EXHAUSTED),
+])
+def test_level_follows_budget_thresholds(fraction, level):
+    meter = _meter(round(BUDGET * fraction))
+    assert meter.used == round(BUDGET * fraction)
+    assert meter.level() == level
+
+
+def test_no_budget_means_no_degradation():
+    assert _meter(50_000, budget=0).level() == LEVEL_NORMAL
+
+
+def test_usage_accumulates_across_calls():
+    meter = _meter(0)
+    for turn in range(4):
+        meter.record("llama", "egypt", turn, {"prompt_tokens": 1_000, "completion_tokens": 250}, 0.5)
+    assert meter.used == 5_000
+    assert meter.level() == LEVEL_NO_SPECULATIVE
+
+
+def test_policy_matches_level():
+    policy = _meter(round(BUDGET * BudgetConfig.ECONOMY_MODEL_AT)).policy()
+    assert policy.level == LEVEL_ECONOMY_MODEL
+    assert policy.model is not None and not policy.speculative and not policy.blocked
+    assert policy.context_turns == BudgetConfig.SHORT_CONTEXT_TURNS
@@ -0,0 +1,387 @@
+# ============================================
+# HERO IA - Traces par tour
+# Spans imbriqués, puits JSONL non bloquant, export Chrome
+# ============================================
+"""
+Où passe le temps d'un tour ? LLM, parsing JSON, état du jeu, image,
+TTS, STT, rendu Streamlit :
+- Chaque étape ouvre un span (nom, durée, attributs : tailles, tokens...)
+- Le span courant est porté par un contextvar : les spans imbriqués
+  retrouvent leur parent, y compris dans les pools de threads si la tâche
+  est soumise via bind()
+- Les spans terminés sont gardés en mémoire (panneau de latence) et écrits
+  en JSONL par un thread dédié : l'appelant ne fait jamais d'E/S
+- chrome_trace() convertit les spans au format Chrome Trace
+  (chrome://tracing, Perfetto)
+
+Désactivation : HERO_TRACE=0. Fichier : HERO_TRACE_FILE (défaut logs/traces.jsonl).
+"""
+
+import contextvars
+import functools
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+TRACE_ENABLED = os.getenv("HERO_TRACE", "1") != "0"
+TRACE_FILE = Path(os.getenv("HERO_TRACE_FILE", Path(__file__).parent / "logs" / "traces.jsonl"))
+# Au-delà, le fichier est renommé en .1 (une seule génération conservée)
+TRACE_FILE_MAX_BYTES = 20 * 1024 * 1024
+
+
+# ============================================
+# SPANS
+# ============================================
+
+@dataclass
+class Span:
+    """Étape chronométrée d'une trace."""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    start_us: int = 0
+    duration: Optional[float] = None  # s, None tant que le span est ouvert
+    attrs: Dict[str, Any] = field(default_factory=dict)
+    thread: str = ""
+    _t0: float = 0.0
+
+    def set(self, **attrs):
+        """Ajoute des attributs (tailles, tokens, moteur...)."""
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_us": self.start_us,
+            "duration": self.duration,
+            "thread": self.thread,
+            "attrs": self.attrs,
+        }
+
+
+_current: contextvars.ContextVar = contextvars.ContextVar("hero_span", default=None)
+
+
+def _new_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+# ============================================
+# PUITS JSONL
+# ============================================
+
+class JsonlSink:
+    """Écriture des spans en JSONL par un thread dédié (emit ne bloque jamais)."""
+
+    def __init__(self, path: Path = TRACE_FILE, max_queue: int = 10000,
+                 max_bytes: int = TRACE_FILE_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.dropped = 0
+        self.written = 0
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="hero-trace-sink", daemon=True)
+        self._thread.start()
+
+    def emit(self, record: Dict[str, Any]):
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1  # Mieux vaut perdre un span que ralentir le tour
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Attend que la file soit écrite (tests, export)."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return not self._queue.unfinished_tasks
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 500:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except OSError:
+                self.dropped += len(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists() and self.path.stat().st_size > self.max_bytes:
+            os.replace(self.path, self.path.with_suffix(self.path.suffix + ".1"))
+        with open(self.path, "a", encoding="utf-8") as f:
+            for record in batch:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self.written += len(batch)
+
+
+# ============================================
+# TRACEUR
+# ============================================
+
+class Tracer:
+    """Crée les spans et garde les traces récentes en mémoire."""
+
+    MAX_TRACES = 200
+
+    def __init__(self, sink: Optional[JsonlSink] = None, enabled: bool = True):
+        self.sink = sink
+        self.enabled = enabled
+        self._traces: "OrderedDict[str, List[Span]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, new_trace: bool = False, **attrs) -> Iterator[Optional[Span]]:
+        """
+        Ouvre un span enfant du span courant (ou une nouvelle trace).
+
+        Args:
+            new_trace: démarre une trace indépendante même sous un span ouvert
+
+        Usage:
+            with tracer.span("llm.call_api", model=model) as s:
+                ...
+                if s: s.set(prompt_tokens=1200)
+        """
+        if not self.enabled:
+            yield None
+            return
+
+        parent = None if new_trace else _current.get()
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else _new_id(),
+            span_id=_new_id(),
+            parent_id=parent.span_id if parent else None,
+            start_us=time.time_ns() // 1000,
+            attrs=dict(attrs),
+            thread=threading.current_thread().name,
+            _t0=time.perf_counter(),
+        )
+        token = _current.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.set(error=type(e).__name__)
+            raise
+        finally:
+            span.duration = time.perf_counter() - span._t0
+            _current.reset(token)
+            self._finish(span)
+
+    def _finish(self, span: Span):
+        with self._lock:
+            spans = self._traces.get(span.trace_id)
+            if spans is None:
+                spans = self._traces[span.trace_id] = []
+                while len(self._traces) > self.MAX_TRACES:
+                    self._traces.popitem(last=False)
+            spans.append(span)
+        if self.sink is not None:
+            self.sink.emit(span.to_dict())
+
+    def trace(self, trace_id: str) -> List[Span]:
+        """Spans terminés d'une trace, dans l'ordre de démarrage."""
+        with self._lock:
+            return sorted(self._traces.get(trace_id, []), key=lambda s: s.start_us)
+
+    def recent(self) -> List[Span]:
+        with self._lock:
+            return [s for spans in self._traces.values() for s in spans]
+
+
+_tracer = Tracer(JsonlSink() if TRACE_ENABLED else None, enabled=TRACE_ENABLED)
+
+
+def get_tracer() -> Tracer:
+    """Traceur partagé par toutes les sessions du processus."""
+    return _tracer
+
+
+def span(name: str, new_trace: bool = False, **attrs):
+    """Span sur le traceur partagé (context manager)."""
+    return _tracer.span(name, new_trace, **attrs)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def annotate(**attrs):
+    """Ajoute des attributs au span courant (sans effet hors trace)."""
+    current = _current.get()
+    if current is not None:
+        current.set(**attrs)
+
+
+def traced(name: str) -> Callable:
+    """Décorateur : chaque appel ouvre un span."""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _tracer.span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def bind(fn: Callable) -> Callable:
+    """
+    Capture le contexte courant pour une tâche soumise à un pool :
+    ses spans seront rattachés au span courant de l'appelant.
+    """
+    ctx = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return ctx.run(fn, *args, **kwargs)
+    return run
+
+
+# ============================================
+# ANALYSE ET EXPORT
+# ============================================
+
+def breakdown(spans: List[Span]) -> List[Dict[str, Any]]:
+    """
+    Répartition d'une trace : une ligne par span, avec sa profondeur.
+
+    Returns:
+        [{"name", "depth", "duration", "attrs"}] dans l'ordre de démarrage
+    """
+    by_id = {s.span_id: s for s in spans}
+
+    def depth(s: Span) -> int:
+        d = 0
+        while s.parent_id in by_id:
+            s = by_id[s.parent_id]
+            d += 1
+        return d
+
+    return [
+        {"name": s.name, "depth": depth(s), "duration": s.duration, "attrs": s.attrs}
+        for s in sorted(spans, key=lambda s: s.start_us)
+    ]
+
+
+def chrome_trace(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Spans (dicts, comme dans le JSONL) -> format Chrome Trace ("X" = événement complet).
+    """
+    threads: Dict[str, int] = {}
+    events = []
+    for r in records:
+        tid = threads.setdefault(r.get("thread") or "main", len(threads) + 1)
+        events.append({
+            "name": r["name"],
+            "cat": r["name"].split(".")[0],
+            "ph": "X",
+            "ts": r["start_us"],
+            "dur": int((r.get("duration") or 0) * 1e6),
+            "pid": 1,
+            "tid": tid,
+            "args": dict(r.get("attrs") or {}, trace_id=r["trace_id"]),
+        })
+    for name, tid in threads.items():
+        events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def load_jsonl(path: Path, trace_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Ligne tronquée (arrêt pendant l'écriture)
+            if trace_id is None or record.get("trace_id") == trace_id:
+                records.append(record)
+    return records
+
+
+def export_chrome_trace(source: Path, target: Path, trace_id: Optional[str] = None) -> int:
+    """Convertit un fichier JSONL en trace Chrome. Retourne le nombre de spans."""
+    records = load_jsonl(source, trace_id)
+    with open(target, "w", encoding="utf-8") as f:
+        json.dump(chrome_trace(records), f)
+    return len(records)
+
+
+# ============================================
+# TEST / EXPORT
+# ============================================
+
+if __name__ == "__main__":
+    import sys
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+
+    # python tracing.py logs/traces.jsonl trace.json [trace_id]
+    if len(sys.argv) >= 3:
+        count = export_chrome_trace(Path(sys.argv[1]), Path(sys.argv[2]),
+                                    sys.argv[3] if len(sys.argv) > 3 else None)
+        print(f"✅ {count} spans exportés vers {sys.argv[2]} (chrome://tracing ou ui.perfetto.dev)")
+        sys.exit(0)
+
+    print("\n" + "=" * 60)
+    print("   TEST TRACES")
+    print("=" * 60 + "\n")
+
+    tmp = Path(tempfile.mkdtemp()) / "traces.jsonl"
+    tracer = Tracer(JsonlSink(tmp))
+
+    def fake_llm():
+        with tracer.span("llm.call_api", model="stub") as s:
+            time.sleep(0.05)
+            s.set(prompt_tokens=1200, completion_tokens=300)
+            with tracer.span("llm.parse_json", chars=900):
+                time.sleep(0.005)
+
+    def fake_image():
+        with tracer.span("image.generate", bytes=48000):
+            time.sleep(0.02)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        with tracer.span("turn", kind="text") as root:
+            pool.submit(bind(fake_llm)).result()
+            with tracer.span("turn.media"):
+                pool.submit(bind(fake_image)).result()
+
+    for row in breakdown(tracer.trace(root.trace_id)):
+        print(f"   {'  ' * row['depth']}{row['name']:<20} {row['duration'] * 1000:7.1f} ms  {row['attrs']}")
+
+    tracer.sink.flush()
+    records = load_jsonl(tmp)
+    trace = chrome_trace(records)
+    print(f"\n   Spans écrits (JSONL)  : {len(records)}")
+    print(f"   Événements Chrome     : {len(trace['traceEvents'])}")
+
+    # Coût d'un span (chemin chaud)
+    n = 20000
+    bench = Tracer(None)
+    start = time.perf_counter()
+    for _ in range(n):
+        with bench.span("noop"):
+            pass
+    print(f"   Coût par span         : {(time.perf_counter() - start) / n * 1e6:.1f} µs")
+
+    print("\n" + "=" * 60)
@@ -0,0 +1,302 @@
+# ============================================
+# HERO IA - Moteurs TTS interchangeables
+# gTTS, edge-tts, espeak-ng / piper (hors ligne, CPU)
+# ============================================
+"""
+Chaque moteur reçoit une phrase et la configuration de voix (VOICE_OPTIONS)
+et renvoie un segment MP3. Le moteur est choisi une fois par narration par
+le BackendSelector (latence glissante + échecs, qualité standard au minimum),
+pour que toutes les phrases d'un récit gardent la même voix.
+
+Les moteurs hors ligne produisent du PCM/WAV, ré-encodé en MP3 via ffmpeg
+pour que tous les segments du cache aient le même format.
+"""
+
+import asyncio
+import io
+import json
+import os
+import random
+import shutil
+import subprocess
+import time
+import wave
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List
+
+from backend_selector import QUALITY_DRAFT, QUALITY_STANDARD, QUALITY_HIGH
+from audio_preprocess import FFMPEG_OK, encode_mp3
+
+# ============================================
+# VÉRIFICATION DES MOTEURS
+# ============================================
+
+# gTTS (Google TTS)
+GTTS_OK = False
+try:
+    from gtts import gTTS
+    GTTS_OK = True
+    print("✅ gTTS (Google TTS - Gratuit) configuré")
+except ImportError:
+    print("⚠️ gTTS non installé : pip install gtts")
+
+# Hôte de remplacement pour gTTS (serveurs factices de load_test.py)
+GTTS_HOST = os.getenv("HERO_GTTS_HOST")
+if GTTS_OK and GTTS_HOST:
+    import gtts.tts
+    gtts.tts._translate_url = lambda tld="com", path="": f"{GTTS_HOST.rstrip('/')}/{path}"
+
+# edge-tts (voix neuronales Microsoft)
+EDGE_TTS_OK = False
+try:
+    import edge_tts
+    EDGE_TTS_OK = True
+except ImportError:
+    pass
+
+# Moteurs locaux (binaires optionnels)
+ESPEAK_PATH = shutil.which("espeak-ng") or shutil.which("espeak")
+PIPER_PATH = shutil.which("piper")
+PIPER_MODEL = os.getenv("PIPER_MODEL")  # chemin du modèle .onnx
+
+ESPEAK_OK = ESPEAK_PATH is not None and FFMPEG_OK
+PIPER_OK = PIPER_PATH is not None and bool(PIPER_MODEL) and FFMPEG_OK
+
+
+# ============================================
+# BACKENDS
+# ============================================
+
+class TTSBackend(ABC):
+    """Interface commune des moteurs de synthèse vocale."""
+
+    name: str = "base"
+    quality: int = QUALITY_STANDARD
+
+    @abstractmethod
+    def synthesize(self, text: str, voice: Dict[str, Any]) -> bytes:
+        """Synthétise une phrase. Retourne un segment MP3."""
+
+
+class GTTSBackend(TTSBackend):
+    """Google TTS (réseau, gratuit)."""
+
+    name = "gtts"
+    quality = QUALITY_STANDARD
+
+    def synthesize(self, text: str, voice: Dict[str, Any]) -> bytes:
+        tts = gTTS(
+            text=text,
+            lang=voice.get("lang", "fr"),
+            tld=voice.get("tld", "fr"),
+            slow=voice.get("slow", False)
+        )
+        audio_buffer = io.BytesIO()
+        tts.write_to_fp(audio_buffer)
+        return audio_buffer.getvalue()
+
+
+class EdgeTTSBackend(TTSBackend):
+    """Voix neuronales edge-tts (réseau, MP3 24 kHz)."""
+
+    name = "edge"
+    quality = QUALITY_HIGH
+    DEFAULT_VOICE = "fr-FR-HenriNeural"
+
+    def synthesize(self, text: str, voice: Dict[str, Any]) -> bytes:
+        edge = voice.get("edge", {})
+
+        async def _run() -> bytes:
+            chunks = []
+            communicate = edge_tts.Communicate(
+                text, edge.get("voice", self.DEFAULT_VOICE), rate=edge.get("rate", "+0%")
+            )
+            async for chunk in communicate.stream():
+                if chunk["type"] == "audio":
+                    chunks.append(chunk["data"])
+            return b"".join(chunks)
+
+        # Appelé depuis un thread du pool TTS : boucle asyncio dédiée
+        return asyncio.run(_run())
+
+
+class EspeakBackend(TTSBackend):
+    """espeak-ng en local (CPU, instantané, voix robotique)."""
+
+    name = "local:espeak"
+    quality = QUALITY_DRAFT
+
+    def synthesize(self, text: str, voice: Dict[str, Any]) -> bytes:
+        espeak = voice.get("espeak", {})
+        proc = subprocess.run(
+            [ESPEAK_PATH, "-v", espeak.get("voice", "fr-fr"),
+             "-s", str(espeak.get("speed", 160)), "--stdout", text],
+            capture_output=True, timeout=15
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.decode("utf-8", "replace")[:100])
+        return encode_mp3(proc.stdout, ["-f", "wav"]) or b""
+
+
+class PiperBackend(TTSBackend):
+    """Piper en local (CPU, voix neuronale, modèle .onnx)."""
+
+    name = "local:piper"
+    quality = QUALITY_STANDARD
+
+    def __init__(self, model: str = PIPER_MODEL):
+        self.model = model
+        # Fréquence d'échantillonnage lue dans la config du modèle (<modèle>.json)
+        self.sample_rate = 22050
+        try:
+            with open(f"{model}.json", encoding="utf-8") as f:
+                self.sample_rate = json.load(f)["audio"]["sample_rate"]
+        except (OSError, KeyError, ValueError):
+            pass
+
+    def synthesize(self, text: str, voice: Dict[str, Any]) -> bytes:
+        piper = voice.get("piper", {})
+        proc = subprocess.run(
+            [PIPER_PATH, "--model", self.model, "--output-raw",
+             "--length_scale", str(piper.get("length_scale", 1.0))],
+            input=text.encode("utf-8"), capture_output=True, timeout=30
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.decode("utf-8", "replace")[:100])
+        return encode_mp3(proc.stdout, ["-f", "s16le", "-ac", "1", "-ar", str(self.sample_rate)]) or b""
+
+
+class StubTTSBackend(TTSBackend):
+    """Moteur factice pour les tests (latence et taux d'échec réglables)."""
+
+    # Trame MP3 silencieuse (MPEG-1 Layer III, 32 kbps, 44.1 kHz, 26 ms)
+    SILENT_FRAME = b"\xff\xfb\x10\xc4" + b"\x00" * 100
+
+    def __init__(self, name: str = "stub", quality: int = QUALITY_STANDARD,
+                 latency: float = 0.0, failure_rate: float = 0.0):
+        self.name = name
+        self.quality = quality
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+
+    def synthesize(self, text: str, voice: Dict[str, Any]) -> bytes:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            raise RuntimeError("Échec simulé")
+        # ~1 trame par caractère : durée proportionnelle au texte
+        return self.SILENT_FRAME * max(1, len(text) // 2)
+
+
+def default_tts_backends() -> List[TTSBackend]:
+    """Moteurs disponibles dans cet environnement (ordre = préférence initiale)."""
+    backends: List[TTSBackend] = []
+    if GTTS_OK:
+        backends.append(GTTSBackend())
+    if EDGE_TTS_OK:
+        backends.append(EdgeTTSBackend())
+    if PIPER_OK:
+        backends.append(PiperBackend())
+    if ESPEAK_OK:
+        backends.append(EspeakBackend())
+    return backends
+
+
+# ============================================
+# DURÉE AUDIO (facteur temps réel)
+# ============================================
+
+_MP3_BITRATES = {
+    3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),   # MPEG-1
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),       # MPEG-2
+}
+_MP3_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def mp3_duration(data: bytes) -> float:
+    """Durée (s) d'un flux MP3 Layer III, en parcourant ses trames."""
+    if data[:3] == b"ID3" and len(data) > 10:
+        data = data[10 + ((data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]):]
+
+    seconds = 0.0
+    i = 0
+    while i + 4 <= len(data):
+        b1, b2 = data[i + 1], data[i + 2]
+        version = (b1 >> 3) & 3
+        layer = (b1 >> 1) & 3
+        br_idx, sr_idx, padding = b2 >> 4, (b2 >> 2) & 3, (b2 >> 1) & 1
+        if (data[i] != 0xFF or (b1 & 0xE0) != 0xE0 or version == 1 or layer != 1
+                or br_idx in (0, 15) or sr_idx == 3):
+            i += 1
+            continue
+        rate = _MP3_RATES[version][sr_idx]
+        bitrate = _MP3_BITRATES[3 if version == 3 else 2][br_idx] * 1000
+        samples = 1152 if version == 3 else 576
+        seconds += samples / rate
+        i += samples // 8 * bitrate // rate + padding
+    return seconds
+
+
+def audio_duration(data: bytes) -> float:
+    """Durée (s) d'un segment WAV ou MP3."""
+    if data[:4] == b"RIFF":
+        with wave.open(io.BytesIO(data)) as w:
+            return w.getnframes() / w.getframerate()
+    return mp3_duration(data)
+
+
+def benchmark(backends: List[TTSBackend], text: str, voice: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Facteur temps réel (RTF) de chaque moteur : temps de synthèse / durée audio.
+    RTF < 1 : plus rapide que la lecture.
+    """
+    rows = []
+    for backend in backends:
+        start = time.perf_counter()
+        try:
+            audio = backend.synthesize(text, voice)
+            error = None if audio else "Audio vide"
+        except Exception as e:
+            audio, error = b"", str(e)[:60]
+        elapsed = time.perf_counter() - start
+        duration = audio_duration(audio) if audio else 0.0
+        rows.append({
+            "name": backend.name,
+            "latency": elapsed,
+            "duration": duration,
+            "rtf": elapsed / duration if duration else None,
+            "bytes": len(audio),
+            "error": error,
+        })
+    return rows
+
+
+# ============================================
+# TEST
+# ============================================
+
+if __name__ == "__main__":
+    print("\n" + "=" * 60)
+    print("   TEST MOTEURS TTS")
+    print("=" * 60 + "\n")
+
+    print(f"gTTS     : {'✅' if GTTS_OK else '❌'}")
+    print(f"edge-tts : {'✅' if EDGE_TTS_OK else '❌'}")
+    print(f"piper    : {'✅' if PIPER_OK else '❌ (binaire piper + PIPER_MODEL + ffmpeg)'}")
+    print(f"espeak-ng: {'✅' if ESPEAK_OK else '❌ (binaire espeak-ng + ffmpeg)'}")
+
+    sentence = "Le couloir s'enfonce dans l'obscurité, et l'écho de vos pas résonne au loin."
+    voice = {"lang": "fr", "tld": "fr", "edge": {"voice": "fr-FR-HenriNeural"}, "espeak": {"voice": "fr-fr"}}
+    backends = default_tts_backends() + [StubTTSBackend("stub", latency=0.05)]
+
+    print(f"\n🧪 Facteur temps réel ({len(sentence)} caractères)...")
+    for row in benchmark(backends, sentence, voice):
+        if row["error"]:
+            print(f"   {row['name']:<14} ❌ {row['error']}")
+        else:
+            print(f"   {row['name']:<14} synthèse={row['latency']:.2f}s  audio={row['duration']:.2f}s  "
+                  f"RTF={row['rtf']:.2f}  ({row['bytes']} octets)")
+
+    print("\n" + "=" * 60)
@@ -0,0 +1,235 @@
+# ============================================
+# HERO IA - Cache TTS persistant (par phrase)
+# Partagé entre sessions et processus
+# ============================================
+"""
+Cache disque des segments audio synthétisés :
+- Une entrée par phrase, clé = SHA-256 stable de (voix, phrase)
+- Survit aux redémarrages (contrairement à hash() en Python)
+- Limite en octets avec éviction LRU (date de dernier accès)
+- Compteurs de hits / misses
+- Fichiers servis par la route statique (lecture progressive segment par segment)
+- Variantes Opus/WebM basse résolution rangées à côté du MP3 d'origine
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+
+CACHE_DIR = Path(__file__).parent / "static" / "tts"
+CACHE_URL = "./app/static/tts"
+
+# Variantes encodées après coup (le MP3 reste la référence et le secours)
+VARIANTS = {
+    "opus24": {"suffix": ".o24.webm", "bitrate": "24k"},
+    "opus12": {"suffix": ".o12.webm", "bitrate": "12k"},
+}
+
+
+class TTSSegmentCache:
+    """Cache LRU sur disque des segments TTS."""
+
+    DEFAULT_MAX_BYTES = 50 * 1024 * 1024  # 50 Mo
+    EXTENSION = ".mp3"
+
+    def __init__(self, root: Path = CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 url_prefix: str = CACHE_URL):
+        self.root = Path(root)
+        self.url_prefix = url_prefix
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._total_bytes = sum(p.stat().st_size for p in self._files())
+        # Segments produits par un moteur de secours : servis pour la narration
+        # en cours, mais jamais rejoués (get() = miss, remplacés au prochain put())
+        self._provisional: set = set()
+
+    @staticmethod
+    def key(text: str, voice: str, engine: str = "") -> str:
+        """Clé stable (identique d'un processus à l'autre) : moteur, voix et phrase."""
+        return hashlib.sha256(f"{engine}\n{voice}\n{text}".encode("utf-8")).hexdigest()
+
+    def _files(self):
+        yield from self.root.glob(f"*{self.EXTENSION}")
+        yield from self.root.glob("*.webm")
+
+    def _path(self, key: str, variant: Optional[str] = None) -> Path:
+        suffix = VARIANTS[variant]["suffix"] if variant else self.EXTENSION
+        return self.root / f"{key}{suffix}"
+
+    def url(self, key: str, variant: Optional[str] = None) -> str:
+        return f"{self.url_prefix}/{self._path(key, variant).name}"
+
+    def urls(self, key: str) -> Dict[str, str]:
+        """URL de chaque variante (le lecteur choisit, et se rabat sur le MP3)."""
+        return {"mp3": self.url(key), **{v: self.url(key, v) for v in VARIANTS}}
+
+    def has_variant(self, key: str, variant: str) -> bool:
+        return self._path(key, variant).exists()
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        if key in self._provisional:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # Marque l'accès (LRU)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes, variant: Optional[str] = None, provisional: bool = False):
+        path = self._path(key, variant)
+        with self._lock:
+            replacing = variant is None and key in self._provisional
+            if variant is None:
+                if provisional:
+                    self._provisional.add(key)
+                else:
+                    self._provisional.discard(key)
+        if replacing:
+            self._discard(key)
+        elif path.exists():
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self._total_bytes += len(data)
+            over = self._total_bytes > self.max_bytes
+        if over:
+            self._evict()
+
+    def _discard(self, key: str):
+        """Supprime un segment et ses variantes."""
+        for path in (self._path(key), *(self._path(key, v) for v in VARIANTS)):
+            try:
+                size = path.stat().st_size
+                path.unlink()
+            except OSError:
+                continue
+            with self._lock:
+                self._total_bytes -= size
+
+    def _evict(self):
+        """
+        Supprime les segments les moins récemment utilisés (jusqu'à 90% de la limite).
+        Un segment part avec ses variantes : date de dernier accès = la plus
+        récente de ses fichiers (get() ne touche que le MP3).
+        """
+        with self._lock:
+            # clé -> [dernier accès, octets, fichiers]
+            entries: Dict[str, list] = {}
+            for p in self._files():
+                try:
+                    st = p.stat()
+                except OSError:
+                    continue
+                entry = entries.setdefault(p.name.split(".", 1)[0], [0.0, 0, []])
+                entry[0] = max(entry[0], st.st_mtime)
+                entry[1] += st.st_size
+                entry[2].append((st.st_size, p))
+            total = sum(size for _, size, _ in entries.values())
+            target = int(self.max_bytes * 0.9)
+            for key, (_, _, files) in sorted(entries.items(), key=lambda e: e[1][0]):
+                if total <= target:
+                    break
+                for size, p in files:
+                    try:
+                        p.unlink()
+                        total -= size
+                    except OSError:
+                        pass
+                self._provisional.discard(key)
+            self._total_bytes = total
+
+    def clear(self):
+        with self._lock:
+            for p in self._files():
+                try:
+                    p.unlink()
+                except OSError:
+                    pass
+            self._total_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_shared_cache: Optional[TTSSegmentCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_cache() -> TTSSegmentCache:
+    """Instance unique par processus (toutes les sessions la partagent)."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = TTSSegmentCache()
+        return _shared_cache
+
+
+# ============================================
+# TEST
+# ============================================
+
+if __name__ == "__main__":
+    print("\n" + "=" * 60)
+    print("   TEST CACHE TTS")
+    print("=" * 60 + "\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TTSSegmentCache(Path(tmp), max_bytes=10_000)
+        k = TTSSegmentCache.key("Game Over.", "fr")
+        print(f"   Clé stable  : {k[:16]}… ({'✅' if k == TTSSegmentCache.key('Game Over.', 'fr') else '❌'})")
+        print(f"   Miss        : {'✅' if cache.get(k) is None else '❌'}")
+        cache.put(k, b"\xff\xfb" + b"\x00" * 998)
+        print(f"   Hit         : {'✅' if cache.get(k) else '❌'}")
+        cache.put(k, b"\x1aE\xdf\xa3" + b"\x00" * 200, variant="opus24")
+        print(f"   Variante    : {'✅' if cache.has_variant(k, 'opus24') else '❌'} {cache.url(k, 'opus24')}")
+        print(f"   Par moteur  : {'✅' if TTSSegmentCache.key('Game Over.', 'fr', 'edge') != TTSSegmentCache.key('Game Over.', 'fr', 'gtts') else '❌'}")
+        p = TTSSegmentCache.key("Secours.", "fr", "edge")
+        cache.put(p, b"\x01" * 500, provisional=True)
+        print(f"   Secours     : {'✅' if cache.get(p) is None else '❌'} (servi, jamais rejoué)")
+        final = b"\x02" * 500
+        cache.put(p, final)
+        print(f"   Remplacé    : {'✅' if cache.get(p) == final else '❌'}")
+        for i in range(20):
+            cache.put(TTSSegmentCache.key(f"Phrase {i}.", "fr"), b"\x00" * 1000)
+        s = cache.stats()
+        print(f"   Éviction    : {s['bytes']} / {s['max_bytes']} octets ({'✅' if s['bytes'] <= s['max_bytes'] else '❌'})")
+        orphans = [v.name for v in cache.root.glob("*.webm") if not cache._path(v.name.split(".", 1)[0]).exists()]
+        print(f"   Variantes   : {'✅ évincées avec leur MP3' if not orphans else f'❌ {len(orphans)} orphelines'}")
+        print(f"   Hit rate    : {s['hit_rate']:.0%} ({s['hits']} hits, {s['misses']} misses)")
+
+    print("\n" + "=" * 60)
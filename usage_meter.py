@@ -0,0 +1,286 @@
+# ============================================
+# HERO IA - Comptage des tokens et budget de session
+# completion.usage agrégé par session, thème et modèle
+# ============================================
+"""
+Chaque appel au LLM renvoie son usage (tokens d'entrée / de sortie) :
+- Le compteur de la session l'agrège par thème et par modèle, et garde la
+  courbe par tour (l'historique renvoyé au LLM grossit à chaque tour)
+- Le budget de la session déclenche des paliers de dégradation avant la
+  limite stricte (voir BudgetConfig) :
+    1. plus de travail spéculatif (image affinée, pré-synthèse des lignes d'attente)
+    2. contexte raccourci (derniers échanges seulement)
+    3. modèle plus petit (LLMConfig.ECONOMY_MODEL)
+    4. limite atteinte : plus de nouveaux tours
+- Chaque appel est aussi écrit en JSONL (logs/usage.jsonl) pour l'analyse
+  hors ligne : python usage_meter.py logs/usage.jsonl
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config import LLMConfig, BudgetConfig
+from tracing import JsonlSink
+
+USAGE_FILE = Path(os.getenv("HERO_USAGE_FILE", Path(__file__).parent / "logs" / "usage.jsonl"))
+SESSION_TOKEN_BUDGET = int(os.getenv("HERO_TOKEN_BUDGET", BudgetConfig.SESSION_TOKENS))
+
+# Paliers de dégradation
+LEVEL_NORMAL = 0
+LEVEL_NO_SPECULATIVE = 1
+LEVEL_SHORT_CONTEXT = 2
+LEVEL_ECONOMY_MODEL = 3
+LEVEL_EXHAUSTED = 4
+
+LEVEL_LABELS = {
+    LEVEL_NORMAL: "normal",
+    LEVEL_NO_SPECULATIVE: "sans travail spéculatif",
+    LEVEL_SHORT_CONTEXT: "contexte court",
+    LEVEL_ECONOMY_MODEL: "modèle économique",
+    LEVEL_EXHAUSTED: "budget épuisé",
+}
+
+
+def call_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Coût estimé d'un appel ($), 0 si le modèle n'a pas de prix connu."""
+    price_in, price_out = LLMConfig.PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * price_in + completion_tokens * price_out) / 1_000_000
+
+
+# ============================================
+# DATA CLASSES
+# ============================================
+
+@dataclass
+class UsageRecord:
+    """Usage d'un appel au LLM."""
+    session_id: str
+    theme: str
+    model: str
+    turn: int
+    prompt_tokens: int
+    completion_tokens: int
+    latency: float
+    cost: float
+    ts: float
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+@dataclass
+class BudgetPolicy:
+    """Ce que la session a encore le droit de faire."""
+    level: int = LEVEL_NORMAL
+    model: Optional[str] = None          # None : modèle de l'agent inchangé
+    context_turns: Optional[int] = None  # None : historique complet
+    speculative: bool = True
+    blocked: bool = False
+
+    @property
+    def label(self) -> str:
+        return LEVEL_LABELS[self.level]
+
+
+# ============================================
+# COMPTEUR
+# ============================================
+
+_sink: Optional[JsonlSink] = None
+_sink_lock = threading.Lock()
+
+
+def _get_sink() -> JsonlSink:
+    global _sink
+    with _sink_lock:
+        if _sink is None:
+            _sink = JsonlSink(USAGE_FILE)
+        return _sink
+
+
+class UsageMeter:
+    """Tokens consommés par une session (thread-safe : appelé depuis le pool)."""
+
+    def __init__(self, session_id: str, budget: int = SESSION_TOKEN_BUDGET,
+                 sink: Optional[JsonlSink] = None, export: bool = True):
+        self.session_id = session_id
+        self.budget = budget
+        self.records: List[UsageRecord] = []
+        self._sink = sink
+        self._export = export
+        self._lock = threading.Lock()
+
+    def record(self, model: str, theme: str, turn: int, usage: Any, latency: float) -> Optional[UsageRecord]:
+        """
+        Enregistre l'usage d'un appel (objet completion.usage ou dict).
+
+        Returns:
+            L'enregistrement, ou None si l'usage est absent
+        """
+        if usage is None:
+            return None
+        get = usage.get if isinstance(usage, dict) else lambda k: getattr(usage, k, None)
+        prompt, completion = int(get("prompt_tokens") or 0), int(get("completion_tokens") or 0)
+        record = UsageRecord(
+            session_id=self.session_id, theme=theme or "", model=model, turn=turn,
+            prompt_tokens=prompt, completion_tokens=completion, latency=latency,
+            cost=call_cost(model, prompt, completion), ts=time.time(),
+        )
+        with self._lock:
+            self.records.append(record)
+        if self._export:
+            (self._sink or _get_sink()).emit(asdict(record))
+        return record
+
+    # ------------------------------------------
+    # Agrégats
+    # ------------------------------------------
+
+    @property
+    def used(self) -> int:
+        with self._lock:
+            return sum(r.total_tokens for r in self.records)
+
+    def totals(self) -> Dict[str, Any]:
+        with self._lock:
+            records = list(self.records)
+        return {
+            "calls": len(records),
+            "prompt_tokens": sum(r.prompt_tokens for r in records),
+            "completion_tokens": sum(r.completion_tokens for r in records),
+            "total_tokens": sum(r.total_tokens for r in records),
+            "cost": sum(r.cost for r in records),
+            "budget": self.budget,
+        }
+
+    def by(self, field_name: str) -> Dict[str, Dict[str, float]]:
+        """Agrégat par "theme" ou "model"."""
+        groups: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        with self._lock:
+            for r in self.records:
+                group = groups[getattr(r, field_name)]
+                group["calls"] += 1
+                group["prompt_tokens"] += r.prompt_tokens
+                group["completion_tokens"] += r.completion_tokens
+                group["cost"] += r.cost
+        return {k: dict(v) for k, v in groups.items()}
+
+    def prompt_growth(self) -> Optional[float]:
+        """Croissance moyenne des tokens d'entrée par tour (pente des moindres carrés)."""
+        with self._lock:
+            points = [(r.turn, r.prompt_tokens) for r in self.records]
+        if len(points) < 2:
+            return None
+        n = len(points)
+        mean_x = sum(x for x, _ in points) / n
+        mean_y = sum(y for _, y in points) / n
+        var = sum((x - mean_x) ** 2 for x, _ in points)
+        if not var:
+            return None
+        return sum((x - mean_x) * (y - mean_y) for x, y in points) / var
+
+    # ------------------------------------------
+    # Budget
+    # ------------------------------------------
+
+    def level(self) -> int:
+        if self.budget <= 0:
+            return LEVEL_NORMAL
+        ratio = self.used / self.budget
+        if ratio >= 1.0:
+            return LEVEL_EXHAUSTED
+        if ratio >= BudgetConfig.ECONOMY_MODEL_AT:
+            return LEVEL_ECONOMY_MODEL
+        if ratio >= BudgetConfig.SHORT_CONTEXT_AT:
+            return LEVEL_SHORT_CONTEXT
+        if ratio >= BudgetConfig.NO_SPECULATIVE_AT:
+            return LEVEL_NO_SPECULATIVE
+        return LEVEL_NORMAL
+
+    def policy(self) -> BudgetPolicy:
+        level = self.level()
+        return BudgetPolicy(
+            level=level,
+            model=LLMConfig.ECONOMY_MODEL if level >= LEVEL_ECONOMY_MODEL else None,
+            context_turns=BudgetConfig.SHORT_CONTEXT_TURNS if level >= LEVEL_SHORT_CONTEXT else None,
+            speculative=level < LEVEL_NO_SPECULATIVE,
+            blocked=level >= LEVEL_EXHAUSTED,
+        )
+
+
+# ============================================
+# ANALYSE HORS LIGNE
+# ============================================
+
+def summarize(path: Path) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Agrège un fichier usage.jsonl par thème, modèle et session."""
+    summary: Dict[str, Dict[str, Dict[str, float]]] = {
+        key: defaultdict(lambda: defaultdict(float)) for key in ("theme", "model", "session_id")
+    }
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                r = json.loads(line)
+            except ValueError:
+                continue
+            for key, groups in summary.items():
+                group = groups[r.get(key) or "?"]
+                group["calls"] += 1
+                group["prompt_tokens"] += r.get("prompt_tokens", 0)
+                group["completion_tokens"] += r.get("completion_tokens", 0)
+                group["cost"] += r.get("cost", 0.0)
+    return {key: {k: dict(v) for k, v in groups.items()} for key, groups in summary.items()}
+
+
+# ============================================
+# TEST / ANALYSE
+# ============================================
+
+if __name__ == "__main__":
+    import sys
+
+    def print_groups(title: str, groups: Dict[str, Dict[str, float]]):
+        print(f"\n   {title}")
+        for name, g in sorted(groups.items(), key=lambda kv: -kv[1]["prompt_tokens"]):
+            print(f"     {name[:28]:<28} appels={int(g['calls']):>4}  entrée={int(g['prompt_tokens']):>8}  "
+                  f"sortie={int(g['completion_tokens']):>7}  coût={g['cost']:.4f}$")
+
+    # python usage_meter.py logs/usage.jsonl
+    if len(sys.argv) > 1:
+        summary = summarize(Path(sys.argv[1]))
+        print_groups("Par thème", summary["theme"])
+        print_groups("Par modèle", summary["model"])
+        print(f"\n   Sessions : {len(summary['session_id'])}")
+        sys.exit(0)
+
+    print("\n" + "=" * 60)
+    print("   TEST COMPTEUR DE TOKENS")
+    print("=" * 60)
+
+    meter = UsageMeter("test", budget=60_000, export=False)
+    policy = meter.policy()
+    for turn in range(30):
+        # L'historique renvoyé grossit d'environ 450 tokens par tour
+        model = policy.model or LLMConfig.DEFAULT_MODEL
+        prompt = 1500 + 450 * turn if policy.context_turns is None else 1500 + 450 * policy.context_turns * 2
+        meter.record(model, "egypt", turn, {"prompt_tokens": prompt, "completion_tokens": 350}, 1.2)
+        new_policy = meter.policy()
+        if new_policy.level != policy.level:
+            print(f"\n   Tour {turn:>2} : {meter.used:>6} tokens -> {new_policy.label}")
+        policy = new_policy
+        if policy.blocked:
+            break
+
+    totals = meter.totals()
+    print(f"\n   Total : {totals['total_tokens']} tokens en {totals['calls']} appels, {totals['cost']:.4f}$")
+    print(f"   Croissance de l'entrée : {meter.prompt_growth():.0f} tokens/tour")
+    print_groups("Par modèle", meter.by("model"))
+
+    print("\n" + "=" * 60)